@@ -0,0 +1,169 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module compiles the articles of each language into a single bundle file, and reads articles from those bundles.
+
+Reading 1851 separate article files means thousands of small file system calls. When packaging the plug-in, all of the
+articles of each language are concatenated into a single file, with an index of where each article is. The plug-in
+memory-maps these bundles, so that getting an article is only a lookup in the index.
+
+A bundle file consists of:
+* The magic bytes b"SGBUNDLE".
+* The version of the bundle format and the length of the index, as two unsigned 32-bit little-endian integers.
+* The index, as UTF-8 encoded JSON. This maps each article ID to a list of: the offset of the article in the data, the
+  length of the article in bytes, the SHA-1 hash of the article and the path of the article file relative to the
+  resources folder.
+* The data: The UTF-8 encoded Markdown of all articles.
+
+To compile the bundles during packaging, execute:
+`python3 ArticleBundle.py <resources folder> <bundles folder>`
+"""
+
+import hashlib  # To record the hashes of the articles.
+import json  # The index of the bundle is stored in JSON format.
+import mmap  # To read from the bundles without loading them into memory completely.
+import os  # To find the articles and store the bundles.
+import struct  # To store the header of the bundle files.
+import sys  # To get the command line arguments when building the bundles.
+from typing import Dict, List, Optional
+
+try:
+	from . import ArticleManifest  # To find the articles to put in the bundles.
+except ImportError:  # Executed as a script during packaging.
+	import ArticleManifest
+
+magic = b"SGBUNDLE"
+version = 1  # Version number of the bundle format. Bundles of a different version are ignored.
+header = struct.Struct("<II")
+
+def write_bundles(resources_path: str, bundles_path: str) -> None:
+	"""
+	Compile the articles in the resources folder into one bundle per language.
+	:param resources_path: The resources folder of the plug-in.
+	:param bundles_path: The folder to store the bundles in. The bundles are
+	named after their language, such as `en_US.bundle`.
+	"""
+	per_language = {}  # type: Dict[str, Dict[str, str]]  # For each language, the article IDs and their file paths.
+	for article_id, languages in ArticleManifest.walk_articles(resources_path).items():
+		for language, path in languages.items():
+			if language not in per_language:
+				per_language[language] = {}
+			per_language[language][article_id] = path
+
+	os.makedirs(bundles_path, exist_ok=True)
+	for language, articles in per_language.items():
+		index = {}
+		data = []
+		offset = 0
+		for article_id, path in sorted(articles.items()):
+			with open(path, "rb") as f:
+				contents = f.read()
+			index[article_id] = [offset, len(contents), hashlib.sha1(contents).hexdigest(), os.path.relpath(path, resources_path).replace(os.sep, "/")]
+			data.append(contents)
+			offset += len(contents)
+		index_serialised = json.dumps(index, separators=(",", ":"), sort_keys=True).encode("utf-8")
+		with open(os.path.join(bundles_path, language + ".bundle"), "wb") as f:
+			f.write(magic)
+			f.write(header.pack(version, len(index_serialised)))
+			f.write(index_serialised)
+			for contents in data:
+				f.write(contents)
+
+class ArticleBundle:
+	"""
+	Reads articles from a memory-mapped bundle file.
+	"""
+
+	def __init__(self, bundle_file: str, resources_path: str) -> None:
+		"""
+		Opens a bundle and reads its index.
+		:param bundle_file: The bundle file to open.
+		:param resources_path: The resources folder of the plug-in, which the
+		paths in the bundle are relative to.
+		:raises OSError: The bundle could not be opened.
+		:raises ValueError: The file is not a bundle, of a different version, or
+		corrupt.
+		"""
+		self._resources_path = resources_path
+		with open(bundle_file, "rb") as f:
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # The map stays valid after closing the file.
+		try:
+			if len(self._map) < len(magic) + header.size or self._map[:len(magic)] != magic:
+				raise ValueError("Not a Settings Guide article bundle.")
+			bundle_version, index_length = header.unpack_from(self._map, len(magic))
+			if bundle_version != version:
+				raise ValueError("The bundle has version {bundle_version}, but expected {version}.".format(bundle_version=bundle_version, version=version))
+			index_start = len(magic) + header.size
+			self._data_start = index_start + index_length
+			if self._data_start > len(self._map):
+				raise ValueError("The index is truncated.")
+			self._index = json.loads(self._map[index_start:self._data_start].decode("utf-8"))  # type: Dict[str, List]
+			self._validate_index(len(self._map) - self._data_start)
+		except ValueError as e:
+			self._map.close()
+			raise ValueError("Unable to read article bundle {file}: {err}".format(file=bundle_file, err=str(e))) from e
+		except Exception:
+			self._map.close()
+			raise
+
+	def _validate_index(self, data_length: int) -> None:
+		"""
+		Check whether the index of the bundle is well-formed, and only refers to
+		data that is in the bundle.
+		:param data_length: The number of bytes of article data in the bundle.
+		:raises ValueError: The index is not well-formed, or the bundle is
+		truncated.
+		"""
+		if not isinstance(self._index, dict):
+			raise ValueError("The index is not a dictionary.")
+		for article_id, entry in self._index.items():
+			if not isinstance(entry, list) or len(entry) != 4 or not all(isinstance(value, int) and value >= 0 for value in entry[:2]) or not all(isinstance(value, str) for value in entry[2:]):
+				raise ValueError("The index entry of {article_id} is malformed.".format(article_id=article_id))
+			if entry[0] + entry[1] > data_length:
+				raise ValueError("The data of {article_id} is truncated.".format(article_id=article_id))
+
+	def signature(self, article_id: str, markdown_file: str) -> Optional[List[str]]:
+		"""
+		Get a signature of the contents of an article in this bundle.
+		:param article_id: The article to get the signature of.
+		:param markdown_file: The file that the article is expected to have been
+		compiled from. If the bundle contains a different file for this article,
+		the bundle can't be used for it.
+		:return: The signature of the article, or `None` if this bundle doesn't
+		contain that article.
+		"""
+		entry = self._index.get(article_id)
+		if entry is None:
+			return None
+		if os.path.normpath(os.path.join(self._resources_path, *entry[3].split("/"))) != os.path.normpath(markdown_file):
+			return None
+		return ["sha1", entry[2]]
+
+	def read(self, article_id: str) -> Optional[str]:
+		"""
+		Read the Markdown source of an article from the bundle.
+		:param article_id: The article to read.
+		:return: The Markdown source of the article, or `None` if this bundle
+		doesn't contain that article.
+		"""
+		entry = self._index.get(article_id)
+		if entry is None:
+			return None
+		start = self._data_start + entry[0]
+		with memoryview(self._map) as view:
+			return str(view[start:start + entry[1]], "utf-8")  # Decode directly from the mapped memory.
+
+	def close(self) -> None:
+		"""
+		Release the memory map of this bundle.
+		"""
+		self._map.close()
+
+if __name__ == "__main__":
+	if len(sys.argv) != 3:
+		print("Usage: python3 ArticleBundle.py <resources folder> <bundles folder>")
+		sys.exit(1)
+	write_bundles(sys.argv[1], sys.argv[2])
@@ -0,0 +1,421 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+import collections  # For OrderedDict, to track which articles were least recently used.
+import json  # The cache is stored in JSON format.
+import os  # To check whether the source files have changed and to store the cache.
+import sys  # To estimate the memory usage of articles.
+import threading  # The cache is accessed from the GUI thread as well as the background loading job.
+from typing import Any, Dict, List, Optional, Tuple
+
+from UM.Logger import Logger
+
+class ArticleDiskCache:
+	"""
+	A persistent cache of rendered articles, stored on disk between sessions.
+
+	Rendering all articles in all languages takes a long time. This cache
+	stores the rendered result of each article, so that the next time Cura
+	starts, the articles only need to be read from the cache rather than
+	parsed again.
+
+	The cache as a whole is only valid for a certain render key. This key
+	contains everything that influences the rendering of all articles, such as
+	the Cura version (for conditional content) and theme properties that end up
+	in the rendered HTML. Each individual article in the cache is only valid as
+	long as its source file wasn't modified.
+
+	The cache file has one line of JSON for each article, after a line with
+	the render key. Only the location of each article in the file is kept in
+	memory, so that this cache doesn't hold on to the rendered articles that
+	the memory cache has evicted. Articles that were added since the cache was
+	last saved are kept in memory until it is saved.
+	"""
+
+	version = 2
+	"""
+	Version number of the cache format.
+
+	Increase this whenever the structure of the cache or the output of the
+	renderer changes, to invalidate the caches of users.
+	"""
+
+	def __init__(self, cache_file: str) -> None:
+		"""
+		Creates a new disk cache, without loading anything yet.
+		:param cache_file: The file path to store the cache in.
+		"""
+		self._cache_file = cache_file
+		self._render_key = {}  # type: Dict[str, Any]  # The settings that the entries in this cache have been rendered with.
+		self._entries = {}  # type: Dict[str, Dict[str, Dict[str, Any]]]  # For each article and language, the source file's metadata and either the position of the rendered results in the cache file or, if not saved yet, the rendered results themselves.
+		self._dirty = False  # Whether there are changes that have not been saved to disk yet.
+		self._lock = threading.Lock()
+
+	def load(self, render_key: Dict[str, Any]) -> None:
+		"""
+		Load the cache from disk.
+
+		If the cache on disk was made with a different render key, it is
+		discarded entirely.
+		:param render_key: A dictionary of all the settings that influence the
+		rendering of articles. Must be serialisable to JSON.
+		"""
+		render_key = dict(render_key)
+		render_key["format"] = self.version
+		entries = {}  # type: Dict[str, Dict[str, Dict[str, Any]]]
+		try:
+			with open(self._cache_file, "rb") as f:
+				header = json.loads(f.readline().decode("utf-8"))
+				if not isinstance(header, dict):
+					raise ValueError("The header is not a dictionary.")
+				if header.get("render_key") == render_key:
+					offset = f.tell()
+					for line in f:
+						try:
+							entry = json.loads(line.decode("utf-8"))
+							entries.setdefault(entry["article_id"], {})[entry["language"]] = {
+								"source": entry["source"],
+								"signature": entry["signature"],
+								"offset": offset
+							}
+						except (ValueError, KeyError, TypeError):  # This entry is corrupt or incomplete. Render the article again.
+							pass
+						offset += len(line)
+				else:
+					Logger.log("i", "Settings Guide article cache is outdated. Articles will be rendered again.")
+		except FileNotFoundError:
+			pass  # No cache yet. Start with an empty one.
+		except (OSError, ValueError) as e:  # Not readable or corrupt. Start with an empty cache.
+			Logger.log("w", "Unable to read Settings Guide article cache: {err}".format(err=str(e)))
+
+		with self._lock:
+			self._render_key = render_key
+			self._entries = entries
+			self._dirty = False
+
+	def get(self, article_id: str, language: str, source_file: str, signature: Optional[List] = None) -> Optional[Tuple[List[List[str]], str]]:
+		"""
+		Get the rendered article from the cache, if it is still valid.
+		:param article_id: The ID of the article to get.
+		:param language: The language of the article to get.
+		:param source_file: The Markdown file that the article is rendered
+		from. If it has been modified since it was cached, the cache entry is
+		no longer valid.
+		:param signature: A signature of the source of the article, if it is not
+		read from the source file directly. If not provided, the signature of
+		the source file is used.
+		:return: A tuple of the article parts and the rich text of the article,
+		or `None` if the article is not in the cache or the cache is outdated.
+		"""
+		if signature is None:
+			signature = self.signature(source_file)
+		try:
+			with self._lock:
+				entry = self._entries.get(article_id, {}).get(language)
+				if entry is None or entry["source"] != source_file or entry["signature"] != signature:
+					return None
+				if "offset" not in entry:  # Not saved yet.
+					return entry["parts"], entry["rich_text"]
+				entry = self._read_entry(entry["offset"])
+			if entry["article_id"] != article_id or entry["language"] != language:  # The file was replaced by a different cache.
+				return None
+			return entry["parts"], entry["rich_text"]
+		except (OSError, ValueError, KeyError, TypeError, AttributeError):  # This entry is corrupt. Render the article again.
+			return None
+
+	def put(self, article_id: str, language: str, source_file: str, parts: List[List[str]], rich_text: str, signature: Optional[List] = None) -> None:
+		"""
+		Store a rendered article in the cache.
+
+		The cache is not saved to disk until `save` is called. Until then, the
+		rendered article is kept in memory.
+		:param article_id: The ID of the article that was rendered.
+		:param language: The language of the article that was rendered.
+		:param source_file: The Markdown file that the article was rendered
+		from.
+		:param parts: The parts of the article, as displayed in the dialogue.
+		:param rich_text: The complete rich text of the article.
+		:param signature: A signature of the source of the article, if it is not
+		read from the source file directly. If not provided, the signature of
+		the source file is used.
+		"""
+		if signature is None:
+			signature = self.signature(source_file)
+		if signature is None:
+			return  # Source file is gone. Can't verify this entry next time, so don't bother storing it.
+		with self._lock:
+			self._entries.setdefault(article_id, {})[language] = {
+				"source": source_file,
+				"signature": signature,
+				"parts": parts,
+				"rich_text": rich_text
+			}
+			self._dirty = True
+
+	def remove(self, article_id: str, language: str) -> None:
+		"""
+		Remove an article from the cache, if it's in there.
+
+		The cache is not saved to disk until `save` is called.
+		:param article_id: The ID of the article to remove.
+		:param language: The language of the article to remove.
+		"""
+		with self._lock:
+			if self._entries.get(article_id, {}).pop(language, None) is not None:
+				self._dirty = True
+
+	def save(self) -> None:
+		"""
+		Write the cache to disk, if anything changed since it was loaded.
+
+		The file is written to a temporary file first and then moved over the
+		old cache, so that a crash halfway through never leaves a corrupt cache.
+		Articles that were already saved are copied from the old cache file.
+		Afterwards, the rendered articles are no longer kept in memory.
+		"""
+		with self._lock:
+			if not self._dirty:
+				return
+			temporary_file = self._cache_file + ".tmp"
+			entries = {}  # type: Dict[str, Dict[str, Dict[str, Any]]]  # The entries as they will be after saving, without the rendered results.
+			try:
+				os.makedirs(os.path.dirname(self._cache_file), exist_ok=True)
+				with open(temporary_file, "wb") as f:
+					f.write(json.dumps({"render_key": self._render_key}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+					for article_id, languages in self._entries.items():
+						for language, entry in languages.items():
+							if "offset" in entry:
+								try:
+									line = self._read_line(entry["offset"])
+								except OSError:  # The old cache file is gone. Render the article again next time.
+									continue
+								if not line.endswith(b"\n"):
+									continue  # Incomplete.
+							else:
+								line = json.dumps({
+									"article_id": article_id,
+									"language": language,
+									"source": entry["source"],
+									"signature": entry["signature"],
+									"parts": entry["parts"],
+									"rich_text": entry["rich_text"]
+								}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+							entries.setdefault(article_id, {})[language] = {
+								"source": entry["source"],
+								"signature": entry["signature"],
+								"offset": f.tell()
+							}
+							f.write(line)
+				os.replace(temporary_file, self._cache_file)
+			except OSError as e:  # Perhaps no rights? Then we'll just render everything again next time.
+				Logger.log("w", "Unable to save Settings Guide article cache: {err}".format(err=str(e)))
+				return
+			self._entries = entries
+			self._dirty = False
+
+	def _read_line(self, offset: int) -> bytes:
+		"""
+		Read the line of an article from the cache file. The lock must be held.
+		:param offset: The position of the line in the cache file.
+		:return: The line, including the line break.
+		"""
+		with open(self._cache_file, "rb") as f:
+			f.seek(offset)
+			return f.readline()
+
+	def _read_entry(self, offset: int) -> Dict[str, Any]:
+		"""
+		Read an article from the cache file. The lock must be held.
+		:param offset: The position of the article in the cache file.
+		:return: The article ID, language, source file, signature, parts and
+		rich text of the article.
+		"""
+		return json.loads(self._read_line(offset).decode("utf-8"))
+
+	@staticmethod
+	def signature(source_file: str) -> Optional[List[int]]:
+		"""
+		Get a cheap signature of a file, indicating whether it has been
+		modified.
+		:param source_file: The file to get the signature of.
+		:return: The modification time (in nanoseconds) and the size of the
+		file, or `None` if the file doesn't exist.
+		"""
+		try:
+			stat = os.stat(source_file)
+		except OSError:
+			return None
+		return [stat.st_mtime_ns, stat.st_size]
+
+class ArticleMemoryCache:
+	"""
+	Keeps the rendered articles in memory, within a memory budget.
+
+	The articles in the active language are always kept in memory, as well as
+	the English articles (since those are the fall-back for articles that are
+	not translated). The articles in other languages are evicted when the
+	cache exceeds its budget, least recently used first. Evicted articles need
+	to be rendered again (or loaded from the disk cache) when they are needed.
+	"""
+
+	def __init__(self, budget: int, active_language: str = "en_US") -> None:
+		"""
+		Creates an empty cache.
+		:param budget: The maximum number of bytes that this cache may use.
+		Articles in the active language and in English may exceed this budget.
+		:param active_language: The language that the user is reading the
+		articles in.
+		"""
+		self._budget = budget
+		self._active_language = active_language
+		self._resident = {}  # type: Dict[Tuple[str, str], Tuple[List[List[str]], str, int]]  # Articles that are never evicted, with their parts, rich text and size.
+		self._evictable = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[str, str], Tuple[List[List[str]], str, int]]  # Articles that can be evicted, least recently used first.
+		self._size = 0  # Total size of all articles in this cache, in bytes.
+		self._lock = threading.Lock()
+
+	@property
+	def size(self) -> int:
+		"""
+		The estimated amount of memory used by the articles in this cache.
+		:return: The size of the cache in bytes.
+		"""
+		return self._size
+
+	@property
+	def active_language(self) -> str:
+		"""
+		The language of which the articles are always kept in memory, besides
+		English.
+		:return: A language code, such as "nl_NL".
+		"""
+		return self._active_language
+
+	def set_active_language(self, language: str) -> None:
+		"""
+		Change which language is always kept in memory.
+
+		The articles of the previously active language become evictable, and
+		may be evicted right away if the cache is over its budget.
+		:param language: The new active language.
+		"""
+		with self._lock:
+			if language == self._active_language:
+				return
+			self._active_language = language
+			for key in [key for key in self._resident if not self._is_resident(key[1])]:
+				self._evictable[key] = self._resident.pop(key)
+			for key in [key for key in self._evictable if self._is_resident(key[1])]:
+				self._resident[key] = self._evictable.pop(key)
+			self._evict()
+
+	def get(self, article_id: str, language: str) -> Optional[List[List[str]]]:
+		"""
+		Get the parts of an article, if it is in memory.
+		:param article_id: The article to get.
+		:param language: The language to get the article in.
+		:return: The parts of the article, or `None` if it is not in memory.
+		"""
+		entry = self._get_entry(article_id, language)
+		return entry[0] if entry is not None else None
+
+	def get_rich_text(self, article_id: str, language: str) -> Optional[str]:
+		"""
+		Get the complete rich text of an article, if it is in memory.
+		:param article_id: The article to get.
+		:param language: The language to get the article in.
+		:return: The rich text of the article, or `None` if it is not in memory.
+		"""
+		entry = self._get_entry(article_id, language)
+		return entry[1] if entry is not None else None
+
+	def put(self, article_id: str, language: str, parts: List[List[str]], rich_text: str) -> None:
+		"""
+		Store a rendered article in memory.
+
+		If this makes the cache exceed its budget, the least recently used
+		articles in other languages are evicted.
+		:param article_id: The ID of the article.
+		:param language: The language of the article.
+		:param parts: The parts of the article, as displayed in the dialogue.
+		:param rich_text: The complete rich text of the article.
+		"""
+		key = (article_id, language)
+		size = self.measure(parts) + self.measure(rich_text)
+		with self._lock:
+			self._remove(key)
+			if self._is_resident(language):
+				self._resident[key] = (parts, rich_text, size)
+			else:
+				self._evictable[key] = (parts, rich_text, size)
+			self._size += size
+			self._evict()
+
+	def remove(self, article_id: str, language: str) -> None:
+		"""
+		Remove an article from memory, if it is there.
+		:param article_id: The ID of the article to remove.
+		:param language: The language of the article to remove.
+		"""
+		with self._lock:
+			self._remove((article_id, language))
+
+	@classmethod
+	def measure(cls, value: Any) -> int:
+		"""
+		Estimate the amount of memory used by a string or a nested list of
+		strings, including the lists themselves.
+		:param value: The string or list to measure.
+		:return: The estimated size in bytes.
+		"""
+		size = sys.getsizeof(value)
+		if isinstance(value, (list, tuple)):
+			size += sum(cls.measure(item) for item in value)
+		return size
+
+	def _get_entry(self, article_id: str, language: str) -> Optional[Tuple[List[List[str]], str, int]]:
+		"""
+		Get an article from memory, marking it as recently used.
+		:param article_id: The article to get.
+		:param language: The language to get the article in.
+		:return: The parts, rich text and size of the article, or `None` if it
+		is not in memory.
+		"""
+		key = (article_id, language)
+		with self._lock:
+			if key in self._resident:
+				return self._resident[key]
+			if key in self._evictable:
+				self._evictable.move_to_end(key)
+				return self._evictable[key]
+		return None
+
+	def _is_resident(self, language: str) -> bool:
+		"""
+		Whether the articles in a certain language are always kept in memory.
+		:param language: The language to check.
+		:return: `True` if articles in that language are never evicted.
+		"""
+		return language == self._active_language or language == "en_US"
+
+	def _remove(self, key: Tuple[str, str]) -> None:
+		"""
+		Remove an article from memory. The lock must be held.
+		:param key: The article ID and language of the article to remove.
+		"""
+		entry = self._resident.pop(key, None)
+		if entry is None:
+			entry = self._evictable.pop(key, None)
+		if entry is not None:
+			self._size -= entry[2]
+
+	def _evict(self) -> None:
+		"""
+		Evict the least recently used articles until the cache is within its
+		budget, or until only articles that are always kept are left. The lock
+		must be held.
+		"""
+		while self._size > self._budget and self._evictable:
+			_, entry = self._evictable.popitem(last=False)
+			self._size -= entry[2]
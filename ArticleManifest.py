@@ -0,0 +1,164 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module finds the article files of the guide, and creates a manifest that lists them.
+
+Walking through all of the article folders takes a while, especially if the plug-in is installed on a slow or network
+drive. When packaging the plug-in, a manifest is created that lists all articles with their location in every language.
+The plug-in can then read this manifest in one go.
+
+The manifest is only made when packaging. To notice articles that were added, removed or renamed after packaging, the
+manifest also stores a checksum of the file names in every article folder. Listing one folder is much cheaper than
+searching for the articles, and if any folder has changed, the plug-in searches for the articles instead. Changes to the
+contents of the articles don't matter here, since the manifest only lists where they are.
+
+This module doesn't depend on anything but Python itself, so that it can be executed during packaging:
+`python3 ArticleManifest.py <resources folder> <manifest file>`
+"""
+
+import json  # The manifest is stored in JSON format.
+import os  # To find the articles.
+import sys  # To get the command line arguments when building the manifest.
+import zlib  # To compute checksums of the file names in the article folders.
+from typing import Any, Dict, Optional, Set
+
+version = 2  # Version number of the manifest format. Manifests of a different version are ignored.
+
+def walk_articles(resources_path: str) -> Dict[str, Dict[str, str]]:
+	"""
+	For each article and language, find where the Markdown file is located by
+	searching through the resources folder.
+	:param resources_path: The resources folder of the plug-in.
+	:return: A nested dictionary mapping article ID to language to file path.
+	"""
+	result = {}
+	# Find the English translations first.
+	for root, _, files in os.walk(os.path.join(resources_path, "articles")):
+		for filename in files:
+			base_name, extension = os.path.splitext(filename)
+			if extension != ".md":
+				continue  # Only interested in article files.
+			result[base_name] = {"en_US": os.path.join(root, filename)}
+
+	# Find the translated articles in the translations folder.
+	for language in os.listdir(os.path.join(resources_path, "translations")):
+		language_path = os.path.join(resources_path, "translations", language)
+		if not os.path.isdir(language_path):
+			continue  # Not a translation folder.
+		for root, _, files in os.walk(language_path):
+			for filename in files:
+				base_name, extension = os.path.splitext(filename)
+				if extension != ".md":
+					continue  # Only interested in article files.
+				if base_name not in result:
+					continue  # Translation for an article that doesn't exist in English?
+				result[base_name][language] = os.path.join(root, filename)
+
+	return result
+
+def build_manifest(resources_path: str) -> Dict[str, Any]:
+	"""
+	Create a manifest of all articles in the resources folder.
+
+	The manifest lists, for each article and language, the path to the article
+	relative to the resources folder.
+	:param resources_path: The resources folder of the plug-in.
+	:return: The manifest, as a JSON-serialisable document.
+	"""
+	articles = {}
+	for article_id, languages in walk_articles(resources_path).items():
+		articles[article_id] = {}
+		for language, path in languages.items():
+			articles[article_id][language] = {
+				"path": os.path.relpath(path, resources_path).replace(os.sep, "/")
+			}
+	return {
+		"version": version,
+		"languages": sorted(translation_languages(resources_path)),
+		"folders": folder_checksums(resources_path),
+		"articles": articles
+	}
+
+def folder_checksums(resources_path: str) -> Dict[str, int]:
+	"""
+	Compute a checksum of the file names in every folder that contains
+	articles.
+
+	If a file or folder is added, removed or renamed, the checksum of the
+	folder containing it changes.
+	:param resources_path: The resources folder of the plug-in.
+	:return: For each folder, relative to the resources folder, the checksum of
+	the names in it.
+	"""
+	result = {}
+	for root_folder in ["articles", "translations"]:
+		for root, _, _ in os.walk(os.path.join(resources_path, root_folder)):
+			folder = os.path.relpath(root, resources_path).replace(os.sep, "/")
+			result[folder] = folder_checksum(root)
+	return result
+
+def folder_checksum(path: str) -> int:
+	"""
+	Compute a checksum of the file names in a folder.
+	:param path: The folder to compute the checksum of.
+	:return: A checksum of the names of the files and subfolders in the folder.
+	"""
+	return zlib.crc32("\n".join(sorted(os.listdir(path))).encode("utf-8"))
+
+def translation_languages(resources_path: str) -> Set[str]:
+	"""
+	List the languages that the guide has translations for.
+	:param resources_path: The resources folder of the plug-in.
+	:return: A set of language codes.
+	"""
+	translations_path = os.path.join(resources_path, "translations")
+	return {language for language in os.listdir(translations_path) if os.path.isdir(os.path.join(translations_path, language))}
+
+def write_manifest(resources_path: str, manifest_file: str) -> None:
+	"""
+	Create a manifest of all articles in the resources folder and save it.
+	:param resources_path: The resources folder of the plug-in.
+	:param manifest_file: The file to save the manifest in.
+	"""
+	manifest = build_manifest(resources_path)
+	with open(manifest_file, "w", encoding="utf-8") as f:
+		json.dump(manifest, f, separators=(",", ":"), sort_keys=True)
+
+def read_manifest(resources_path: str, manifest_file: str) -> Optional[Dict[str, Dict[str, str]]]:
+	"""
+	Read the article locations from a manifest.
+
+	The manifest is considered stale if it has a different format, or if any
+	of the article folders or translation folders has changed since the
+	manifest was made. This lists every folder once, but doesn't need to look
+	at the articles themselves.
+	:param resources_path: The resources folder of the plug-in.
+	:param manifest_file: The file that the manifest is stored in.
+	:return: A nested dictionary mapping article ID to language to file path,
+	or `None` if the manifest is missing or stale.
+	"""
+	try:
+		with open(manifest_file, encoding="utf-8") as f:
+			manifest = json.load(f)
+		if manifest.get("version") != version:
+			return None
+		if set(manifest["languages"]) != translation_languages(resources_path):
+			return None
+		for folder, checksum in manifest["folders"].items():
+			if folder_checksum(os.path.join(resources_path, *folder.split("/"))) != checksum:
+				return None  # Articles were added, removed or renamed.
+		result = {}
+		for article_id, languages in manifest["articles"].items():
+			result[article_id] = {language: os.path.join(resources_path, *entry["path"].split("/")) for language, entry in languages.items()}
+		return result
+	except (OSError, ValueError, KeyError, AttributeError, TypeError):  # Missing or corrupt.
+		return None
+
+if __name__ == "__main__":
+	if len(sys.argv) != 3:
+		print("Usage: python3 ArticleManifest.py <resources folder> <manifest file>")
+		sys.exit(1)
+	write_manifest(sys.argv[1], sys.argv[2])
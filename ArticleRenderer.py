@@ -0,0 +1,237 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module converts the Markdown of articles into the data structures that the Settings Guide displays.
+
+Nothing in this module accesses Qt or any of Cura's singletons. Everything that the rendering depends on is passed as
+plain data via RenderSettings. This allows the articles to be rendered in a separate process.
+
+The Markdown parser is only imported when the first article gets rendered. Many articles are loaded from the cache, so
+the parser might not be needed at all.
+"""
+
+import collections  # For namedtuple.
+import itertools  # To pass the same render settings to every parallel task.
+import os.path  # To find the images relative to the articles.
+import pathlib  # To convert image paths to file URLs.
+import re  # To get images and checkboxes from the articles.
+import threading  # Mistune's parsers keep state while parsing, so each thread needs its own.
+import urllib.parse  # For unquote_plus to create preference keys for forms.
+from typing import Iterator, List, Optional, Tuple, Union
+
+RenderSettings = collections.namedtuple("RenderSettings", ["link_colour", "image_width", "cura_version", "platform"])
+"""
+All of the properties of the environment that influence how articles are rendered.
+* link_colour: The colour to draw hyperlinks with, as HTML colour code.
+* image_width: The width of images embedded in rich text, in whole pixels.
+* cura_version: The Cura version to show conditional content for.
+* platform: The operating system to show conditional content for, as given by `platform.system().lower()`.
+"""
+
+find_images = re.compile(r"!\[(.*)\]\(([^\)]+)\)")
+find_checkboxes = re.compile(r"\[ \]\s*([^\n]+)")
+find_comments = re.compile(r"<!--.*?-->", flags=re.DOTALL)
+find_hyperlinks = re.compile(r"(?:<a href=\".*\">|</a>)")
+
+_local = threading.local()  # Per thread, the Markdown parsers for each images directory and render settings.
+
+def _get_markdown(images_path: str, settings: RenderSettings) -> "mistune.Markdown":
+	"""
+	Get a Markdown parser that renders with the Qt renderer.
+
+	For each directory containing Markdown files, one renderer is created that
+	correctly dereferences images relatively.
+	:param images_path: The directory that relative paths in the Markdown are
+	relative to.
+	:param settings: The settings to render with.
+	:return: A Markdown parser.
+	"""
+	if not hasattr(_local, "markdown_per_folder"):
+		_local.markdown_per_folder = {}
+	key = (images_path, settings)
+	if key not in _local.markdown_per_folder:
+		from .Mistune import mistune  # To parse the Markdown files.
+		from . import QtMarkdownRenderer  # To match Mistune's output to Qt's supported HTML subset.
+		renderer = QtMarkdownRenderer.QtMarkdownRenderer(images_path, settings.link_colour, settings.image_width)
+		_local.markdown_per_folder[key] = mistune.Markdown(renderer=renderer)  # Renders the Markdown articles into the subset of HTML supported by Qt.
+	return _local.markdown_per_folder[key]
+
+def _get_description_markdown() -> "mistune.Markdown":
+	"""
+	Get a Markdown parser with the default renderer, to render the
+	descriptions of images with.
+	:return: A Markdown parser.
+	"""
+	if not hasattr(_local, "description_markdown"):
+		from .Mistune import mistune  # To parse the descriptions.
+		_local.description_markdown = mistune.Markdown()
+	return _local.description_markdown
+
+def render_article(markdown_str: str, images_path: str, settings: RenderSettings, language: str = "en_US") -> Tuple[List[List[str]], str]:
+	"""
+	Render the Markdown of an article.
+
+	The article is rendered in a single pass. It gets split into pieces of
+	text, images and checkboxes, and each piece gets rendered once. The same
+	rendered pieces are used for the parts that are displayed in the dialogue
+	and for the complete rich text that is displayed in the tooltips.
+	:param markdown_str: The Markdown source of the article.
+	:param images_path: The directory that relative paths in the Markdown are
+	relative to.
+	:param settings: The settings to render with.
+	:param language: The language of the article, for conditional content.
+	:return: A tuple of two items. The first is a list of article "parts". Each
+	article part is a list, where the first element indicates the type of part
+	and the rest contains the content. Possible types of parts are
+	"rich_text", "images" or "checkbox". The second is the complete rich text
+	of the article, to show in tooltips.
+	"""
+	from .Mistune import mistune  # To escape the labels of checkboxes.
+	from . import QtMarkdownRenderer  # To process conditional content.
+	markdown = _get_markdown(images_path, settings)
+	description_markdown = _get_description_markdown()
+	variables = {"cura_version": settings.cura_version, "language": language, "platform": settings.platform}
+	markdown_str = QtMarkdownRenderer.QtMarkdownRenderer.preprocess_conditionals(markdown_str, variables)  # Once for the whole article, so that the pieces don't need to be pre-processed separately.
+
+	image_description = None
+	parts = []  # type: List[List[str]]  # List of items in the article. Each item starts with a type ID, and then a variable number of data items.
+	rich_text_pieces = []  # type: List[Union[str, List[str]]]  # The pieces of the complete rich text. Rows of images are lists of <img> tags, to be put in a paragraph together.
+	for index, part_between_images in enumerate(find_images.split(markdown_str)):
+		# The parts of the regex split alternate between text, image description and image URL.
+		if index % 3 == 0:
+			part_between_images = part_between_images.strip()
+			if part_between_images or index == 0:
+				parts_between_checkboxes = find_checkboxes.split(part_between_images)
+				for index2, part_between_checkboxes in enumerate(parts_between_checkboxes):
+					part_between_checkboxes = part_between_checkboxes.strip()
+					# The parts of the regex split alternate between text and checkbox description.
+					if index2 % 2 == 0:
+						if part_between_checkboxes:
+							rich_text = markdown(part_between_checkboxes)
+							parts.append(["rich_text", rich_text])
+							rich_text_pieces.append(rich_text)
+					else:  # if index2 == 1:
+						preference_key = "settings_guide/" + urllib.parse.quote_plus(part_between_checkboxes).lower()
+						parts.append(["checkbox", preference_key, part_between_checkboxes])
+						rich_text_pieces.append("<p>[ ] " + mistune.escape(part_between_checkboxes) + "</p>\n")
+		elif index % 3 == 1:
+			image_description = description_markdown(part_between_images)
+		else:  # if index % 3 == 2:
+			if image_description is not None:
+				if not parts or parts[-1][0] != "images":  # List of images.
+					parts.append(["images"])
+					rich_text_pieces.append([])
+				image_url = os.path.join(images_path, part_between_images)
+				parts[-1].append(pathlib.Path(image_url).as_uri() + "|" + image_description)
+				rich_text_pieces[-1].append(markdown.renderer.image(part_between_images, None, None))
+				image_description = None
+
+	rich_text = "".join(piece if isinstance(piece, str) else "<p>" + "\n".join(piece) + "</p>\n" for piece in rich_text_pieces)
+	return parts, rich_text
+
+def render_file(article_id: str, language: str, markdown_file: str, settings: RenderSettings) -> Optional[Tuple[str, str, List[List[str]], str]]:
+	"""
+	Read and render an article from a file.
+
+	This is the entry point for rendering articles in a separate process. All
+	arguments and results are plain data, so they can be transferred between
+	processes.
+	:param article_id: The ID of the article to render.
+	:param language: The language of the article to render.
+	:param markdown_file: The file to read the Markdown source from.
+	:param settings: The settings to render with.
+	:return: A tuple of the article ID, the language, the article parts and
+	the complete rich text of the article, or `None` if the file could not be
+	read.
+	"""
+	try:
+		with open(markdown_file, encoding="utf-8") as f:
+			markdown_str = f.read()
+	except OSError:  # File doesn't exist or is otherwise not readable. Let the main process deal with it.
+		return None
+	parts, rich_text = render_article(markdown_str, os.path.dirname(markdown_file), settings, language)
+	return article_id, language, parts, rich_text
+
+def render_files(tasks: List[Tuple[str, str, str]], settings: RenderSettings, max_workers: Optional[int] = None) -> Iterator[Optional[Tuple[str, str, List[List[str]], str]]]:
+	"""
+	Read and render a number of articles, spread over multiple processes.
+
+	Rendering articles is pure Python, so on a single thread it can only use
+	one core. The worker processes are not forked from Cura, since forking a
+	process with many threads can leave the children stuck on locks held by
+	other threads. Instead, they are forked from a fork server: a fresh Python
+	process that only imports this module (and with it Mistune and Uranium's
+	logger and version numbers).
+
+	This requires a platform with a fork server (not Windows), and a Python
+	interpreter to start it with. If Cura is frozen into an executable, there
+	is no separate interpreter.
+	:param tasks: For each article to render, its ID, its language and the file
+	to read the Markdown source from.
+	:param settings: The settings to render with.
+	:param max_workers: The number of processes to render with. By default, one
+	per CPU.
+	:return: For each task, in order, the result of `render_file`.
+	"""
+	import concurrent.futures  # To render articles in parallel. Only imported when rendering in parallel.
+	import multiprocessing  # To start the fork server.
+	import site  # To let the workers find this plug-in.
+
+	if not tasks:
+		return
+	context = multiprocessing.get_context("forkserver")
+	context.set_forkserver_preload([__name__])  # Don't import Cura's main script in the fork server. If the fork server can't find this module, each worker imports it instead.
+	max_workers = max_workers or os.cpu_count() or 1
+	chunk_size = max(1, len(tasks) // (max_workers * 4))  # Big enough chunks to limit the overhead of communication, but small enough to balance the load.
+	article_ids, languages, markdown_files = zip(*tasks)
+
+	# The workers get Cura's Python path from the parent process, but Cura finds its plug-ins without putting their folder on the Python path.
+	# The initializer runs before the first task is unpickled, so it must itself be importable without that folder.
+	plugins_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=site.addsitedir, initargs=(plugins_path, )) as pool:
+		yield from pool.map(render_file, article_ids, languages, markdown_files, itertools.repeat(settings), chunksize=chunk_size)
+
+def preprocess_tooltip(original_text: str) -> str:
+	"""
+	Preprocess the articles for display in tooltips.
+
+	The tooltips need slightly different formatting. This function transforms text for display in the tooltips.
+	:param original_text: Rich text that is being displayed in the main articles.
+	:return: Rich text that can be displayed in the tooltips.
+	"""
+	# Remove all hyperlinks from this text.
+	# Hyperlinks don't work when clicked on here (Cura's tooltip display code won't activate weblinks, and it can't open up the Settings Guide to display different articles).
+	# However they do break through having a different colour in system-styled tooltips in the setting visibility list.
+	return find_hyperlinks.sub("", original_text)
+
+def render_digest(parts: List[List[str]], settings: RenderSettings) -> str:
+	"""
+	Create a short summary of a rendered article, to show in tooltips.
+
+	The summary contains the first section of the article: everything up to
+	the first subheading, or up to the text following the first row of images.
+	Only the first image is included, and it's shown at half of the normal
+	width. Comments, such as screenshot instructions, are left out.
+	:param parts: The rendered parts of the article.
+	:param settings: The settings that the article was rendered with.
+	:return: Rich text containing the summary of the article.
+	"""
+	pieces = []
+	image_url = None
+	for part in parts:
+		if part[0] == "rich_text":
+			if image_url is not None:
+				break  # The first section ends with its first image.
+			subheading = part[1].find("<h2")
+			if subheading >= 0:
+				pieces.append(part[1][:subheading])
+				break
+			pieces.append(part[1])
+		elif part[0] == "images" and image_url is None:
+			image_url = part[1].split("|", 1)[0]
+	if image_url is not None:
+		pieces.append("<p><img src=\"{image_url}\" width=\"{width}\" /></p>\n".format(image_url=image_url, width=settings.image_width // 2))
+	return find_comments.sub("", "".join(pieces))
@@ -5,32 +5,38 @@
 #You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
 
 import os  # To find the article files and other resources.
-import urllib.parse  # For unquote_plus to create preference keys for forms.
-from PyQt5.QtCore import pyqtSlot, pyqtProperty, pyqtSignal, QSizeF, QObject, QUrl  # To expose data to the GUI and adjust the size of setting tooltips.
+import platform  # To show conditional content for the operating system.
+from PyQt5.QtCore import pyqtSlot, pyqtProperty, pyqtSignal, QFileSystemWatcher, QSizeF, QObject, QTimer, QUrl  # To expose data to the GUI, adjust the size of setting tooltips and watch the articles for changes.
 import re  # To get images from the descriptions.
 import shutil  # To copy the theme.
+import sys  # To check whether rendering in parallel is supported.
 import threading  # Screenshot refresh is done on a separate thread.
-from typing import Dict, List, Optional
+import time  # To measure how long it takes to render articles.
+from typing import Any, Callable, Dict, List, Match, Optional, Set
 
 from cura.CuraApplication import CuraApplication  # To get the setting version to load the correct definition file, and to create QML components.
+from cura.Settings.GlobalStack import GlobalStack  # Type hint for the stack that the tooltips are installed in.
 from UM.Extension import Extension  # We're implementing a Cura extension.
 from UM.Logger import Logger
 from UM.Job import Job  # To load articles as a background task.
 from UM.JobQueue import JobQueue  # To load articles as a background task.
 from UM.PluginRegistry import PluginRegistry  # To find the path of the resources.
 from UM.Qt.Bindings.PointingRectangle import PointingRectangle  # To adjust the width of setting tooltips.
+from UM.Qt.Bindings.Theme import Theme  # To get the theme properties that the articles are rendered with.
 from UM.Resources import Resources  # To find the themes in order to adjust them.
 from UM.Settings.ContainerRegistry import ContainerRegistry  # To register the non-setting entries.
 from UM.Settings.DefinitionContainer import DefinitionContainer  # To register the non-setting entries.
 
+from . import ArticleBundle  # To read the articles from bundles compiled during packaging.
+from . import ArticleCache  # To store rendered articles between sessions.
+from . import ArticleManifest  # To find the article files.
+from . import ArticleRenderer  # To render the articles to rich text.
+from . import ImageProvider  # To decode the images of the articles in the background.
+from . import LinkGraph  # To find which articles link to each other.
 from . import MenuItemHandler  # To register the context menu item in the settings list.
-from . import QtMarkdownRenderer  # To match Mistune's output to Qt's supported HTML subset.
-try:
-	from . import ScreenshotTool  # To refresh screenshots using the Cura client.
-	has_screenshot_tool = True
-except ImportError:
-	has_screenshot_tool = False
-from .Mistune import mistune  # To parse the Markdown files.
+from . import SearchIndex  # To search through the articles.
+from . import ThumbnailCache  # To show the images at the size at which they are displayed.
+from . import Timing  # To measure how long loading the guide takes.
 
 class CuraSettingsGuide(Extension, QObject):
 	"""
@@ -61,13 +67,26 @@ class CuraSettingsGuide(Extension, QObject):
 		self._dialog = None  # Cached instance of the dialogue window.
 		self.definition_container = None  # Setting definitions that provide not only the normal settings but also the extra articles added by this guide.
 
-		self._markdown_per_folder = {}  # For each directory containing Markdown files, create one renderer that correctly dereferences images relatively.
-
-		self.articles = {}  # type: Dict[str, Dict[str, List[List[str]]]]  # All of the articles by key and language. Key: article ID, value: Dict with language as key and lists of items in each article as value.
-		self.articles_rich_text = {}  # type: Dict[str, Dict[str, str]]  # For each article and language, the complete Rich Text that should get shown in the tooltip.
-		self.load_definitions()
-		self.article_locations = self.find_articles()
+		self._render_settings = None  # type: Optional[ArticleRenderer.RenderSettings]  # Theme properties and Cura version to render the articles with. Only available once the theme is loaded.
+		self._disk_cache = ArticleCache.ArticleDiskCache(os.path.join(Resources.getCacheStoragePath(), "settings_guide", "articles.json"))  # Rendered articles from previous sessions.
+		self._sidebar_order = []  # type: List[str]  # The article IDs in the order in which they are listed in the sidebar. Made when first needed.
+		self.link_graph = LinkGraph.LinkGraph()  # Which articles link to which other articles. Empty until the articles are loaded.
+		self._search_index = SearchIndex.SearchIndex(os.path.join(Resources.getCacheStoragePath(), "settings_guide", "search_index.json"))  # To search through the text of all articles.
+		self._thumbnail_cache = ThumbnailCache.ThumbnailCache(os.path.join(Resources.getCacheStoragePath(), "settings_guide", "thumbnails"))  # Scaled-down versions of the images in the articles.
+		self._loaded_languages = set()  # type: Set[str]  # The languages for which all articles have been loaded.
+		self._tooltips = {}  # type: Dict[str, Dict[str, str]]  # For each language and article, the text to show in the setting tooltip. Only for the active language and English.
+		self._installed_tooltips = {}  # type: Dict[str, str]  # For each setting, the tooltip text that is currently installed in its definition.
+		self._installed_tooltips_definition = ""  # The ID of the definition that the tooltips are installed in.
+		self._bundles = {}  # type: Dict[str, Optional[ArticleBundle.ArticleBundle]]  # For each language, the bundle to read the articles from, or None if there is no usable bundle.
+		with Timing.measure("load_definitions"):
+			self.load_definitions()
+		self._articles_from_manifest = False  # Whether the article locations were read from the manifest, which could be outdated.
+		with Timing.measure("find_articles"):
+			self.article_locations = self.find_articles()
 		self._selected_article_id = ""  # Which article is currently shown for the user. Empty string indicates it's the welcome screen.
+		self._watcher = None  # type: Optional[QFileSystemWatcher]  # Watches the article files for changes, if watch mode is enabled.
+		self._reload_timer = None  # type: Optional[QTimer]  # Waits until the files stop changing before reloading them.
+		self._changed_paths = set()  # type: Set[str]  # Files and folders that changed since the articles were last reloaded.
 
 		# Add context menu item to the settings list to open the guide for that setting.
 		application = CuraApplication.getInstance()
@@ -81,12 +100,25 @@ class CuraSettingsGuide(Extension, QObject):
 		preferences = application.getPreferences()
 		preferences.addPreference("settings_guide/language", "cura_default")
 		preferences.addPreference("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29", True)
+		preferences.addPreference("settings_guide/show+only+a+summary+in+setting+tooltips", True)
 		preferences.addPreference("settings_guide/window+always+in+front", False)
 		preferences.addPreference("settings_guide/screenshot_tool", False)
+		preferences.addPreference("settings_guide/parallel_loading", False)
+		preferences.addPreference("settings_guide/watch_articles", False)
+		preferences.addPreference("settings_guide/memory_budget", 8 * 1024 * 1024)
+		preferences.addPreference("settings_guide/image_memory_budget", 64 * 1024 * 1024)
+
+		self.articles = ArticleCache.ArticleMemoryCache(int(preferences.getValue("settings_guide/memory_budget")))  # All of the rendered articles by key and language, as far as they fit in the memory budget.
+		self._image_provider = ImageProvider.ImageProvider(self._thumbnail_cache, int(preferences.getValue("settings_guide/image_memory_budget")))  # Decoded images, shared between the dialogue and the tooltips.
 
-		self.adjust_theme()
+		preferences.preferenceChanged.connect(self.preference_changed)
+
+		with Timing.measure("adjust_theme"):
+			self.adjust_theme()
 		application.initializationFinished.connect(self.load_all_in_background)
 		application.initializationFinished.connect(self.widen_tooltips)
+		application.initializationFinished.connect(self.register_image_provider)
+		application.initializationFinished.connect(self.start_watching)
 
 	def adjust_theme(self):
 		"""
@@ -116,29 +148,47 @@ class CuraSettingsGuide(Extension, QObject):
 
 		This really only works in Qt 5.14 and higher, so only Cura 4.9 and up can enjoy the wider tooltips.
 		"""
-		application = CuraApplication.getInstance()
-		if application.getPreferences().getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
-			main_window = application._qml_engine.rootObjects()[0]
-			tooltips = main_window.findChildren(PointingRectangle)  # There are multiple instances of this (currently 3). It's indistinguishable which is the setting tooltip. Collateral damage!
-			for tooltip in tooltips:
-				tooltip.setWidth(tooltip.width() * 2.5)
+		with Timing.measure("widen_tooltips"):
+			application = CuraApplication.getInstance()
+			if application.getPreferences().getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
+				main_window = application._qml_engine.rootObjects()[0]
+				tooltips = main_window.findChildren(PointingRectangle)  # There are multiple instances of this (currently 3). It's indistinguishable which is the setting tooltip. Collateral damage!
+				for tooltip in tooltips:
+					tooltip.setWidth(tooltip.width() * 2.5)
+
+	def register_image_provider(self) -> None:
+		"""
+		Make the images of the articles available to QML through the image
+		provider.
+		"""
+		CuraApplication.getInstance()._qml_engine.addImageProvider(ImageProvider.provider_id, self._image_provider)
 
 	def load_all_in_background(self):
 		"""
 		Runs the load_all() function as a background task.
 		"""
+		self.run_in_background(self.load_all)
+
+	def run_in_background(self, function: Callable[..., None], *args) -> None:
+		"""
+		Runs a function as a background task.
+		:param function: The function to run.
+		:param args: The arguments to call the function with.
+		"""
 		class ArticleLoadJob(Job):
 			"""
-			A background task that loads all articles of the guide.
+			A background task that loads articles of the guide.
 			"""
 
-			def __init__(self, guide):
+			def __init__(self, function, args):
 				"""
 				Creates the background task.
-				:param guide: The CuraSettingsGuide object which has the
-				function to call.
+				:param function: The function to call.
+				:param args: The arguments to call the function with.
 				"""
-				self.guide = guide
+				super().__init__()
+				self.function = function
+				self.args = args
 
 			def run(self):
 				"""
@@ -146,25 +196,176 @@ class CuraSettingsGuide(Extension, QObject):
 
 				Cura will call this function from a different thread.
 				"""
-				self.guide.load_all()
-		JobQueue.getInstance().add(ArticleLoadJob(self))
-
+				self.function(*self.args)
+		JobQueue.getInstance().add(ArticleLoadJob(function, args))
 
 	def load_all(self):
 		"""
-		Pre-cache all articles in all languages.
+		Pre-cache all articles in the active language.
 
 		This is meant to run as a background task. This makes sure all setting
 		descriptions are loaded so that they can load faster next time the
 		article is requested. It also makes sure that the setting description
 		is correctly displayed (after a while).
+
+		The articles in the categories that are currently expanded get loaded
+		first, since those are the ones the user is most likely to look at. The
+		tooltips are installed as soon as the active language is loaded. Other
+		languages are only loaded when the user switches to them.
+
+		Articles that were rendered in previous sessions are taken from the disk
+		cache, and newly rendered articles are stored in it.
+		"""
+		with Timing.measure("load_all"):
+			self._disk_cache.load(self.render_key())
+			self._search_index.load()
+			self.link_graph = LinkGraph.LinkGraph.build(self.article_locations, lambda article_id: self._read_source(article_id, "en_US"))
+			self.load_language(self.active_language())
+		Logger.log("i", "Finished loading Settings Guide articles. They take up about {size} kB of memory.".format(size=self.articles.size // 1024))
+		Timing.log_report()
+		Timing.save(os.path.join(Resources.getCacheStoragePath(), "settings_guide", "timings.json"))
+
+	def load_language(self, language: str) -> None:
+		"""
+		Load all articles in a certain language, and install them in the
+		tooltips.
+
+		Articles that are not available in this language are loaded in English.
+		:param language: The language to load.
 		"""
-		for article_id in self.article_locations:
-			for language in self.article_locations[article_id]:
-				self._getArticle(article_id, language)  # Load articles one by one.
+		self.articles.set_active_language(language)
+		expanded_articles = self.expanded_articles()
+		article_ids = sorted(self.article_locations, key=lambda article_id: article_id not in expanded_articles)  # Stable sort, so the expanded categories go first but the order is otherwise maintained.
+		if CuraApplication.getInstance().getPreferences().getValue("settings_guide/parallel_loading"):
+			self.load_all_parallel(article_ids, language)
+		for article_id in article_ids:
+			self._getArticle(article_id, language)  # Load articles one by one. Anything loaded in parallel is skipped here.
+		self._loaded_languages.add(language)
+		self._disk_cache.save()
+		self._search_index.save()
 		if CuraApplication.getInstance().getPreferences().getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
 			self.set_tooltips()
-		Logger.log("i", "Finished loading Settings Guide articles.")
+		self.create_thumbnails(article_ids, language)  # Then they don't need to be created when they are first displayed.
+
+	grid_thumbnail_height = 200  # The height of the images in the grid of images in an article.
+
+	def create_thumbnails(self, article_ids: List[str], language: str) -> None:
+		"""
+		Create thumbnails of the images in some articles, at the sizes at which
+		they are displayed in the dialogue and in the tooltips.
+
+		The articles must already be loaded. Articles that aren't loaded are
+		skipped.
+		:param article_ids: The articles to create thumbnails for.
+		:param language: The language of the articles.
+		"""
+		tooltip_width = self.render_settings().image_width
+		for article_id in article_ids:
+			article_language = language if language in self.article_locations.get(article_id, {}) else "en_US"
+			parts = self.articles.get(article_id, article_language)
+			if parts is None:
+				continue
+			for part in parts:
+				if part[0] != "images":
+					continue
+				for image in part[1:]:
+					image_file = QUrl(image.split("|", 1)[0]).toLocalFile()
+					self._thumbnail_cache.create(image_file, 0, self.grid_thumbnail_height)
+					self._thumbnail_cache.create(image_file, tooltip_width, 0)
+
+	def expanded_articles(self) -> Set[str]:
+		"""
+		Get the articles in the setting categories that are currently expanded.
+		:return: The IDs of the articles in the expanded categories.
+		"""
+		result = set()
+		if not self.definition_container:
+			return result
+		for category in CuraApplication.getInstance().expandedCategories:
+			for definition in self.definition_container.findDefinitions(key=category):
+				result |= definition.getAllKeys()
+		return result
+
+	def load_all_parallel(self, article_ids: List[str], language: str) -> None:
+		"""
+		Render the articles that are not cached yet, spread over multiple
+		processes.
+
+		The articles are rendered by worker processes that only contain the
+		renderer. It gets everything it needs from the theme as plain data. The
+		results are merged back into the article caches here.
+
+		This needs a fork server and a Python interpreter to start the workers
+		with. On Windows and in frozen builds of Cura, this does nothing and the
+		articles get rendered on this thread instead.
+		:param article_ids: The articles to render, in order of priority.
+		:param language: The language to render the articles in. Articles that
+		are not available in this language are rendered in English.
+		"""
+		import concurrent.futures  # To detect crashed worker processes. Only imported when parallel loading is enabled.
+		import multiprocessing  # To check whether rendering in parallel is supported.
+		if "forkserver" not in multiprocessing.get_all_start_methods() or getattr(sys, "frozen", False):
+			Logger.log("i", "Parallel loading of Settings Guide articles is not supported on this platform.")
+			return
+
+		settings = self.render_settings()
+		tasks = []  # Tuples of article ID, language and file path of all articles that still need to be rendered.
+		signatures = {}  # For each article and language that still needs to be rendered, the signature of its source.
+		for article_id in article_ids:
+			article_language = language if language in self.article_locations[article_id] else "en_US"
+			if self.articles.get(article_id, article_language) is not None:
+				continue  # Already loaded.
+			markdown_file = self.article_locations[article_id][article_language]
+			signature = self._source_signature(article_id, article_language, markdown_file)
+			cached = self._disk_cache.get(article_id, article_language, markdown_file, signature)
+			if cached is not None:
+				self._store_article(article_id, article_language, *cached)
+				continue
+			tasks.append((article_id, article_language, markdown_file))
+			signatures[(article_id, article_language)] = signature
+
+		try:
+			for result in ArticleRenderer.render_files(tasks, settings):
+				if result is None:
+					continue  # Couldn't read the file. Loading it on this thread will fall back to the setting description.
+				article_id, language, parts, rich_text = result
+				self._store_article(article_id, language, parts, rich_text, self.article_locations[article_id][language], signatures[(article_id, language)])
+		except (OSError, concurrent.futures.BrokenExecutor) as e:  # Couldn't start the processes, or they crashed. The remainder gets rendered on this thread.
+			Logger.log("w", "Unable to load Settings Guide articles in parallel: {err}".format(err=str(e)))
+
+	def render_settings(self) -> ArticleRenderer.RenderSettings:
+		"""
+		Get all of the properties of the environment that influence how articles
+		get rendered.
+
+		These are taken from the theme and the application once, and then passed
+		to the renderer as plain data.
+		:return: The settings to render articles with.
+		"""
+		if self._render_settings is None:
+			theme = Theme.getInstance()
+			margin = theme.getSize("default_margin").width()
+			self._render_settings = ArticleRenderer.RenderSettings(
+				link_colour=theme.getColor("text_link").name(),
+				image_width=round(theme.getSize("tooltip").width() * 2.5 / 3 - margin * 2),  # Fit 3 images in the width. Rounded, since it ends up in image sizes and file names.
+				cura_version=CuraApplication.getInstance().getVersion(),  # For conditional content.
+				platform=platform.system().lower()  # For conditional content.
+			)
+		return self._render_settings
+
+	def render_key(self) -> Dict[str, Any]:
+		"""
+		Get everything that the rendered articles depend on, besides their
+		source files.
+
+		If any of these change, the previously rendered articles are no longer
+		valid.
+		:return: A dictionary of properties that influence the rendering.
+		"""
+		key = dict(self.render_settings()._asdict())
+		key["plugin_path"] = os.path.dirname(__file__)  # Image URLs are absolute paths.
+		key["plugin_version"] = self.getVersion()
+		return key
 
 	def load_definitions(self):
 		"""
@@ -187,19 +388,141 @@ class CuraSettingsGuide(Extension, QObject):
 		"""
 		Set the tooltips to the contents of the articles in the current
 		language.
+
+		The tooltip texts are prepared while the articles are loaded. Only the
+		definitions of which the tooltip is different from what is currently
+		installed are modified.
+		"""
+		with Timing.measure("set_tooltips"):
+			global_stack = self._tooltip_stack()
+			if not global_stack:
+				return  # Fail.
+			language = self.active_language()
+			setting_keys = global_stack.getAllKeys()
+			for article_id in self.article_locations:
+				if article_id in setting_keys:
+					self._install_tooltip(global_stack, article_id, language)
+
+	def set_tooltip(self, article_id: str) -> None:
+		"""
+		Set the tooltip of a single setting to the contents of its article in
+		the current language.
+		:param article_id: The setting to set the tooltip of.
+		"""
+		global_stack = self._tooltip_stack()
+		if not global_stack or article_id not in global_stack.getAllKeys():
+			return
+		self._install_tooltip(global_stack, article_id, self.active_language())
+
+	def _tooltip_stack(self) -> Optional[GlobalStack]:
+		"""
+		Get the stack of which the definitions get the tooltips installed.
+
+		If the user switched to a different printer since the tooltips were last
+		installed, nothing has been installed in the new definitions yet.
+		:return: The global stack, or `None` if there is no printer.
 		"""
-		language = CuraApplication.getInstance().getPreferences().getValue("settings_guide/language")
 		global_stack = CuraApplication.getInstance().getGlobalContainerStack()
 		if not global_stack:
-			return  # Fail.
-		for article_id in self.articles_rich_text:
-			if article_id in global_stack.getAllKeys():
-				definition = global_stack.definition.findDefinitions(key=article_id)[0]
-				if language in self.articles_rich_text[article_id]:
-					definition._SettingDefinition__property_values["description"] = self.preprocess_tooltips(self.articles_rich_text[article_id][language])
-				else:
-					# English should always exist if there is a translation.
-					definition._SettingDefinition__property_values["description"] = self.preprocess_tooltips(self.articles_rich_text[article_id]["en_US"])
+			return None
+		definition_id = global_stack.definition.getId()
+		if definition_id != self._installed_tooltips_definition:  # Switched to a different printer. Nothing has been installed in these definitions yet.
+			self._installed_tooltips = {}
+			self._installed_tooltips_definition = definition_id
+		return global_stack
+
+	def _install_tooltip(self, global_stack: GlobalStack, article_id: str, language: str) -> None:
+		"""
+		Install the tooltip of a setting in its definition, if it's different
+		from what is currently installed.
+		:param global_stack: The stack with the definitions to install it in.
+		:param article_id: The setting to install the tooltip of.
+		:param language: The language to show the tooltip in.
+		"""
+		tooltip = self._tooltip(article_id, language)
+		if tooltip is None:
+			tooltip = self._tooltip(article_id, "en_US")  # English should always exist if there is a translation.
+		if tooltip is None:
+			return  # Not loaded yet.
+		if self._installed_tooltips.get(article_id) == tooltip:
+			return  # Already installed.
+		definition = global_stack.definition.findDefinitions(key=article_id)[0]
+		definition._SettingDefinition__property_values["description"] = tooltip
+		self._installed_tooltips[article_id] = tooltip
+
+	def _tooltip(self, article_id: str, language: str) -> Optional[str]:
+		"""
+		Get the text to show in the tooltip of a setting.
+
+		The tooltip is prepared from the rendered article if that wasn't done
+		yet.
+		:param article_id: The setting to get the tooltip for.
+		:param language: The language to get the tooltip in.
+		:return: The tooltip text, or `None` if the article is not loaded in
+		that language.
+		"""
+		if language in self._tooltips and article_id in self._tooltips[language]:
+			return self._tooltips[language][article_id]
+		parts = self.articles.get(article_id, language)
+		rich_text = self.articles.get_rich_text(article_id, language)
+		if parts is None or rich_text is None:
+			return None
+		self._prepare_tooltip(article_id, language, parts, rich_text)
+		return self._tooltips[language][article_id]
+
+	def _prepare_tooltip(self, article_id: str, language: str, parts: List[List[str]], rich_text: str) -> None:
+		"""
+		Prepare the text to show in the tooltip of a setting.
+
+		Depending on the preferences, this is either a summary of the article
+		or the complete article.
+		:param article_id: The setting to prepare the tooltip for.
+		:param language: The language of the article.
+		:param parts: The rendered parts of the article.
+		:param rich_text: The complete rich text of the article.
+		"""
+		if CuraApplication.getInstance().getPreferences().getValue("settings_guide/show+only+a+summary+in+setting+tooltips"):
+			rich_text = ArticleRenderer.render_digest(parts, self.render_settings())
+		rich_text = self.find_image_sources.sub(self._tooltip_image_source, rich_text)
+		if language not in self._tooltips:
+			self._tooltips[language] = {}
+		self._tooltips[language][article_id] = self.preprocess_tooltips(rich_text)
+
+	find_image_sources = re.compile(r"<img src=\"([^\"]*)\"")
+
+	def _tooltip_image_source(self, match: Match[str]) -> str:
+		"""
+		Replace the source of an image in a tooltip with its thumbnail from the
+		image provider.
+		:param match: A match of `find_image_sources`.
+		:return: The image tag with the new source.
+		"""
+		image_file = QUrl(match.group(1)).toLocalFile()
+		if not image_file:
+			return match.group(0)  # Not a local file.
+		return "<img src=\"{url}\"".format(url=ImageProvider.image_url(image_file, self.render_settings().image_width, 0))
+
+	def preference_changed(self, key: str) -> None:
+		"""
+		Triggered when a preference changes.
+
+		If the user chooses between a summary or the complete article in the
+		tooltips, the tooltips are prepared and installed again.
+		If watch mode is toggled, watching the article files is started or
+		stopped.
+		:param key: The key of the preference that changed.
+		"""
+		if key == "settings_guide/watch_articles":
+			if CuraApplication.getInstance().getPreferences().getValue("settings_guide/watch_articles"):
+				self.start_watching()
+			else:
+				self.stop_watching()
+			return
+		if key != "settings_guide/show+only+a+summary+in+setting+tooltips":
+			return
+		self._tooltips = {}
+		if CuraApplication.getInstance().getPreferences().getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
+			self.set_tooltips()
 
 	def preprocess_tooltips(self, original_text):
 		"""
@@ -209,43 +532,148 @@ class CuraSettingsGuide(Extension, QObject):
 		:param original_text: Rich text that is being displayed in the main articles.
 		:return: Rich text that can be displayed in the tooltips.
 		"""
-		# Remove all hyperlinks from this text.
-		# Hyperlinks don't work when clicked on here (Cura's tooltip display code won't activate weblinks, and it can't open up the Settings Guide to display different articles).
-		# However they do break through having a different colour in system-styled tooltips in the setting visibility list.
-		remove_links_regex = re.compile(r"(?:<a href=\".*\">|</a>)")
-		return re.sub(remove_links_regex, "", original_text)
+		return ArticleRenderer.preprocess_tooltip(original_text)
 
-	def find_articles(self):
+	def find_articles(self, use_manifest: bool = True) -> Dict[str, Dict[str, str]]:
 		"""
 		For each article and language, find where the Markdown file is
 		located.
+
+		If the plug-in was packaged with a manifest of the articles, the
+		locations are read from the manifest. Otherwise the resources folder is
+		searched, and the article bundles are not used.
+		:param use_manifest: Whether to use the manifest, if available.
 		:return: A nested dictionary mapping article ID to language to file
 		path.
 		"""
-		result = {}
-		# Find the English translations first.
-		for root, _, files in os.walk(os.path.join(os.path.dirname(__file__), "resources", "articles")):
-			for filename in files:
-				base_name, extension = os.path.splitext(filename)
-				if extension != ".md":
-					continue  # Only interested in article files.
-				result[base_name] = {"en_US": os.path.join(root, filename)}
-
-		# Find the translated articles in the translations folder.
-		for language in os.listdir(os.path.join(os.path.dirname(__file__), "resources", "translations")):
-			language_path = os.path.join(os.path.dirname(__file__), "resources", "translations", language)
-			if not os.path.isdir(language_path):
-				continue  # Not a translation folder.
-			for root, _, files in os.walk(language_path):
-				for filename in files:
-					base_name, extension = os.path.splitext(filename)
-					if extension != ".md":
-						continue  # Only interested in article files.
-					if base_name not in result:
-						continue  # Translation for an article that doesn't exist in English?
-					result[base_name][language] = os.path.join(root, filename)
+		resources_path = os.path.join(os.path.dirname(__file__), "resources")
+		if use_manifest:
+			result = ArticleManifest.read_manifest(resources_path, os.path.join(resources_path, "article_manifest.json"))
+			if result is not None:
+				self._articles_from_manifest = True
+				return result
+		self._articles_from_manifest = False  # This also stops the bundles from being used.
+		return ArticleManifest.walk_articles(resources_path)
 
-		return result
+	reload_delay = 300  # Milliseconds to wait after the last change to an article file before reloading it. Editors often write a file in multiple steps.
+
+	def start_watching(self) -> None:
+		"""
+		Watch the article files for changes, if watch mode is enabled.
+
+		This is meant for people writing the articles. Any article that is
+		modified, added or removed is reloaded, without needing to restart
+		Cura. The article files are then read directly rather than from the
+		bundles, since the bundles don't get updated.
+		"""
+		if not CuraApplication.getInstance().getPreferences().getValue("settings_guide/watch_articles"):
+			return
+		if self._watcher is not None:
+			return  # Already watching.
+		self._watcher = QFileSystemWatcher(self)
+		self._watcher.fileChanged.connect(self._source_changed)
+		self._watcher.directoryChanged.connect(self._source_changed)
+		self._reload_timer = QTimer(self)
+		self._reload_timer.setSingleShot(True)
+		self._reload_timer.setInterval(self.reload_delay)
+		self._reload_timer.timeout.connect(self.reload_changed_articles)
+		self.article_locations = self.find_articles(use_manifest=False)
+		self._watch_paths()
+		Logger.log("i", "Watching the Settings Guide articles for changes.")
+
+	def stop_watching(self) -> None:
+		"""
+		Stop watching the article files for changes.
+		"""
+		if self._watcher is None:
+			return
+		self._reload_timer.stop()
+		self._watcher.deleteLater()
+		self._reload_timer.deleteLater()
+		self._watcher = None
+		self._reload_timer = None
+		self._changed_paths = set()
+
+	def _watch_paths(self) -> None:
+		"""
+		Add all article files and the folders containing them to the watcher.
+
+		Files that are replaced (which many editors do when saving) are no
+		longer watched, so this needs to be called again after every change.
+		"""
+		resources_path = os.path.join(os.path.dirname(__file__), "resources")
+		paths = set()
+		for folder in ("articles", "translations"):
+			for root, _, _ in os.walk(os.path.join(resources_path, folder)):
+				paths.add(root)  # To notice files being added or removed.
+		for languages in self.article_locations.values():
+			paths.update(languages.values())
+		paths -= set(self._watcher.files()) | set(self._watcher.directories())
+		if paths:
+			self._watcher.addPaths(sorted(paths))
+
+	def _source_changed(self, path: str) -> None:
+		"""
+		Triggered when an article file or one of the article folders changed.
+
+		The articles are reloaded once the files stop changing for a while.
+		:param path: The file or folder that changed.
+		"""
+		self._changed_paths.add(path)
+		self._reload_timer.start()  # Restarts the timer if it was already running.
+
+	def reload_changed_articles(self) -> None:
+		"""
+		Reload the articles of which the files changed, or that were added or
+		removed.
+		"""
+		changed_paths = self._changed_paths
+		self._changed_paths = set()
+		old_locations = self.article_locations
+		self.article_locations = self.find_articles(use_manifest=False)
+		changed = set()
+		for article_id in old_locations.keys() | self.article_locations.keys():
+			old_languages = old_locations.get(article_id, {})
+			new_languages = self.article_locations.get(article_id, {})
+			for language in old_languages.keys() | new_languages.keys():
+				if old_languages.get(language) != new_languages.get(language) or new_languages[language] in changed_paths:
+					changed.add((article_id, language))
+		self._watch_paths()
+		for article_id, language in sorted(changed):
+			self.reload_article(article_id, language)
+		self._disk_cache.save()
+		self._search_index.save()
+
+	def reload_article(self, article_id: str, language: str) -> None:
+		"""
+		Render an article again after its file was modified, added or removed.
+
+		Only this article in this language is removed from the caches. If it's
+		shown in the tooltip or in the dialogue, those are updated.
+		:param article_id: The article that changed.
+		:param language: The language of the article that changed.
+		"""
+		Logger.log("i", "Reloading Settings Guide article {article_id} in {language}.".format(article_id=article_id, language=language))
+		self.articles.remove(article_id, language)
+		self._disk_cache.remove(article_id, language)
+		self._search_index.remove(article_id, language)
+		if language in self._tooltips:
+			self._tooltips[language].pop(article_id, None)
+		if language == "en_US":  # The link graph is built from the English articles.
+			markdown = self._read_source(article_id, language)
+			targets = LinkGraph.extract_links(markdown) if markdown is not None else set()
+			self.link_graph.update(article_id, {target for target in targets if target in self.article_locations and target != article_id})
+
+		active_language = self.active_language()
+		shown = language == active_language or (language == "en_US" and active_language not in self.article_locations.get(article_id, {}))  # Whether this is the language that the article is shown in, or was shown in before a translation was removed.
+		if not shown:
+			return
+		if language in self.article_locations.get(article_id, {}):
+			self._getArticle(article_id, language)
+		if CuraApplication.getInstance().getPreferences().getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
+			self.set_tooltip(article_id)
+		if article_id == self._selected_article_id:
+			self.selectedArticleChanged.emit()
 
 	def load_window(self):
 		"""
@@ -298,7 +726,8 @@ class CuraSettingsGuide(Extension, QObject):
 
 		This function lazily loads an article from a file. If it's never been
 		loaded before the article gets parsed and stored. Otherwise it'll get
-		taken from the cache.
+		taken from the cache. Articles that were evicted from the memory cache
+		are loaded again.
 		:param article_id: The ID of the article to get.
 		:param language: The language to get the article in.
 		:return: A list of article "parts". Each article part is a list, where
@@ -306,68 +735,125 @@ class CuraSettingsGuide(Extension, QObject):
 		content. Possible types of parts are "rich_text", "images" or
 		"checkbox".
 		"""
-		if article_id in self.articles and language in self.articles[article_id]:
-			return self.articles[article_id][language]
+		parts = self.articles.get(article_id, language)
+		if parts is not None:
+			return parts
 
+		requested_language = language
 		images_path = os.path.join(os.path.dirname(__file__), "resources", "articles", "images")
+		markdown_file = None  # Stays None if we have to fall back to the setting description.
+		signature = None  # Stays None unless the article is read from a bundle.
 		try:
 			if language not in self.article_locations[article_id]:
 				language = "en_US"  # Fall back to English if the preferred language is not available.
+				parts = self.articles.get(article_id, language)
+				if parts is not None:
+					return parts
 			markdown_file = self.article_locations[article_id][language]
-			with open(markdown_file, encoding="utf-8") as f:
-				markdown_str = f.read()
+			signature = self._source_signature(article_id, language, markdown_file)
+			cached = self._disk_cache.get(article_id, language, markdown_file, signature)
+			if cached is not None:
+				self._store_article(article_id, language, *cached)
+				return cached[0]
+			if signature is not None:  # The article is in a bundle.
+				markdown_str = self._bundles[language].read(article_id)
+			else:
+				with open(markdown_file, encoding="utf-8") as f:
+					markdown_str = f.read()
 			images_path = os.path.dirname(markdown_file)
 		except (OSError, KeyError):  # File doesn't exist or is otherwise not readable.
+			if markdown_file is not None and self._articles_from_manifest:  # The manifest may be outdated. Search for the articles again and retry.
+				Logger.log("w", "Settings Guide article manifest is outdated. Searching for articles instead.")
+				self.article_locations = self.find_articles(use_manifest=False)
+				return self._getArticle(article_id, requested_language)
+			markdown_file = None
 			if self.definition_container and article_id in self.definition_container.getAllKeys():
 				markdown_str = self.definition_container.getProperty(article_id, "label") + "\n====\n"
 				markdown_str += "*" + self.definition_container.getProperty(article_id, "description") + "*"  # Use the setting description as fallback.
 			else:
 				markdown_str = "There is no article on this topic."
 
-		if images_path not in self._markdown_per_folder:
-			renderer = QtMarkdownRenderer.QtMarkdownRenderer(images_path)
-			self._markdown_per_folder[images_path] = mistune.Markdown(renderer=renderer)  # Renders the Markdown articles into the subset of HTML supported by Qt.
-
-		find_images = re.compile(r"!\[(.*)\]\(([^\)]+)\)")
-		find_checkboxes = re.compile(r"\[ \]\s*([^\n]+)")
-		image_description = None
-		parts = []  # type: List[List[str]]  # List of items in the article. Each item starts with a type ID, and then a variable number of data items.
-		for index, part_between_images in enumerate(find_images.split(markdown_str)):
-			# The parts of the regex split alternate between text, image description and image URL.
-			if index % 3 == 0:
-				part_between_images = part_between_images.strip()
-				if part_between_images or index == 0:
-					parts_between_checkboxes = find_checkboxes.split(part_between_images)
-					for index2, part_between_checkboxes in enumerate(parts_between_checkboxes):
-						part_between_checkboxes = part_between_checkboxes.strip()
-						# The parts of the regex split alternate between text and checkbox description.
-						if index2 % 2 == 0:
-							if part_between_checkboxes:
-								part_between_checkboxes = QtMarkdownRenderer.QtMarkdownRenderer.preprocess_conditionals(part_between_checkboxes)
-								rich_text = self._markdown_per_folder[images_path](part_between_checkboxes)
-								parts.append(["rich_text", rich_text])
-						else:  # if index2 == 1:
-							preference_key = "settings_guide/" + urllib.parse.quote_plus(part_between_checkboxes).lower()
-							parts.append(["checkbox", preference_key, part_between_checkboxes])
-			elif index % 3 == 1:
-				image_description = mistune.markdown(part_between_images)
-			else:  # if index % 3 == 2:
-				if image_description is not None:
-					if parts[-1][0] != "images":  # List of images.
-						parts.append(["images"])
-					image_url = os.path.join(images_path, part_between_images)
-					parts[-1].append(QUrl.fromLocalFile(image_url).toString() + "|" + image_description)
-					image_description = None
-
-		if article_id not in self.articles:
-			self.articles[article_id] = {}
-		self.articles[article_id][language] = parts
-		if article_id not in self.articles_rich_text:
-			self.articles_rich_text[article_id] = {}
-		markdown_str = QtMarkdownRenderer.QtMarkdownRenderer.preprocess_conditionals(markdown_str)
-		self.articles_rich_text[article_id][language] = self._markdown_per_folder[images_path](markdown_str)
-
-		return self.articles[article_id][language]
+		start_time = time.perf_counter()
+		parts, rich_text = ArticleRenderer.render_article(markdown_str, images_path, self.render_settings(), language)
+		Timing.record_article(article_id, language, time.perf_counter() - start_time)
+		self._store_article(article_id, language, parts, rich_text, markdown_file, signature)
+		return parts
+
+	def _read_source(self, article_id: str, language: str) -> Optional[str]:
+		"""
+		Read the Markdown source of an article, without rendering it.
+		:param article_id: The article to read.
+		:param language: The language to read the article in.
+		:return: The Markdown source of the article, or `None` if it can't be
+		read.
+		"""
+		try:
+			markdown_file = self.article_locations[article_id][language]
+			if self._source_signature(article_id, language, markdown_file) is not None:  # The article is in a bundle.
+				return self._bundles[language].read(article_id)
+			with open(markdown_file, encoding="utf-8") as f:
+				return f.read()
+		except (OSError, KeyError):
+			return None
+
+	def _get_bundle(self, language: str) -> Optional[ArticleBundle.ArticleBundle]:
+		"""
+		Get the bundle that contains the articles of a certain language.
+
+		Bundles are only used if the article locations were read from the
+		manifest, since they were both created in the same packaging step.
+		:param language: The language to get the bundle of.
+		:return: The bundle for that language, or `None` if there is no usable
+		bundle.
+		"""
+		if not self._articles_from_manifest:
+			return None
+		if language not in self._bundles:
+			resources_path = os.path.join(os.path.dirname(__file__), "resources")
+			bundle_file = os.path.join(resources_path, "bundles", language + ".bundle")
+			try:
+				self._bundles[language] = ArticleBundle.ArticleBundle(bundle_file, resources_path)
+			except FileNotFoundError:
+				self._bundles[language] = None
+			except (OSError, ValueError) as e:
+				Logger.log("w", "Unable to open Settings Guide article bundle {file}: {err}".format(file=bundle_file, err=str(e)))
+				self._bundles[language] = None
+		return self._bundles[language]
+
+	def _source_signature(self, article_id: str, language: str, markdown_file: str) -> Optional[List[str]]:
+		"""
+		Get the signature of an article if it can be read from a bundle.
+		:param article_id: The article to get the signature of.
+		:param language: The language of the article.
+		:param markdown_file: The file that the article is located in.
+		:return: The signature of the article in the bundle, or `None` if the
+		article needs to be read from its file.
+		"""
+		bundle = self._get_bundle(language)
+		if bundle is None:
+			return None
+		return bundle.signature(article_id, markdown_file)
+
+	def _store_article(self, article_id: str, language: str, parts: List[List[str]], rich_text: str, markdown_file: Optional[str] = None, signature: Optional[List] = None) -> None:
+		"""
+		Store a rendered article in the caches.
+		:param article_id: The ID of the rendered article.
+		:param language: The language of the rendered article.
+		:param parts: The article parts, as displayed in the dialogue.
+		:param rich_text: The complete rich text of the article, as displayed in
+		the tooltips.
+		:param markdown_file: The file that the article was rendered from. If
+		given, the article is also stored in the disk cache.
+		:param signature: The signature of the article's source, if it was read
+		from a bundle rather than from the file.
+		"""
+		self.articles.put(article_id, language, parts, rich_text)
+		if article_id in self.article_locations:  # Don't index the fall-back descriptions.
+			self._search_index.add(article_id, language, rich_text)
+		if language == "en_US" or language == self.articles.active_language:
+			self._prepare_tooltip(article_id, language, parts, rich_text)
+		if markdown_file is not None:
+			self._disk_cache.put(article_id, language, markdown_file, parts, rich_text, signature)
 
 	@pyqtSlot(str, result=bool)
 	def isArticleFile(self, filename: str) -> bool:
@@ -375,12 +861,39 @@ class CuraSettingsGuide(Extension, QObject):
 		Tests whether a file name is the file name of an existing article.
 
 		This test is used to determine if a link should refer to a different
-		article or to the internet.
+		article or to the internet. The article is looked up by its ID, so this
+		doesn't need to access the file system.
 		:param filename: The file name to test for.
 		:return: True if the file name is the file name of an existing article,
 		or False if it isn't.
 		"""
-		return os.path.exists(filename)
+		article_id = LinkGraph.article_id_from_link(filename)
+		return article_id is not None and article_id in self.article_locations
+
+	@pyqtSlot(str, result=str)
+	def thumbnail(self, image_url: str) -> str:
+		"""
+		Get the thumbnail of an image, to show in the grid of images in an
+		article.
+
+		The thumbnail is loaded through the image provider, which decodes it in
+		the background.
+		:param image_url: The URL of the original image.
+		:return: The URL of the thumbnail.
+		"""
+		image_file = QUrl(image_url).toLocalFile()
+		if not image_file:
+			return image_url  # Not a local file.
+		return ImageProvider.image_url(image_file, 0, self.grid_thumbnail_height)
+
+	@pyqtSlot(str, result="QVariantList")
+	def backlinks(self, article_id: str) -> List[str]:
+		"""
+		Get the articles that link to a certain article.
+		:param article_id: The article to find the links to.
+		:return: The IDs of the articles that link to it, in alphabetical order.
+		"""
+		return self.link_graph.backlinks(article_id)
 
 	@pyqtProperty(str, constant=True)
 	def pluginVersion(self) -> str:
@@ -404,6 +917,55 @@ class CuraSettingsGuide(Extension, QObject):
 		if self._selected_article_id != article_key:
 			self._selected_article_id = article_key
 			self.selectedArticleChanged.emit()
+			self.prefetch(article_key)
+
+	prefetch_neighbours = 2  # How many articles above and below the selected article in the sidebar to prefetch.
+
+	def prefetch(self, article_id: str) -> None:
+		"""
+		Load the articles that the user is likely to view next, in the
+		background.
+
+		These are the articles that the given article links to, and the articles
+		next to it in the sidebar.
+		:param article_id: The article that the user is currently viewing.
+		"""
+		if not article_id:
+			return  # Welcome screen.
+		language = self.active_language()
+		candidates = self.link_graph.links(article_id)
+		if not self._sidebar_order and self.definition_container:
+			self._sidebar_order = self.sidebar_order()
+		if article_id in self._sidebar_order:
+			index = self._sidebar_order.index(article_id)
+			candidates += self._sidebar_order[max(0, index - self.prefetch_neighbours):index] + self._sidebar_order[index + 1:index + 1 + self.prefetch_neighbours]
+		to_load = [candidate for candidate in candidates if candidate in self.article_locations and self.articles.get(candidate, language if language in self.article_locations[candidate] else "en_US") is None]
+		if to_load:
+			self.run_in_background(self._prefetch_articles, to_load, language)
+
+	def _prefetch_articles(self, article_ids: List[str], language: str) -> None:
+		"""
+		Load a number of articles. Meant to run in the background.
+		:param article_ids: The articles to load.
+		:param language: The language to load them in.
+		"""
+		for article_id in article_ids:
+			self._getArticle(article_id, language)
+		self.create_thumbnails(article_ids, language)
+
+	def sidebar_order(self) -> List[str]:
+		"""
+		List the articles in the order in which they are shown in the sidebar.
+		:return: The article IDs, depth-first through the setting definitions.
+		"""
+		result = []
+		def add_definition(definition):
+			result.append(definition.key)
+			for child in definition.children:
+				add_definition(child)
+		for definition in self.definition_container.definitions:
+			add_definition(definition)
+		return result
 
 	@pyqtProperty(str, fset=setSelectedArticleId, notify=selectedArticleChanged)
 	def selectedArticleId(self) -> str:
@@ -426,11 +988,18 @@ class CuraSettingsGuide(Extension, QObject):
 		items, some of which are text and some of which are image lists.
 		:return: The the currently selected article.
 		"""
+		return self._getArticle(self._selected_article_id, self.active_language())
+
+	def active_language(self) -> str:
+		"""
+		Get the language that the user wants to read the articles in.
+		:return: A language code, such as "en_US".
+		"""
 		preferences = CuraApplication.getInstance().getPreferences()
 		language = preferences.getValue("settings_guide/language")
 		if language == "cura_default":
 			language = preferences.getValue("general/language")
-		return self._getArticle(self._selected_article_id, language)
+		return language
 
 	@pyqtSlot(str, result="QVariantList")
 	def language_list(self, article_key: str) -> List[str]:
@@ -443,6 +1012,20 @@ class CuraSettingsGuide(Extension, QObject):
 			return []  # We have no articles about this setting at all.
 		return list(self.article_locations[article_key].keys())
 
+	@pyqtSlot(str, result="QVariantList")
+	def search(self, query: str) -> List[List[str]]:
+		"""
+		Search through the text of the articles in the active language.
+
+		Articles that are not translated to the active language are searched in
+		English.
+		:param query: The words to search for.
+		:return: The best matching articles, best match first. For each article,
+		a list containing the article ID, the title and a snippet of text around
+		the search terms.
+		"""
+		return [list(result) for result in self._search_index.search(query, self.active_language()) if result[0] in self.article_locations]
+
 	@pyqtSlot(str)
 	def set_language(self, language_code: str) -> None:
 		"""
@@ -451,7 +1034,16 @@ class CuraSettingsGuide(Extension, QObject):
 		"""
 		preferences = CuraApplication.getInstance().getPreferences()
 		preferences.setValue("settings_guide/language", language_code)
-		if preferences.getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
+		language = self.active_language()
+		if language != self.articles.active_language:
+			self.articles.set_active_language(language)  # Articles of the previous language may now be evicted.
+			self._loaded_languages &= {"en_US"}  # Articles of other languages may have been evicted, so they need to be loaded again.
+			for tooltip_language in list(self._tooltips):
+				if tooltip_language != "en_US" and tooltip_language != language:
+					del self._tooltips[tooltip_language]  # Prepared again when needed.
+		if language not in self._loaded_languages:
+			self.run_in_background(self.load_language, language)  # Load the rest of this language on demand. Installs the tooltips when done.
+		elif preferences.getValue("settings_guide/show+articles+in+setting+tooltips+%28requires+restart%29"):
 			self.set_tooltips()
 		self.selectedArticleChanged.emit()
 
@@ -462,7 +1054,12 @@ class CuraSettingsGuide(Extension, QObject):
 
 		This starts the process outlined in the ScreenshotTool class.
 		"""
-		if not has_screenshot_tool:
+		if not CuraApplication.getInstance().getPreferences().getValue("settings_guide/screenshot_tool"):
+			Logger.error("The screenshot tool is disabled. Enable it with the settings_guide/screenshot_tool preference.")
+			return
+		try:
+			from . import ScreenshotTool  # To refresh screenshots using the Cura client. Only imported when needed, since it imports a lot of Cura's rendering and slicing code.
+		except ImportError:
 			Logger.error("The screenshot tool is not installed in this version of the Settings Guide. Please use the version from the source repository.")
 			return
 		if self.selectedArticleId:  # Refresh a particular article.
@@ -471,8 +1068,6 @@ class CuraSettingsGuide(Extension, QObject):
 		else:  # Refresh everything.
 			refreshed_set = set()  # Don't refresh the same image multiple times. Share the same set among all calls.
 			def refresh_everything():
-				for article_per_language in self.articles.values():
-					for article in article_per_language.values():
-						ScreenshotTool.refresh_screenshots(article_text=article, refreshed_set=refreshed_set)
+				ScreenshotTool.refresh_all_screenshots(refreshed_set=refreshed_set)  # All at once, so that screenshots of different articles can share their slices.
 			refresh_job = threading.Thread(target=refresh_everything)
 			refresh_job.start()
\ No newline at end of file
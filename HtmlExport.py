@@ -0,0 +1,279 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module exports the whole guide to static HTML pages, so that it can be read without Cura.
+
+Every article is exported in every language. If an article is not translated to a language, the English version is
+exported in that language's folder. Links between articles are rewritten to link to the exported pages, and the images
+are copied next to the pages.
+
+Only articles of which the source has changed since the last export are rendered again. Which sources were exported is
+stored in a manifest in the output folder. Pages and images of a previous export that are no longer part of the guide,
+such as those of deleted articles, are removed.
+
+The plug-in needs to be importable as a package, with Uranium on the Python path (for conditional content). From the
+folder containing the plug-in, execute:
+`python3 -m <plug-in folder name>.HtmlExport <output folder>`
+"""
+
+import argparse  # To parse the command line arguments.
+import concurrent.futures  # To render the articles in parallel.
+import hashlib  # To detect which articles changed since the last export.
+import html  # To escape the titles of the articles.
+import json  # To store which articles were exported.
+import os  # To find the articles and write the exported files.
+import platform  # To show conditional content for the current operating system by default.
+import re  # To rewrite the links and images in the articles.
+import shutil  # To copy the images.
+import urllib.parse  # To convert image URLs to file paths and back.
+import urllib.request  # To convert image URLs to file paths.
+from typing import Any, Dict, List, Optional, Tuple
+
+from UM.Logger import Logger
+
+from . import ArticleManifest  # To find the articles.
+from . import ArticleRenderer  # To render the articles.
+from . import LinkGraph  # To find which article a link refers to.
+
+version = 1  # Version of the export format. Increase this to export everything again after changing the output.
+
+find_links = re.compile(r"<a href=\"([^\"]*)\"")
+find_images = re.compile(r"<img src=\"([^\"]*)\"")
+find_tags = re.compile(r"<[^>]*>")
+find_title = re.compile(r"<h1>(.*?)</h1>", flags=re.DOTALL)
+
+page_template = """<!DOCTYPE html>
+<html lang="{language}">
+<head>
+<meta charset="utf-8" />
+<title>{title}</title>
+</head>
+<body>
+{body}
+<hr />
+<p><a href="index.html">{index_title}</a></p>
+</body>
+</html>
+"""
+
+def export_article(article_id: str, language: str, source_language: str, markdown_file: str, settings: ArticleRenderer.RenderSettings, resources_path: str, output_path: str) -> Tuple[str, str, str, List[str]]:
+	"""
+	Render an article and write it as an HTML page.
+
+	This is executed in the worker processes.
+	:param article_id: The article to export.
+	:param language: The language folder to export the article to.
+	:param source_language: The language that the article is written in. This
+	is English if the article is not translated to the language of the folder.
+	:param markdown_file: The Markdown source of the article.
+	:param settings: The settings to render the article with.
+	:param resources_path: The resources folder of the plug-in.
+	:param output_path: The folder to export the guide to.
+	:return: The article ID, language, title of the article and the image files
+	that the article refers to.
+	"""
+	with open(markdown_file, encoding="utf-8") as f:
+		markdown = f.read()
+	_, rich_text = ArticleRenderer.render_article(markdown, os.path.dirname(markdown_file), settings, source_language)
+
+	def rewrite_link(match):
+		target = LinkGraph.article_id_from_link(match.group(1))
+		if target is None:
+			return match.group(0)  # Link to the internet.
+		return "<a href=\"{target}.html\"".format(target=urllib.parse.quote(target))
+
+	images = []
+	def rewrite_image(match):
+		url = urllib.parse.urlparse(match.group(1))
+		if url.scheme != "file":
+			return match.group(0)
+		image_file = os.path.normpath(urllib.request.url2pathname(url.path))
+		images.append(image_file)
+		relative_path = os.path.relpath(image_file, resources_path).replace(os.sep, "/")
+		return "<img src=\"../images/{path}\"".format(path=urllib.parse.quote(relative_path))
+
+	rich_text = find_links.sub(rewrite_link, rich_text)
+	rich_text = find_images.sub(rewrite_image, rich_text)
+
+	title_match = find_title.search(rich_text)
+	title = html.unescape(find_tags.sub("", title_match.group(1))).strip() if title_match else article_id
+	page = page_template.format(language=language.replace("_", "-"), title=html.escape(title), body=rich_text, index_title="Index")
+	os.makedirs(os.path.join(output_path, language), exist_ok=True)
+	with open(os.path.join(output_path, language, article_id + ".html"), "w", encoding="utf-8") as f:
+		f.write(page)
+	return article_id, language, title, images
+
+def source_hash(markdown_file: str) -> Optional[str]:
+	"""
+	Get a hash of the source of an article, to detect whether it changed.
+	:param markdown_file: The source of the article.
+	:return: A hash of the file path and the contents, or `None` if it can't be
+	read.
+	"""
+	try:
+		with open(markdown_file, "rb") as f:
+			contents = f.read()
+	except OSError:
+		return None
+	return hashlib.sha1(markdown_file.encode("utf-8") + b"\0" + contents).hexdigest()
+
+def read_export_manifest(manifest_file: str) -> Tuple[Optional[List], Dict[str, Dict[str, Any]]]:
+	"""
+	Read which articles were exported previously.
+	:param manifest_file: The file that the export manifest is stored in.
+	:return: The settings that the articles were rendered with, and for each
+	exported article and language, the hash of its source, its title and its
+	images. If the manifest is missing, corrupt or of a different version, there
+	are no settings and no articles.
+	"""
+	try:
+		with open(manifest_file, encoding="utf-8") as f:
+			manifest = json.load(f)
+		if manifest.get("version") != version:
+			return None, {}
+		articles = manifest["articles"]
+		if not isinstance(articles, dict) or not all(isinstance(entry, dict) and isinstance(entry.get("hash"), str) and isinstance(entry.get("title"), str) and isinstance(entry.get("images"), list) and "/" in key for key, entry in articles.items()):
+			return None, {}
+		return manifest.get("settings"), articles
+	except (OSError, ValueError, KeyError, AttributeError):  # Missing or corrupt. Export everything.
+		return None, {}
+
+def copy_images(image_files: List[str], resources_path: str, output_path: str) -> None:
+	"""
+	Copy images to the output folder, if they are not there yet or changed.
+	:param image_files: The images to copy.
+	:param resources_path: The resources folder of the plug-in.
+	:param output_path: The folder to export the guide to.
+	"""
+	for image_file in set(image_files):
+		target = os.path.join(output_path, "images", os.path.relpath(image_file, resources_path))
+		try:
+			source_stat = os.stat(image_file)
+			target_stat = os.stat(target)
+			if source_stat.st_size == target_stat.st_size and source_stat.st_mtime <= target_stat.st_mtime:
+				continue  # Already up to date.
+		except FileNotFoundError:
+			pass
+		try:
+			os.makedirs(os.path.dirname(target), exist_ok=True)
+			shutil.copy2(image_file, target)
+		except OSError as e:
+			Logger.log("w", "Unable to copy image {image_file}: {err}".format(image_file=image_file, err=str(e)))
+
+def remove_stale(previous: Dict[str, Dict[str, Any]], exported: Dict[str, Dict[str, Any]], resources_path: str, output_path: str) -> None:
+	"""
+	Remove the pages and images of a previous export that are no longer part
+	of the guide, such as the pages of deleted articles.
+	:param previous: For each article and language that was exported
+	previously, the export manifest entry.
+	:param exported: For each article and language that is exported now, the
+	export manifest entry.
+	:param resources_path: The resources folder of the plug-in.
+	:param output_path: The folder that the guide is exported to.
+	"""
+	stale_files = set()
+	for key in previous.keys() - exported.keys():
+		article_id, language = key.split("/", 1)
+		stale_files.add(os.path.join(output_path, language, article_id + ".html"))
+	exported_languages = {key.split("/", 1)[1] for key in exported}
+	for language in {key.split("/", 1)[1] for key in previous} - exported_languages:
+		stale_files.add(os.path.join(output_path, language, "index.html"))
+	used_images = {image for entry in exported.values() for image in entry["images"]}
+	for image_file in {image for entry in previous.values() for image in entry["images"]} - used_images:
+		stale_files.add(os.path.join(output_path, "images", os.path.relpath(image_file, resources_path)))
+
+	for stale_file in stale_files:
+		try:
+			os.remove(stale_file)
+		except FileNotFoundError:
+			continue  # Already removed by hand.
+		except OSError as e:
+			Logger.log("w", "Unable to remove stale file {stale_file}: {err}".format(stale_file=stale_file, err=str(e)))
+			continue
+		folder = os.path.dirname(stale_file)
+		while os.path.normpath(folder) != os.path.normpath(output_path) and not os.listdir(folder):  # Clean up folders that became empty.
+			os.rmdir(folder)
+			folder = os.path.dirname(folder)
+
+def write_index(language: str, titles: Dict[str, str], output_path: str) -> None:
+	"""
+	Write the index page of a language, listing all articles.
+	:param language: The language to write the index of.
+	:param titles: For each article, its title.
+	:param output_path: The folder to export the guide to.
+	"""
+	items = "\n".join("<li><a href=\"{target}.html\">{title}</a></li>".format(target=urllib.parse.quote(article_id), title=html.escape(title)) for article_id, title in sorted(titles.items(), key=lambda item: item[1].lower()))
+	page = page_template.format(language=language.replace("_", "-"), title="Settings Guide", body="<h1>Settings Guide</h1>\n<ul>\n" + items + "\n</ul>", index_title="Index")
+	with open(os.path.join(output_path, language, "index.html"), "w", encoding="utf-8") as f:
+		f.write(page)
+
+def export(resources_path: str, output_path: str, settings: ArticleRenderer.RenderSettings, max_workers: Optional[int] = None) -> None:
+	"""
+	Export the whole guide to static HTML.
+	:param resources_path: The resources folder of the plug-in.
+	:param output_path: The folder to export the guide to.
+	:param settings: The settings to render the articles with.
+	:param max_workers: The number of processes to render with. By default,
+	one per CPU.
+	"""
+	article_locations = ArticleManifest.walk_articles(resources_path)
+	languages = sorted({"en_US"} | ArticleManifest.translation_languages(resources_path))
+	manifest_file = os.path.join(output_path, "export_manifest.json")
+	previous_settings, previous = read_export_manifest(manifest_file)
+	reusable = previous_settings == list(settings)  # Pages rendered with different settings must be rendered again.
+	exported = {}  # type: Dict[str, Dict[str, Any]]
+
+	tasks = []
+	for language in languages:
+		for article_id, article_languages in article_locations.items():
+			source_language = language if language in article_languages else "en_US"  # Fall back to English.
+			markdown_file = article_languages[source_language]
+			key = article_id + "/" + language
+			digest = source_hash(markdown_file)
+			if digest is None:
+				continue
+			if reusable and key in previous and previous[key]["hash"] == digest and os.path.exists(os.path.join(output_path, language, article_id + ".html")):
+				exported[key] = previous[key]  # Unchanged since the last export.
+				continue
+			exported[key] = {"hash": digest}
+			tasks.append((article_id, language, source_language, markdown_file))
+	Logger.log("i", "Exporting {num_changed} of {num_total} pages.".format(num_changed=len(tasks), num_total=len(exported)))
+
+	os.makedirs(output_path, exist_ok=True)
+	if tasks:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+			futures = [pool.submit(export_article, article_id, language, source_language, markdown_file, settings, resources_path, output_path) for article_id, language, source_language, markdown_file in tasks]
+			for future in concurrent.futures.as_completed(futures):
+				article_id, language, title, images = future.result()
+				exported[article_id + "/" + language].update({"title": title, "images": images})
+
+	remove_stale(previous, exported, resources_path, output_path)
+	copy_images([image for entry in exported.values() for image in entry["images"]], resources_path, output_path)
+	for language in languages:
+		write_index(language, {key.split("/")[0]: entry["title"] for key, entry in exported.items() if key.split("/")[1] == language}, output_path)
+	languages_list = "\n".join("<li><a href=\"{language}/index.html\">{language}</a></li>".format(language=language) for language in languages)
+	with open(os.path.join(output_path, "index.html"), "w", encoding="utf-8") as f:
+		f.write(page_template.format(language="en", title="Settings Guide", body="<h1>Settings Guide</h1>\n<ul>\n" + languages_list + "\n</ul>", index_title="Index"))
+
+	with open(manifest_file, "w", encoding="utf-8") as f:
+		json.dump({"version": version, "settings": list(settings), "articles": exported}, f, indent=1, sort_keys=True)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Export the Settings Guide to static HTML pages.")
+	parser.add_argument("output", help="The folder to export the guide to.")
+	parser.add_argument("--cura-version", default="4.13.0", help="The Cura version to show conditional content for.")
+	parser.add_argument("--platform", default=platform.system().lower(), help="The operating system to show conditional content for: windows, darwin or linux.")
+	parser.add_argument("--link-colour", default="#196ef0", help="The colour of hyperlinks.")
+	parser.add_argument("--image-width", type=int, default=300, help="The width of the images in the pages.")
+	parser.add_argument("--jobs", type=int, default=None, help="The number of processes to render with. By default, one per CPU.")
+	arguments = parser.parse_args()
+
+	export(
+		resources_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources"),
+		output_path=os.path.abspath(arguments.output),
+		settings=ArticleRenderer.RenderSettings(link_colour=arguments.link_colour, image_width=arguments.image_width, cura_version=arguments.cura_version, platform=arguments.platform),
+		max_workers=arguments.jobs
+	)
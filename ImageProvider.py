@@ -0,0 +1,123 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module provides the images of the articles to QML, both for the dialogue and for the setting tooltips.
+
+Images are requested with a URL of the form `image://settings_guide/<width>x<height>/<file path>`. The width and height
+are the size of the thumbnail to display, or 0 if that dimension is not limited. A size of `0x0` gives the image at its
+original size.
+"""
+
+import collections  # For OrderedDict, to track which images were least recently used.
+from PyQt5.QtCore import QSize  # To report the size of images.
+from PyQt5.QtGui import QImage, QImageReader  # To decode the images.
+from PyQt5.QtQml import QQmlImageProviderBase  # To request asynchronous loading.
+from PyQt5.QtQuick import QQuickImageProvider  # The interface that QML uses to request images.
+import threading  # Images are decoded on multiple threads at the same time.
+import urllib.parse  # To put file paths in image URLs.
+from typing import Optional, Tuple
+
+from UM.Logger import Logger
+
+from . import ThumbnailCache  # To get the images at the size at which they are displayed.
+
+provider_id = "settings_guide"  # The name under which the provider is registered, which is the host name in the image URLs.
+
+def image_url(image_file: str, width: int = 0, height: int = 0) -> str:
+	"""
+	Create a URL to request an image from the provider.
+	:param image_file: The file path of the image.
+	:param width: The maximum width to display the image at, or 0 if the
+	width is not limited. Rounded to whole pixels.
+	:param height: The maximum height to display the image at, or 0 if the
+	height is not limited. Rounded to whole pixels.
+	:return: A URL that QML can load the image from.
+	"""
+	return "image://{provider_id}/{width}x{height}/{path}".format(provider_id=provider_id, width=round(width), height=round(height), path=urllib.parse.quote(image_file.replace("\\", "/"), safe="/:"))
+
+class ImageProvider(QQuickImageProvider):
+	"""
+	Decodes the images of the articles on QML's worker threads, and keeps the
+	decoded images in memory.
+
+	The dialogue and the tooltips share this provider, so an image that is
+	shown in both is only decoded once. Images that were used least recently
+	are removed from memory if the decoded images take up more memory than the
+	budget allows.
+	"""
+
+	def __init__(self, thumbnail_cache: ThumbnailCache.ThumbnailCache, budget: int) -> None:
+		"""
+		Creates the image provider.
+		:param thumbnail_cache: The cache to get scaled-down images from.
+		:param budget: The maximum number of bytes that decoded images may use.
+		"""
+		super().__init__(QQuickImageProvider.Image, QQmlImageProviderBase.ForceAsynchronousImageLoading)  # Qt calls requestImage from worker threads.
+		self._thumbnail_cache = thumbnail_cache
+		self._budget = budget
+		self._images = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[str, int, int], QImage]  # The decoded images, least recently used first.
+		self._size = 0  # The total size of the decoded images in memory, in bytes.
+		self._lock = threading.Lock()
+
+	def requestImage(self, image_id: str, requested_size: QSize) -> Tuple[QImage, QSize]:
+		"""
+		Get an image for QML.
+
+		Called by Qt from a worker thread.
+		:param image_id: The part of the URL after the provider ID, containing
+		the size and the file path of the image.
+		:param requested_size: The size that QML wants to display the image at.
+		This is ignored, since the thumbnail size is part of the URL.
+		:return: The image and its size. If the image can't be read, the image
+		is empty.
+		"""
+		try:
+			size, path = image_id.split("/", 1)
+			width, height = (int(dimension) for dimension in size.split("x"))
+		except ValueError:
+			Logger.log("w", "Invalid Settings Guide image URL: {image_id}".format(image_id=image_id))
+			return QImage(), QSize()
+		image_file = urllib.parse.unquote(path)
+		key = (image_file, width, height)
+
+		with self._lock:
+			image = self._images.get(key)
+			if image is not None:
+				self._images.move_to_end(key)
+				return image, image.size()
+
+		image = self._decode(image_file, width, height)
+		if image is None:
+			return QImage(), QSize()
+
+		with self._lock:
+			if key not in self._images:  # Could've been decoded by a different thread in the meanwhile.
+				self._images[key] = image
+				self._size += image.byteCount()
+				while self._size > self._budget and len(self._images) > 1:
+					_, evicted = self._images.popitem(last=False)
+					self._size -= evicted.byteCount()
+		return image, image.size()
+
+	def _decode(self, image_file: str, width: int, height: int) -> Optional[QImage]:
+		"""
+		Decode an image at a certain size.
+		:param image_file: The original image file.
+		:param width: The maximum width of the image, or 0 if the width is not
+		limited.
+		:param height: The maximum height of the image, or 0 if the height is
+		not limited.
+		:return: The decoded image, or `None` if it can't be read.
+		"""
+		if width > 0 or height > 0:
+			thumbnail = self._thumbnail_cache.create(image_file, width, height)
+			if thumbnail is None:
+				return None
+			image_file = thumbnail
+		image = QImageReader(image_file).read()
+		if image.isNull():
+			return None
+		return image
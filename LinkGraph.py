@@ -0,0 +1,116 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module keeps track of which articles link to which other articles.
+
+Links to other articles are relative paths to the Markdown file of the other article. The article ID of the target is
+the file name of that path. The graph is built from the Markdown sources of the articles, so that it doesn't depend on
+how the articles are rendered.
+"""
+
+import re  # To find the links in the articles.
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+find_links = re.compile(r"(?<!!)\[[^\]]*\]\(([^\)\s]+)[^\)]*\)")  # Links, but not images. The capture group is the URL.
+
+def article_id_from_link(link: str) -> Optional[str]:
+	"""
+	Get the ID of the article that a link refers to.
+
+	This doesn't check whether the article exists.
+	:param link: The URL or file path that is linked to.
+	:return: The article ID, or `None` if the link doesn't refer to an article.
+	"""
+	if "://" in link and not link.startswith("file://"):
+		return None  # A link to the internet.
+	if not link.endswith(".md"):
+		return None
+	filename = link.replace("\\", "/").rsplit("/", 1)[-1]  # Backslashes for Windows.
+	return filename[:-len(".md")]
+
+def extract_links(markdown: str) -> Set[str]:
+	"""
+	Find the articles that a piece of Markdown links to.
+	:param markdown: The Markdown source of an article.
+	:return: The IDs of the articles that are linked to.
+	"""
+	result = set()
+	for link in find_links.findall(markdown):
+		article_id = article_id_from_link(link)
+		if article_id is not None:
+			result.add(article_id)
+	return result
+
+class LinkGraph:
+	"""
+	A directed graph of the links between articles.
+
+	For each article, this stores the articles it links to and the articles
+	that link to it.
+	"""
+
+	def __init__(self, links: Optional[Dict[str, Set[str]]] = None) -> None:
+		"""
+		Creates a link graph.
+		:param links: For each article, the articles it links to.
+		"""
+		self._links = links if links is not None else {}  # type: Dict[str, Set[str]]
+		self._backlinks = {}  # type: Dict[str, Set[str]]
+		for source, targets in self._links.items():
+			for target in targets:
+				if target not in self._backlinks:
+					self._backlinks[target] = set()
+				self._backlinks[target].add(source)
+
+	@classmethod
+	def build(cls, article_ids: Iterable[str], read_source: Callable[[str], Optional[str]]) -> "LinkGraph":
+		"""
+		Build the link graph from the sources of the articles.
+
+		Links to articles that don't exist are left out.
+		:param article_ids: The articles to include in the graph.
+		:param read_source: A function that gets the Markdown source of an
+		article, or `None` if it can't be read.
+		:return: The link graph between those articles.
+		"""
+		article_ids = set(article_ids)
+		links = {}
+		for article_id in article_ids:
+			markdown = read_source(article_id)
+			if markdown is None:
+				continue
+			links[article_id] = {target for target in extract_links(markdown) if target in article_ids and target != article_id}
+		return cls(links)
+
+	def links(self, article_id: str) -> List[str]:
+		"""
+		Get the articles that an article links to.
+		:param article_id: The article to get the outgoing links of.
+		:return: The IDs of the linked articles, in alphabetical order.
+		"""
+		return sorted(self._links.get(article_id, set()))
+
+	def backlinks(self, article_id: str) -> List[str]:
+		"""
+		Get the articles that link to an article.
+		:param article_id: The article to get the incoming links of.
+		:return: The IDs of the articles linking to it, in alphabetical order.
+		"""
+		return sorted(self._backlinks.get(article_id, set()))
+
+	def update(self, article_id: str, targets: Set[str]) -> None:
+		"""
+		Change the articles that an article links to.
+		:param article_id: The article of which the links changed.
+		:param targets: The articles that it links to now.
+		"""
+		for target in self._links.get(article_id, set()):
+			self._backlinks[target].discard(article_id)
+		self._links[article_id] = set(targets)
+		for target in targets:
+			if target not in self._backlinks:
+				self._backlinks[target] = set()
+			self._backlinks[target].add(article_id)
@@ -4,12 +4,11 @@
 #You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
 
 from .Mistune import mistune  # Extending from this library's renderer.
+import functools  # To memoise the parsed conditional content.
 import os.path  # To fix the source paths for images.
-import PyQt5.QtCore  # To fix the source paths for images using QUrl.
+import pathlib  # To fix the source paths for images, converting them to file URLs.
 import re  # To find parts of the conditional syntax.
-import UM.Application  # To get the application version.
 import UM.Logger  # To log warnings if parsing went wrong.
-import UM.Qt.Bindings.Theme  # To get the correct hyperlink colour from the theme.
 import UM.Version  # To compare version numbers for conditional content.
 
 class QtMarkdownRenderer(mistune.Renderer):
@@ -25,16 +24,25 @@ class QtMarkdownRenderer(mistune.Renderer):
 	This renderer makes sure that the Markdown that gets interpreted by the
 	renderer displays correctly on a conventional Markdown parser such as that
 	of Github.
+
+	The renderer doesn't access the theme or any other part of Qt itself. The
+	theme properties it needs are provided as plain data, so that articles can
+	also be rendered in other processes.
 	"""
 
-	def __init__(self, images_path):
+	def __init__(self, images_path, link_colour, image_width):
 		"""
 		Creates a renderer with a certain relative path for resources.
 		:param images_path: The path to which relative paths should be
 		dereferenced.
+		:param link_colour: The colour to draw hyperlinks with, as HTML colour
+		code.
+		:param image_width: The width to display images with.
 		"""
 		super().__init__()
 		self._images_path = images_path
+		self._link_colour = link_colour
+		self._image_width = image_width
 
 	def link(self, link, title, text):
 		"""
@@ -50,15 +58,14 @@ class QtMarkdownRenderer(mistune.Renderer):
 		:return: HTML for Qt's Rich Text to display the link.
 		"""
 		link = mistune.escape_link(link)
-		link_colour = UM.Qt.Bindings.Theme.Theme.getInstance().getColor("text_link").name()
 
 		if "://" not in link and link.endswith(".md"):  # Link to a different article.
 			link = os.path.join(self._images_path, link)
 
 		if not title:
-			return "<a href=\"{link}\"><font color=\"{colour}\">{text}</font></a>".format(colour=link_colour, link=link, text=text)
+			return "<a href=\"{link}\"><font color=\"{colour}\">{text}</font></a>".format(colour=self._link_colour, link=link, text=text)
 		title = mistune.escape(title, quote=True)
-		return "<a href=\"{link}\" title=\"{title}\"><font color=\"{colour}\">{text}</font></a>".format(colour=link_colour, title=title, link=link, text=text)
+		return "<a href=\"{link}\" title=\"{title}\"><font color=\"{colour}\">{text}</font></a>".format(colour=self._link_colour, title=title, link=link, text=text)
 
 	def emphasis(self, text: str) -> str:
 		"""
@@ -84,36 +91,57 @@ class QtMarkdownRenderer(mistune.Renderer):
 		:return: HTML for Qt's Rich Text to display the image.
 		"""
 		image_full_path = os.path.join(self._images_path, src)
-		image_url = PyQt5.QtCore.QUrl.fromLocalFile(image_full_path).url()
-		margin = UM.Qt.Bindings.Theme.Theme.getInstance().getSize("default_margin").width()
-		width = UM.Qt.Bindings.Theme.Theme.getInstance().getSize("tooltip").width() * 2.5 / 3 - margin * 2  # Fit 3 images in the width.
-		return "<img src=\"{image_url}\" width=\"{width}\" />".format(image_url=image_url, width=width)
+		image_url = pathlib.Path(image_full_path).as_uri()
+		return "<img src=\"{image_url}\" width=\"{width}\" />".format(image_url=image_url, width=self._image_width)
+
+	check_pattern = re.compile(r"([A-Za-z0-9_]+)\s*(<=|==|!=|>=|<|>)\s*([^-^:]+?)\s*(?=(\s*and\s*|$))")
+	condition_pattern = r"([A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?(\s+and\s+[A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?)*)"
+	exposed_pattern = re.compile(r"<!--if\s+" + condition_pattern + r"\s*-->(.*?)<!--endif-->", flags=re.DOTALL)
+	hidden_pattern = re.compile(r"<!--if\s+" + condition_pattern + r"\s*:(.*?)-->", flags=re.DOTALL)
+
+	version_variables = {"cura_version"}  # Variables that are compared as version numbers. Other variables are compared as strings.
 
 	@classmethod
-	def condition_met(cls, condition):
+	def condition_met(cls, condition, variables):
 		"""
 		Checks if a piece of conditional Markdown should be shown or not.
+
+		The result is memoised for each condition and set of variables, since
+		the same conditions occur in many articles.
 		:param condition: The condition under which the content gets shown, as a
 		string. This needs to be formatted as a series of variable checks of the
 		form `variable <= value` (with any comparative operator). If there are
 		multiple of these checks (separated with `and`) then all of them must
 		hold for the condition to be met.
+		:param variables: The values of the variables that may be used in the
+		condition, such as `cura_version`, as a dictionary.
 		:return: `True` if the condition is met, or `False` if it is not met.
 		"""
-		check_pattern = r"([A-Za-z09_]+)\s*(<=|==|!=|>=|<|>)\s*([^-^:]+?)\s*(?=(\s*and\s*|$))"
-		for match in re.finditer(check_pattern, condition):
+		return cls._condition_met(condition, tuple(sorted(variables.items())))
+
+	@classmethod
+	@functools.lru_cache(maxsize=1024)
+	def _condition_met(cls, condition, variables):
+		"""
+		Checks if a piece of conditional Markdown should be shown or not.
+		:param condition: The condition under which the content gets shown.
+		:param variables: The values of the variables, as a sorted tuple of
+		name-value pairs.
+		:return: `True` if the condition is met, or `False` if it is not met.
+		"""
+		variables = dict(variables)
+		for match in cls.check_pattern.finditer(condition):
 			variable = match.group(1)
 			operator = match.group(2)
 			value = match.group(3)
 
-			if variable == "cura_version":
-				variable_value = UM.Application.Application.getInstance().getVersion()
-			else:
+			if variable not in variables:
 				UM.Logger.Logger.log("w", "Unknown variable in condition: {variable}".format(variable=variable))
 				return False
+			variable_value = variables[variable]
 
 			# Depending on the variable, we may need to convert the type for proper comparison.
-			if variable == "cura_version":
+			if variable in cls.version_variables:
 				variable_value = UM.Version.Version(variable_value)
 				value = UM.Version.Version(value)
 
@@ -142,7 +170,44 @@ class QtMarkdownRenderer(mistune.Renderer):
 		return True
 
 	@classmethod
-	def preprocess_conditionals(cls, markdown):
+	@functools.lru_cache(maxsize=64)
+	def compile_conditionals(cls, markdown):
+		"""
+		Split a piece of Markdown into the text that is always shown and the
+		conditional pieces of text.
+
+		The result can be evaluated for any set of variables without parsing
+		the Markdown again. It's memoised for the most recent pieces of
+		Markdown, so that an article that is rendered again (e.g. for a
+		different language or Cura version) only needs to be evaluated.
+		:param markdown: A piece of Markdown with conditional content.
+		:return: A tuple of segments. Each segment is a tuple of a condition
+		and a piece of text. The condition is `None` if the text is always
+		shown.
+		"""
+		if "<!--if" not in markdown:
+			return ((None, markdown),)  # Most articles have no conditional content at all.
+
+		# First replace all occurrences of the exposed pattern with the hidden pattern so that we only need to split on one regex at a time.
+		markdown = cls.exposed_pattern.sub(r"<!--if \1:\5-->", markdown)
+
+		# Now split the text into the conditions, the contents and the pieces between conditionals.
+		segments = []
+		condition = None  # The condition of the upcoming conditional part.
+		for i, part in enumerate(cls.hidden_pattern.split(markdown)):
+			if i % 6 == 0:  # Outside of the conditional.
+				if part:
+					segments.append((None, part))
+			elif i % 6 == 1:  # The condition for some upcoming piece of text.
+				condition = part
+				# Pieces 2, 3 and 4 are not interesting here, but only groups necessary for the order of operations in the regex.
+			elif i % 6 == 5:  # The conditional text.
+				if part:
+					segments.append((condition, part))
+		return tuple(segments)
+
+	@classmethod
+	def preprocess_conditionals(cls, markdown, variables):
 		"""
 		Preprocesses a piece of Markdown so that conditional texts get properly
 		parsed.
@@ -173,32 +238,21 @@ class QtMarkdownRenderer(mistune.Renderer):
 		and a value. The conditional content is shown only if the condition is
 		met. For instance, you could have a condition such as:
 		`cura_version < 4.4` which would cause the conditional content to draw
-		only if the user is using a Cura version earlier than 4.4.
+		only if the user is using a Cura version earlier than 4.4. The available
+		variables are `cura_version`, `language` (the language of the article,
+		e.g. `nl_NL`) and `platform` (`windows`, `darwin` or `linux`).
 
 		This function finds all of the conditional elements in the text, parses
-		them and chooses whether to display them or not.
+		them and chooses whether to display them or not. The parsed elements are
+		memoised, see `compile_conditionals`.
 		:param markdown: A piece of Markdown that needs to get pre-processed.
+		:param variables: A dictionary with the values of the variables to
+		display the content for.
 		:return: The same Markdown, but without the HTML comments, and their
 		contents are only included if the condition inside the comments was met.
 		"""
-		condition_pattern = r"([A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?(\s+and\s+[A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?)*)"
-		exposed_pattern = r"<!--if\s+" + condition_pattern + r"\s*-->(.*?)<!--endif-->"
-		hidden_pattern = r"<!--if\s+" + condition_pattern + r"\s*:(.*?)-->"
-
-		# First replace all occurrences of the exposed pattern with the hidden pattern so that we only need to split on one regex at a time.
-		markdown = re.sub(exposed_pattern, r"<!--if \1:\5-->", markdown, flags=re.DOTALL)
-
-		# Now split the text into the conditions, the contents and the pieces between conditionals.
-		result = ""
-		condition_met = False  # Whether to display the upcoming conditional part.
-		for i, part in enumerate(re.split(hidden_pattern, markdown, flags=re.DOTALL)):
-			if i % 6 == 0:  # Outside of the conditional.
-				result += part
-			elif i % 6 == 1:  # The condition for some upcoming piece of text.
-				condition_met = cls.condition_met(part)
-				# Pieces 2, 3 and 4 are not interesting here, but only groups necessary for the order of operations in the regex.
-			elif i % 6 == 5:  # The conditional text.
-				if condition_met:  # Only add this if the last condition was met.
-					result += part
-
-		return result
\ No newline at end of file
+		segments = cls.compile_conditionals(markdown)
+		if len(segments) == 1 and segments[0][0] is None:
+			return segments[0][1]
+		variables = tuple(sorted(variables.items()))
+		return "".join(text for condition, text in segments if condition is None or cls._condition_met(condition, variables))
@@ -0,0 +1,369 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module plans which screenshots the screenshot tool needs to take, and in which order.
+
+The screenshot instructions are taken from the English articles, since the translations use the same images. Each
+instruction is validated, and instructions for the same image are merged. The screenshots are then grouped into setups:
+screenshots that use the same models and settings, so they can be taken from one loaded scene and one slice. Settings
+that are equal to the baseline that the screenshot tool always uses don't count as different settings. The setups
+are ordered so that consecutive setups reuse the loaded models where possible, and consecutive changes to the settings
+are small.
+
+This module doesn't depend on Cura, so that the plan can be checked without starting Cura:
+`python3 ScreenshotPlanner.py [--resources <resources folder>]`
+"""
+
+import argparse  # To parse the command line arguments of the dry run.
+import collections  # For namedtuple.
+import copy  # To fill in defaults without modifying the instructions.
+import json  # Screenshot instructions are stored in JSON format.
+import numbers  # To validate and compare numeric fields of the instructions.
+import os  # To find the articles and the model scripts.
+import re  # To find the screenshot instructions.
+import sys  # To return an error code from the dry run.
+from typing import Any, Dict, List, Tuple
+
+find_instructions_regex = re.compile(r"<!--screenshot\s*({.*?})\s*-->", re.DOTALL)
+
+colour_schemes = ["material_colour", "line_type", "speed", "layer_thickness", "line_width"]
+structure_types = ["travels", "helpers", "shell", "infill", "starts"]
+transformation_regex = re.compile(r"^(mirrorx|mirrory|mirrorz)(\(\))?$|^(scale|scalex|scaley|scalez|rotatex|rotatey|rotatez|translatex|translatey|translatez)\(\s*-?[0-9.]+\s*\)$")
+
+instruction_defaults = {
+	"camera_lookat": None,  # Look at the centre of the scene.
+	"minimum_layer": 0,
+	"layer": 99999,
+	"line": -1,
+	"colour_scheme": "line_type",
+	"structures": ["helpers", "shell", "infill", "starts"],
+	"settings": {},
+	"colours": 256,
+	"delay": 500
+}
+model_defaults = {
+	"scad_params": [],
+	"transformation": [],
+	"object_settings": {}
+}
+
+# Settings that the screenshot tool sets for every screenshot before applying the settings of the instruction. Setting
+# one of these to the same value in an instruction doesn't change the slice.
+baseline_settings = {
+	"layer_height": 0.06,  # Reducing layer height makes the sides look smoother. This improves compression but also reduces distraction from the layer lines.
+	"adhesion_type": "none",  # Except for settings concerning bed adhesion, remove adhesion type to remove distraction from the actual object.
+	"z_seam_type": "back",  # Seam alignment to "User Specified" to align the seam. This makes the seam more recognisable as such, and allows us to find a camera angle that hides it if necessary.
+	"z_seam_position": "backleft"  # In case of axis-aligned models (which is pretty common) this puts the seam in a corner rather than spreading it out over a side.
+}
+
+# Rough estimates of how long each step of taking screenshots takes, in seconds. Only used to estimate the cost of a plan.
+setup_cost = 5  # Resetting the printer and changing the settings.
+model_load_cost = 3  # Loading one model and placing it on the build plate.
+slice_cost = 30  # Slicing the scene and loading layer view.
+frame_cost = 3  # Rendering one frame of a screenshot.
+optimise_cost = 10  # Reducing colours and optimising the file size of one image.
+
+Setup = collections.namedtuple("Setup", ["models", "settings", "reload_models", "slice", "screenshots"])
+"""
+A group of screenshots that are taken from the same scene.
+* models: The models to load, as normalised model instructions.
+* settings: The settings to slice with.
+* reload_models: Whether the models need to be loaded. If `False`, the same models are still loaded from the previous
+  setup, and only the settings need to be changed.
+* slice: Whether any of the screenshots needs layer view, so the scene needs to be sliced.
+* screenshots: The normalised screenshot instructions, in the order in which to take them.
+"""
+
+def normalise(document: Dict[str, Any]) -> Dict[str, Any]:
+	"""
+	Fill in the defaults of a screenshot instruction.
+
+	Instructions that result in the same screenshot are equal after they are
+	normalised.
+	:param document: A screenshot instruction, as parsed from the article.
+	:return: The same instruction, with all optional fields filled in.
+	"""
+	result = copy.deepcopy(instruction_defaults)
+	result.update(copy.deepcopy(document))
+	result["models"] = [dict(copy.deepcopy(model_defaults), **model) for model in document.get("models", [])]
+	return result
+
+def validate(document: Any, models_path: str) -> List[str]:
+	"""
+	Check whether a screenshot instruction is valid.
+	:param document: A screenshot instruction, as parsed from the article.
+	:param models_path: The folder containing the scripts to generate models
+	with.
+	:return: A list of problems with the instruction. If it's empty, the
+	instruction is valid.
+	"""
+	if not isinstance(document, dict):
+		return ["The instruction must be a JSON object."]
+	errors = []
+	known_fields = {"image_path", "models", "camera_position"} | set(instruction_defaults)
+	for field in document:
+		if field not in known_fields:
+			errors.append("Unknown field \"{field}\".".format(field=field))
+	for field in ("image_path", "models", "camera_position"):
+		if field not in document:
+			errors.append("Missing required field \"{field}\".".format(field=field))
+
+	def is_number(value):
+		return isinstance(value, numbers.Real) and not isinstance(value, bool)
+	def is_int(value):
+		return isinstance(value, int) and not isinstance(value, bool)
+	def is_point(value):
+		return isinstance(value, list) and len(value) == 3 and all(is_number(coordinate) for coordinate in value)
+	def is_frames(value):
+		return is_int(value) or (isinstance(value, list) and len(value) > 0 and all(is_int(frame) for frame in value))
+
+	image_path = document.get("image_path", "")
+	if not isinstance(image_path, str) or not image_path or os.path.isabs(image_path) or ".." in image_path.split("/"):
+		errors.append("The image_path must be a file name in the images folder.")
+	if "camera_position" in document and not is_point(document["camera_position"]):
+		errors.append("The camera_position must be a list of 3 numbers.")
+	if document.get("camera_lookat") is not None and not is_point(document["camera_lookat"]):
+		errors.append("The camera_lookat must be a list of 3 numbers.")
+	for field in ("minimum_layer", "layer", "line"):
+		if field in document and not is_frames(document[field]):
+			errors.append("The {field} must be an integer or a list of integers.".format(field=field))
+	if "colour_scheme" in document and document["colour_scheme"] not in colour_schemes:
+		errors.append("Unknown colour_scheme \"{colour_scheme}\".".format(colour_scheme=document["colour_scheme"]))
+	if "structures" in document and (not isinstance(document["structures"], list) or any(structure not in structure_types for structure in document["structures"])):
+		errors.append("The structures must be a list of: " + ", ".join(structure_types) + ".")
+	if "settings" in document and not isinstance(document["settings"], dict):
+		errors.append("The settings must be a JSON object.")
+	if "colours" in document and (not is_int(document["colours"]) or not 1 <= document["colours"] <= 256):
+		errors.append("The colours must be an integer from 1 to 256.")
+	if "delay" in document and (not is_number(document["delay"]) or document["delay"] <= 0):
+		errors.append("The delay must be a positive number.")
+
+	models = document.get("models", [])
+	if not isinstance(models, list) or not models:
+		if "models" in document:  # If it's missing, that's already reported.
+			errors.append("The models must be a non-empty list.")
+		models = []
+	for index, model in enumerate(models):
+		if not isinstance(model, dict):
+			errors.append("Model {index} must be a JSON object.".format(index=index))
+			continue
+		for field in model:
+			if field != "script" and field not in model_defaults:
+				errors.append("Unknown field \"{field}\" in model {index}.".format(field=field, index=index))
+		script = model.get("script")
+		if not isinstance(script, str) or os.path.splitext(script)[1] not in (".scad", ".py"):
+			errors.append("The script of model {index} must be an OpenSCAD or Python file.".format(index=index))
+		elif not os.path.isfile(os.path.join(models_path, script)):
+			errors.append("The script {script} of model {index} doesn't exist.".format(script=script, index=index))
+		if "scad_params" in model and (not isinstance(model["scad_params"], list) or any(not isinstance(param, str) or "=" not in param for param in model["scad_params"])):
+			errors.append("The scad_params of model {index} must be a list of \"key=value\" strings.".format(index=index))
+		if "transformation" in model and (not isinstance(model["transformation"], list) or any(not isinstance(transformation, str) or not transformation_regex.match(transformation.lower().replace(" ", "")) for transformation in model["transformation"])):
+			errors.append("The transformation of model {index} contains an unknown transformation.".format(index=index))
+		if "object_settings" in model and not isinstance(model["object_settings"], dict):
+			errors.append("The object_settings of model {index} must be a JSON object.".format(index=index))
+	return errors
+
+def find_instructions(resources_path: str) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+	"""
+	Find all screenshot instructions in the English articles.
+
+	Invalid instructions are left out. If there are multiple instructions for
+	the same image, only the first is used, in alphabetical order of the
+	article files.
+	:param resources_path: The resources folder of the plug-in.
+	:return: The valid, normalised instructions, a list of errors in the
+	instructions that were left out, and a list of warnings about conflicting
+	instructions for the same image.
+	"""
+	models_path = os.path.join(resources_path, "models")
+	instructions = {}  # type: Dict[str, Dict[str, Any]]  # For each image, its normalised instruction.
+	errors = []
+	warnings = []
+	for root, directories, files in os.walk(os.path.join(resources_path, "articles")):
+		directories.sort()  # Walk in a consistent order, so that the same instruction is used for duplicate images.
+		for filename in sorted(files):
+			if os.path.splitext(filename)[1] != ".md":
+				continue
+			article_file = os.path.join(root, filename)
+			with open(article_file, encoding="utf-8") as f:
+				markdown = f.read()
+			for match in find_instructions_regex.finditer(markdown):
+				location = os.path.relpath(article_file, resources_path)
+				try:
+					document = json.loads(match.group(1))
+				except ValueError as e:
+					errors.append("{location}: Invalid JSON: {err}".format(location=location, err=str(e)))
+					continue
+				problems = validate(document, models_path)
+				if problems:
+					errors.extend("{location}: {image_path}: {problem}".format(location=location, image_path=document.get("image_path") if isinstance(document, dict) else "", problem=problem) for problem in problems)
+					continue
+				instruction = normalise(document)
+				image_path = instruction["image_path"]
+				if image_path in instructions:
+					if instructions[image_path] != instruction:
+						warnings.append("{location}: {image_path}: A different instruction for this image is used from another article.".format(location=location, image_path=image_path))
+					continue
+				instructions[image_path] = instruction
+	return [instructions[image_path] for image_path in sorted(instructions)], errors, warnings
+
+def models_key(instruction: Dict[str, Any]) -> str:
+	"""
+	Get a key that is equal for screenshots that use the same models.
+	:param instruction: A normalised screenshot instruction.
+	:return: A key identifying the loaded models.
+	"""
+	return json.dumps(instruction["models"], sort_keys=True)
+
+def setting_value(value: Any) -> Any:
+	"""
+	Get a value of a setting in a form that is equal for values that Cura
+	treats the same.
+	:param value: The value of a setting in a screenshot instruction.
+	:return: The same value, but with all numbers as floating point, so that
+	e.g. `2` and `2.0` are equal.
+	"""
+	if isinstance(value, list):
+		return [setting_value(element) for element in value]
+	if isinstance(value, numbers.Real) and not isinstance(value, bool):
+		return float(value)
+	return value
+
+def effective_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+	"""
+	Get the settings of a screenshot instruction that change the slice.
+
+	Settings that are set to the same value as the baseline of the screenshot
+	tool don't change anything, so they are left out.
+	:param settings: The settings of a screenshot instruction.
+	:return: The settings that differ from the baseline, with their values in
+	the form given by `setting_value`.
+	"""
+	result = {}
+	for key, value in settings.items():
+		value = setting_value(value)
+		if key not in baseline_settings or setting_value(baseline_settings[key]) != value:
+			result[key] = value
+	return result
+
+def slice_key(instruction: Dict[str, Any]) -> str:
+	"""
+	Get a key that is equal for all screenshots that can be taken from the
+	same scene and slice.
+
+	These are the screenshots that use the same models, with the same
+	transformations and per-object settings, and the same effective settings
+	(see `effective_settings`). They may differ in the camera position, the
+	layers that are shown and what is visible in layer view.
+	:param instruction: A normalised screenshot instruction.
+	:return: A key identifying the scene and slice that the screenshot is
+	taken from.
+	"""
+	return json.dumps({"models": instruction["models"], "settings": effective_settings(instruction["settings"])}, sort_keys=True)
+
+def frames(instruction: Dict[str, Any]) -> List[int]:
+	"""
+	Get the layer numbers of the frames of a screenshot.
+	:param instruction: A normalised screenshot instruction.
+	:return: For each frame, the layer to show, or -1 if it shows the models
+	themselves.
+	"""
+	counts = [len(instruction[field]) if isinstance(instruction[field], list) else 1 for field in ("minimum_layer", "layer", "line")]
+	layers = instruction["layer"] if isinstance(instruction["layer"], list) else [instruction["layer"]]
+	return [layers[index % len(layers)] for index in range(max(counts))]
+
+def settings_distance(settings_a: Dict[str, Any], settings_b: Dict[str, Any]) -> int:
+	"""
+	Count how many settings differ between two sets of settings.
+	:param settings_a: One set of settings.
+	:param settings_b: The other set of settings.
+	:return: The number of settings that need to change to go from one to the
+	other.
+	"""
+	return sum(1 for key in settings_a.keys() | settings_b.keys() if settings_a.get(key) != settings_b.get(key))
+
+def plan(instructions: List[Dict[str, Any]]) -> List[Setup]:
+	"""
+	Plan the order in which to take screenshots.
+
+	Screenshots from the same scene and slice are grouped in one setup. Setups
+	with the same models are placed one after another, so that the models only
+	need to be loaded once. Among those, the setups are ordered greedily, each
+	time choosing the setup with the fewest setting changes from the previous.
+	:param instructions: The normalised instructions of the screenshots to
+	take.
+	:return: The setups, in the order in which to execute them.
+	"""
+	groups = collections.OrderedDict()  # type: Dict[str, Dict[str, List[Dict[str, Any]]]]  # For each set of models, for each slice key, the screenshots.
+	for instruction in instructions:
+		groups.setdefault(models_key(instruction), collections.OrderedDict()).setdefault(slice_key(instruction), []).append(instruction)
+
+	result = []
+	for models in sorted(groups):
+		remaining = list(groups[models].values())
+		previous_settings = {}  # type: Dict[str, Any]
+		first = True
+		while remaining:
+			screenshots = min(remaining, key=lambda group: settings_distance(previous_settings, effective_settings(group[0]["settings"])))
+			remaining.remove(screenshots)
+			screenshots.sort(key=lambda instruction: (max(frames(instruction)) >= 0, instruction["colour_scheme"], instruction["structures"], instruction["image_path"]))  # Solid view first, then layer view with as few changes to the view as possible.
+			result.append(Setup(
+				models=screenshots[0]["models"],
+				settings=screenshots[0]["settings"],
+				reload_models=first,
+				slice=any(layer >= 0 for instruction in screenshots for layer in frames(instruction)),
+				screenshots=screenshots
+			))
+			previous_settings = effective_settings(screenshots[0]["settings"])
+			first = False
+	return result
+
+def estimate(setups: List[Setup]) -> Dict[str, float]:
+	"""
+	Estimate the cost of executing a plan.
+	:param setups: The plan to estimate the cost of.
+	:return: The number of setups, model loads, slices, screenshots and
+	frames, and a rough estimate of the time it takes in seconds.
+	"""
+	result = {
+		"setups": len(setups),
+		"model_loads": sum(len(setup.models) for setup in setups if setup.reload_models),
+		"slices": sum(1 for setup in setups if setup.slice),
+		"screenshots": sum(len(setup.screenshots) for setup in setups),
+		"frames": sum(len(frames(instruction)) for setup in setups for instruction in setup.screenshots)
+	}
+	result["seconds"] = result["setups"] * setup_cost + result["model_loads"] * model_load_cost + result["slices"] * slice_cost + result["frames"] * frame_cost + result["screenshots"] * optimise_cost
+	return result
+
+def print_plan(setups: List[Setup]) -> None:
+	"""
+	Print a plan in a human-readable format.
+	:param setups: The plan to print.
+	"""
+	for index, setup in enumerate(setups):
+		steps = (["load models"] if setup.reload_models else []) + (["slice"] if setup.slice else [])
+		print("Setup {index}: {models} ({steps})".format(index=index + 1, models=", ".join(model["script"] for model in setup.models), steps=", ".join(steps) or "change settings"))
+		if setup.settings:
+			print("  Settings: " + json.dumps(setup.settings, sort_keys=True))
+		for instruction in setup.screenshots:
+			layers = frames(instruction)
+			view = "layer view" if max(layers) >= 0 else "solid view"
+			print("  - {image_path} ({view}, {num_frames} frame{plural})".format(image_path=instruction["image_path"], view=view, num_frames=len(layers), plural="" if len(layers) == 1 else "s"))
+	cost = estimate(setups)
+	print("{screenshots} screenshots ({frames} frames) in {setups} setups, with {model_loads} model loads and {slices} slices. Estimated time: {minutes:.0f} minutes.".format(minutes=cost["seconds"] / 60, **cost))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Plan which screenshots to refresh, without taking them.")
+	parser.add_argument("--resources", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources"), help="The resources folder of the plug-in.")
+	arguments = parser.parse_args()
+
+	instructions, errors, warnings = find_instructions(arguments.resources)
+	print_plan(plan(instructions))
+	for warning in warnings:
+		print("Warning: " + warning, file=sys.stderr)
+	for error in errors:
+		print("Error: " + error, file=sys.stderr)
+	sys.exit(1 if errors else 0)
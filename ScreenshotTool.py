@@ -4,6 +4,8 @@
 # You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
 
 import collections  # For namedtuple.
+import concurrent.futures  # To convert models in parallel.
+import hashlib  # To fingerprint the screenshot instructions, to see whether they changed.
 import importlib.util  # To execute Python scripts to generate 3D models.
 import json  # Screenshot instructions are stored in JSON format.
 import math  # Rendering correct overhang angle.
@@ -13,8 +15,9 @@ import os.path  # To store temporary files.
 import re  # To find the screenshot instructions.
 import subprocess  # To call external applications to do conversions and optimisations for us.
 import threading  # To multi-thread optimisation of the optimisation calls (which take a long time and are not always multi-threaded applications).
-import time  # Crude way to make asynchronous calls synchronous: Spinlock until we get a signal that the asynchronous method is completed.
+import time  # To time out when waiting for Cura.
 import typing
+import PyQt5.QtCore  # To wait for signals from Qt.
 import PyQt5.QtGui  # For QImage, the result of the renders.
 
 import cura.CuraApplication  # To change the settings before slicing.
@@ -38,6 +41,8 @@ import UM.Scene.Selection  # To clear the selection before taking screenshots.
 import UM.Settings.SettingInstance  # To add per-object settings to the loaded models.
 import UM.View.GL.OpenGL  # To load the shaders to render screenshots with.
 
+from . import ScreenshotPlanner  # To find, validate and order the screenshot instructions.
+
 """
 This module provides an automatic way to generate screenshots for the Settings Guide.
 It is not supplied with the actual Settings Guide package.
@@ -67,6 +72,10 @@ https://create.stephan-brumme.com/flexigif-lossless-gif-lzw-optimization/
 The tool is available by setting the preference "settings_guide/screenshot_tool" to True. A button will then be
 visible on every article. When pressed, it will re-create the images for that article. A button will also be present
 on the landing page that will re-create ALL images. This takes a long time!
+
+Images of which the instruction, the model scripts and the Cura version haven't changed since they were last refreshed
+are skipped. To refresh them anyway, delete the screenshot manifest (screenshot_manifest.json) in the
+settings_guide_screenshots folder in Cura's data storage folder.
 """
 
 # These are several system commands we can execute to perform various tasks using external tools.
@@ -91,6 +100,133 @@ def call_with_args(command, **kwargs) -> None:
 	UM.Logger.Logger.info("Subprocess: " + " ".join(args))
 	subprocess.call(args)
 
+# Time-outs, in seconds, when waiting for Cura to complete some asynchronous task.
+scene_timeout = 10  # Processing the scene after loading or transforming models.
+scene_quiet_period = 0.5  # The scene is considered to be processed if it didn't change for this long.
+slice_timeout = 600  # Slicing the scene.
+slice_attempts = 3  # How often to try slicing if the engine fails.
+layer_data_timeout = 60  # Processing the sliced layers for layer view.
+frame_timeout = 5  # Rendering the next frame in the main window.
+snapshot_attempts = 5  # How often to render a snapshot if the result is not the correct size.
+poll_interval = 0.25  # Conditions are checked whenever a signal is emitted, but also this often in case a change doesn't emit a signal.
+
+conversion_workers = os.cpu_count() or 1  # How many models to convert at the same time.
+
+layer_view_size = (2524, 1376)  # The size of the layer view render output. These are hard-coded to the screen size on half of my screen for now.
+
+def _connect(signal, callback) -> None:
+	"""
+	Connect a callback to a Qt signal or a Uranium signal.
+
+	Qt signals are connected directly, so that the callback is called even
+	though the waiting thread has no event loop.
+	:param signal: The signal to connect to.
+	:param callback: The function to call when the signal is emitted.
+	"""
+	if isinstance(signal, PyQt5.QtCore.pyqtBoundSignal):
+		signal.connect(callback, PyQt5.QtCore.Qt.DirectConnection)
+	else:
+		signal.connect(callback)
+
+def wait_for_emission(signal, trigger, accept, timeout) -> typing.Optional[tuple]:
+	"""
+	Start an asynchronous task, and block this thread until a signal indicates
+	that it's done.
+	:param signal: The signal that indicates progress of the task.
+	:param trigger: A function that starts the task. The signal is connected
+	before this is called, so that no emissions are missed.
+	:param accept: A function that gets the arguments of each emission, and
+	returns whether the task is done.
+	:param timeout: The maximum time to wait, in seconds.
+	:return: The arguments of the emission that indicated the task was done, or
+	`None` if it timed out.
+	"""
+	result = []
+	done = threading.Event()
+	def on_emit(*args):
+		if not done.is_set() and accept(*args):
+			result.append(args)
+			done.set()
+	_connect(signal, on_emit)
+	try:
+		trigger()
+		if not done.wait(timeout):
+			return None
+		return result[0]
+	finally:
+		signal.disconnect(on_emit)
+
+def wait_until(signal, check, timeout) -> bool:
+	"""
+	Block this thread until a condition holds.
+
+	The condition is checked every time the signal is emitted.
+	:param signal: A signal that is emitted when the condition may have
+	changed.
+	:param check: A function that returns whether the condition holds.
+	:param timeout: The maximum time to wait, in seconds.
+	:return: Whether the condition holds. If `False`, it timed out.
+	"""
+	changed = threading.Event()
+	def on_emit(*args):
+		changed.set()
+	_connect(signal, on_emit)
+	try:
+		deadline = time.monotonic() + timeout
+		while True:
+			changed.clear()
+			if check():
+				return True
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				return False
+			changed.wait(min(remaining, poll_interval))
+	finally:
+		signal.disconnect(on_emit)
+
+def wait_until_quiet(signal, quiet_period, timeout) -> bool:
+	"""
+	Block this thread until a signal stops being emitted for a while.
+	:param signal: The signal to listen to.
+	:param quiet_period: How long the signal must not be emitted, in seconds.
+	:param timeout: The maximum time to wait, in seconds.
+	:return: Whether the signal became quiet. If `False`, it timed out.
+	"""
+	emitted = threading.Event()
+	def on_emit(*args):
+		emitted.set()
+	_connect(signal, on_emit)
+	try:
+		deadline = time.monotonic() + timeout
+		while time.monotonic() + quiet_period <= deadline:
+			emitted.clear()
+			if not emitted.wait(quiet_period):
+				return True
+		return False
+	finally:
+		signal.disconnect(on_emit)
+
+def wait_for_scene() -> None:
+	"""
+	Wait until Cura has processed the changes to the scene, such as placing new
+	models on the build plate.
+	"""
+	scene = cura.CuraApplication.CuraApplication.getInstance().getController().getScene()
+	if not wait_until_quiet(scene.sceneChanged, scene_quiet_period, scene_timeout):
+		UM.Logger.Logger.warning("The scene kept changing for {timeout} seconds. Continuing anyway.".format(timeout=scene_timeout))
+
+def wait_for_frame() -> None:
+	"""
+	Wait until the main window has rendered a new frame, so that the scene is
+	up to date with the latest changes.
+	"""
+	main_window = cura.CuraApplication.CuraApplication.getInstance().getMainWindow()
+	if main_window is None:
+		return
+	trigger = lambda: PyQt5.QtCore.QMetaObject.invokeMethod(main_window, "update", PyQt5.QtCore.Qt.QueuedConnection)
+	if wait_for_emission(main_window.frameSwapped, trigger, lambda: True, frame_timeout) is None:
+		UM.Logger.Logger.warning("The main window didn't render a frame in {timeout} seconds. Continuing anyway.".format(timeout=frame_timeout))
+
 ScreenshotInstruction = collections.namedtuple("ScreenshotInstruction", ["image_path", "models", "camera_position", "camera_lookat", "minimum_layer", "layer", "line", "colour_scheme", "structures", "settings", "colours", "delay"])
 ModelInstruction = collections.namedtuple("ModelInstruction", ["script", "scad_params", "transformation", "object_settings"])
 """
@@ -126,85 +262,172 @@ All the information needed to take a screenshot.
 def refresh_screenshots(article_text, refreshed_set) -> None:
 	"""
 	Refresh the screenshots nested in the selected article text.
+	:param article_text: The text containing embedded screenshots to refresh.
+	:param refreshed_set: Set of images that have already been refreshed and don't need to be refreshed this pass if
+	encountered.
+	"""
+	refresh_instructions(list(find_screenshots(article_text)), refreshed_set)
+
+def refresh_all_screenshots(refreshed_set) -> None:
+	"""
+	Refresh the screenshots of all articles.
+
+	The screenshot instructions are read from the English articles, regardless of which articles are loaded. Invalid
+	instructions are logged and skipped.
+	:param refreshed_set: Set of images that have already been refreshed and don't need to be refreshed this pass if
+	encountered.
+	"""
+	instructions, errors, warnings = ScreenshotPlanner.find_instructions(os.path.join(os.path.dirname(__file__), "resources"))
+	for warning in warnings:
+		UM.Logger.Logger.warning("Screenshot instruction: " + warning)
+	for error in errors:
+		UM.Logger.Logger.error("Invalid screenshot instruction: " + error)
+	refresh_instructions([instruction_from_document(document) for document in instructions], refreshed_set)
+
+def refresh_instructions(screenshot_instructions, refreshed_set) -> None:
+	"""
+	Refresh the screenshots of a number of screenshot instructions.
 
 	This function serves as glue code and an overview of the stages through which we go in order to refresh the
 	screenshots.
-	:param article_text: The text containing embedded screenshots to refresh.
+
+	The screenshots are taken in the order planned by the screenshot planner. Screenshots that are taken of the same
+	models with the same settings are loaded and sliced only once. If consecutive groups of screenshots use the same
+	models, only the settings are changed in between. Screenshots that can't be taken are logged and skipped.
+	:param screenshot_instructions: The instructions of the screenshots to refresh.
 	:param refreshed_set: Set of images that have already been refreshed and don't need to be refreshed this pass if
 	encountered.
 	"""
-	for screenshot_instruction in find_screenshots(article_text):
-		if screenshot_instruction.image_path in refreshed_set:
+	manifest = load_manifest()
+	pending = []  # The normalised instructions of the images that need to be refreshed.
+	fingerprints = {}  # For each image that needs to be refreshed, the fingerprint of its instruction.
+	for screenshot_instruction in screenshot_instructions:
+		if screenshot_instruction.image_path in refreshed_set or screenshot_instruction.image_path in fingerprints:
 			continue  # Has already been refreshed. Don't refresh again.
-
-		setup_printer(screenshot_instruction.settings)
-		for model in screenshot_instruction.models:
-			stl_path = convert_model(model.script, model.scad_params)
-			load_model(stl_path, model.transformation, model.object_settings)
-
-		layers = screenshot_instruction.layer
-		if type(layers) != list:  # To simplify processing, always use lists for the layer, line and minimum layer, pretending it's always an animation.
-			layers = [layers]
-		lines = screenshot_instruction.line
-		if type(lines) != list:
-			lines = [lines]
-		minimum_layers = screenshot_instruction.minimum_layer
-		if type(minimum_layers) != list:
-			minimum_layers = [minimum_layers]
-		num_screenshots = max(len(layers), len(lines), len(minimum_layers))
-		# Make the lines, layers and minimum layers equally long by repeating some of them.
-		while len(layers) < num_screenshots:
-			layers *= 2
-		while len(layers) > num_screenshots:
-			layers.pop()
-		while len(lines) < num_screenshots:
-			lines *= 2
-		while len(lines) > num_screenshots:
-			lines.pop()
-		while len(minimum_layers) < num_screenshots:
-			minimum_layers *= 2
-		while len(minimum_layers) > num_screenshots:
-			minimum_layers.pop()
-
-		is_animation = len(layers) > 1
-		if layers[0] >= 0:
-			slice_scene()
-
 		full_image_path = os.path.join(os.path.dirname(__file__), "resources", "articles", "images", screenshot_instruction.image_path)
+		screenshot_fingerprint = fingerprint(screenshot_instruction)
+		if manifest.get(screenshot_instruction.image_path) == screenshot_fingerprint and os.path.exists(full_image_path):
+			UM.Logger.Logger.info("Screenshot {image_path} is up to date.".format(image_path=screenshot_instruction.image_path))
+			refreshed_set.add(screenshot_instruction.image_path)
+			continue  # Nothing changed since it was last refreshed.
+		fingerprints[screenshot_instruction.image_path] = screenshot_fingerprint
+		pending.append(instruction_document(screenshot_instruction))
+
+	plan = ScreenshotPlanner.plan(pending)
+	cost = ScreenshotPlanner.estimate(plan)
+	UM.Logger.Logger.info("Refreshing {screenshots} screenshots in {setups} setups, with {model_loads} model loads and {slices} slices.".format(**cost))
+	convert_models([model for setup in plan for model in setup.models])  # Generate all models before starting, so they don't hold up the slicing.
+	models_error = None  # If the models currently in the scene could not all be loaded, why. Then screenshots of those models are skipped.
+	for setup in plan:
+		setup_printer(setup.settings, clear_build_plate=setup.reload_models)
+		if setup.reload_models:
+			models_error = None
+			for model in setup.models:
+				stl_path = convert_model(model["script"], model["scad_params"])
+				if not os.path.exists(stl_path):
+					models_error = "Unable to convert model {script}.".format(script=model["script"])
+					break
+				load_model(stl_path, model["transformation"], model["object_settings"])
+		if models_error is not None:
+			for document in setup.screenshots:
+				UM.Logger.Logger.error("Unable to refresh screenshot {image_path}: {err}".format(image_path=document["image_path"], err=models_error))
+			continue
 
-		# Track saved images in case we're making multiple that need to be combined into a GIF later.
-		saved_images = []
-		index = 0
-		for layer, line, minimum_layer in zip(layers, lines, minimum_layers):
-			is_layer_view = layer >= 0
-			if is_layer_view:
-				switch_to_layer_view(screenshot_instruction.colour_scheme, screenshot_instruction.structures)
-				navigate_layer_view(minimum_layer, layer, line)
-			else:  # Need to show the model itself.
-				switch_to_solid_view()
-			screenshot = take_snapshot(screenshot_instruction.camera_position, screenshot_instruction.camera_lookat, is_layer_view)
-			if not is_animation:
-				target_file = full_image_path
-			else:
-				target_file = full_image_path + str(index) + ".png"
-			saved_images.append((screenshot, target_file))
-			index += 1
+		is_sliced = False
+		slice_error = None  # If slicing this setup failed, why. Then layer view screenshots of this setup are skipped.
+		for document in setup.screenshots:
+			screenshot_instruction = instruction_from_document(document)
+			if max(ScreenshotPlanner.frames(document)) >= 0:  # Needs layer view.
+				if not is_sliced and slice_error is None:
+					try:
+						slice_scene()
+						is_sliced = True
+					except RuntimeError as e:
+						slice_error = e
+				if not is_sliced:
+					UM.Logger.Logger.error("Unable to refresh screenshot {image_path}: {err}".format(image_path=screenshot_instruction.image_path, err=str(slice_error)))
+					continue
+			try:
+				refresh_screenshot(screenshot_instruction)
+			except (RuntimeError, OSError) as e:  # OSError if one of the image tools is missing.
+				UM.Logger.Logger.error("Unable to refresh screenshot {image_path}: {err}".format(image_path=screenshot_instruction.image_path, err=str(e)))
+				continue  # Not refreshed, so not recorded in the manifest. It'll be tried again next time.
+
+			# Only record screenshots that were actually captured and saved.
+			refreshed_set.add(screenshot_instruction.image_path)
+			manifest[screenshot_instruction.image_path] = fingerprints[screenshot_instruction.image_path]
+			save_manifest(manifest)
+
+def refresh_screenshot(screenshot_instruction) -> None:
+	"""
+	Take a screenshot of the scene that is currently loaded, and store it in the articles' images folder.
 
-		saved_images = crop_images(saved_images)  # Crop all frames at once, to get the same cropping region and correctly align all frames of an animation.
+	The printer must already be set up with the settings and models of the instruction, and the scene must be sliced
+	if the screenshot shows layer view.
+	:param screenshot_instruction: The instruction of the screenshot to take.
+	:raises RuntimeError: The screenshot could not be taken.
+	"""
+	layers = screenshot_instruction.layer
+	if type(layers) != list:  # To simplify processing, always use lists for the layer, line and minimum layer, pretending it's always an animation.
+		layers = [layers]
+	lines = screenshot_instruction.line
+	if type(lines) != list:
+		lines = [lines]
+	minimum_layers = screenshot_instruction.minimum_layer
+	if type(minimum_layers) != list:
+		minimum_layers = [minimum_layers]
+	num_screenshots = max(len(layers), len(lines), len(minimum_layers))
+	# Make the lines, layers and minimum layers equally long by repeating some of them.
+	while len(layers) < num_screenshots:
+		layers *= 2
+	while len(layers) > num_screenshots:
+		layers.pop()
+	while len(lines) < num_screenshots:
+		lines *= 2
+	while len(lines) > num_screenshots:
+		lines.pop()
+	while len(minimum_layers) < num_screenshots:
+		minimum_layers *= 2
+	while len(minimum_layers) > num_screenshots:
+		minimum_layers.pop()
+
+	is_animation = len(layers) > 1
+	full_image_path = os.path.join(os.path.dirname(__file__), "resources", "articles", "images", screenshot_instruction.image_path)
+
+	# Track saved images in case we're making multiple that need to be combined into a GIF later.
+	saved_images = []
+	index = 0
+	for layer, line, minimum_layer in zip(layers, lines, minimum_layers):
+		is_layer_view = layer >= 0
+		if is_layer_view:
+			switch_to_layer_view(screenshot_instruction.colour_scheme, screenshot_instruction.structures)
+			navigate_layer_view(minimum_layer, layer, line)
+		else:  # Need to show the model itself.
+			switch_to_solid_view()
+		screenshot = take_snapshot(screenshot_instruction.camera_position, screenshot_instruction.camera_lookat, is_layer_view)
+		if not is_animation:
+			target_file = full_image_path
+		else:
+			target_file = full_image_path + str(index) + ".png"
+		saved_images.append((screenshot, target_file))
+		index += 1
 
-		for screenshot, target_file in saved_images:
-			save_screenshot(screenshot, target_file)
+	saved_images = crop_images(saved_images)  # Crop all frames at once, to get the same cropping region and correctly align all frames of an animation.
 
-		if is_animation:
+	if is_animation:
+		try:
+			for screenshot, target_file in saved_images:
+				save_screenshot(screenshot, target_file)
 			combine_animation([fname for _, fname in saved_images], full_image_path, screenshot_instruction.colours, screenshot_instruction.delay)
-			optimise_gif(full_image_path)
+		finally:  # Also clean up the frames if combining them failed.
 			for _, filename in saved_images:
-				os.remove(filename)
-		else:
-			reduce_colours(full_image_path, screenshot_instruction.colours)
-			optimise_png(full_image_path)
-
-		refreshed_set.add(screenshot_instruction.image_path)
+				if os.path.exists(filename):
+					os.remove(filename)
+		optimise_gif(full_image_path)
+	else:
+		save_screenshot(saved_images[0][0], full_image_path)
+		reduce_colours(full_image_path, screenshot_instruction.colours)
+		optimise_png(full_image_path)
 
 def find_screenshots(article_text) -> typing.Generator[ScreenshotInstruction, None, None]:
 	"""
@@ -213,48 +436,115 @@ def find_screenshots(article_text) -> typing.Generator[ScreenshotInstruction, No
 	:param article_text: The article to find screenshots in, HTML-formatted.
 	:return: A sequence of ScreenshotInstruction instances.
 	"""
-	screenshot_regex = re.compile(r"<!--screenshot\s*({.*?})\s*-->", re.DOTALL)
+	models_path = os.path.join(os.path.dirname(__file__), "resources", "models")
 	for part in article_text:
 		if part[0] == "rich_text":
-			for match in re.finditer(screenshot_regex, part[1]):
+			for match in ScreenshotPlanner.find_instructions_regex.finditer(part[1]):
 				json_serialised = match.group(1)
 				print("--------- SCREENSHOT -----------\n" + json_serialised + "\n--------------------------------")
 				json_document = json.loads(json_serialised)
-				yield ScreenshotInstruction(
-					image_path=json_document["image_path"],
-					models=[ModelInstruction(
-						script=model["script"],
-						scad_params=model.get("scad_params", []),
-						transformation=model.get("transformation", []),
-						object_settings=model.get("object_settings", {})
-					) for model in json_document["models"]],
-					camera_position=json_document["camera_position"],
-					camera_lookat=json_document.get("camera_lookat"),  # If None, look at the centre of the scene.
-					minimum_layer=json_document.get("minimum_layer", 0),
-					layer=json_document.get("layer", 99999),
-					line=json_document.get("line", -1),
-					colour_scheme=json_document.get("colour_scheme", "line_type"),
-					structures=json_document.get("structures", ["helpers", "shell", "infill", "starts"]),
-					settings=json_document.get("settings", {}),
-					colours=json_document.get("colours", 256),
-					delay=json_document.get("delay", 500)
-				)
+				errors = ScreenshotPlanner.validate(json_document, models_path)
+				if errors:
+					UM.Logger.Logger.error("Invalid screenshot instruction: " + " ".join(errors))
+					continue
+				yield instruction_from_document(ScreenshotPlanner.normalise(json_document))
 	return
 
+def instruction_from_document(document) -> ScreenshotInstruction:
+	"""
+	Convert a normalised screenshot instruction from the planner to a ScreenshotInstruction.
+	:param document: A normalised screenshot instruction, as dictionary.
+	:return: The same instruction, as ScreenshotInstruction.
+	"""
+	return ScreenshotInstruction(**dict(document, models=[ModelInstruction(**model) for model in document["models"]]))
+
+def instruction_document(screenshot_instruction) -> typing.Dict[str, typing.Any]:
+	"""
+	Convert a ScreenshotInstruction to the normalised form that the planner uses.
+	:param screenshot_instruction: A screenshot instruction.
+	:return: The same instruction, as dictionary.
+	"""
+	return dict(screenshot_instruction._asdict(), models=[model._asdict() for model in screenshot_instruction.models])
+
+def manifest_path() -> str:
+	"""
+	Get the file path of the screenshot manifest, which stores the fingerprints of the screenshots that were refreshed.
+	:return: The file path of the manifest.
+	"""
+	return os.path.join(UM.Resources.Resources.getDataStoragePath(), "settings_guide_screenshots", "screenshot_manifest.json")
+
+def load_manifest() -> typing.Dict[str, str]:
+	"""
+	Read the fingerprints of the screenshots that were refreshed before.
+	:return: For each image path, the fingerprint of the screenshot when it was last refreshed.
+	"""
+	try:
+		with open(manifest_path()) as f:
+			return json.load(f)
+	except FileNotFoundError:
+		return {}  # Nothing refreshed yet.
+	except (OSError, ValueError) as e:  # Corrupt. Refresh everything.
+		UM.Logger.Logger.warning("Unable to read screenshot manifest: {err}".format(err=str(e)))
+		return {}
+
+def save_manifest(manifest) -> None:
+	"""
+	Store the fingerprints of the screenshots that were refreshed.
+	:param manifest: For each image path, the fingerprint of the screenshot when it was last refreshed.
+	"""
+	path = manifest_path()
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path + ".tmp", "w") as f:
+		json.dump(manifest, f, indent=1, sort_keys=True)
+	os.replace(path + ".tmp", path)  # Replace at once, so that an interrupted refresh doesn't leave a corrupt manifest.
+
+def fingerprint(screenshot_instruction) -> str:
+	"""
+	Create a fingerprint of everything that the result of a screenshot depends on.
+
+	This includes the screenshot instruction itself (after filling in the defaults, so that equivalent instructions get
+	the same fingerprint), the contents of the scripts that generate the models and the Cura version.
+	:param screenshot_instruction: The instruction to take the screenshot.
+	:return: The fingerprint, as hexadecimal string.
+	"""
+	scripts = {model.script: script_hash(model.script) for model in screenshot_instruction.models}
+	document = {
+		"instruction": instruction_document(screenshot_instruction),
+		"scripts": scripts,
+		"cura_version": cura.CuraApplication.CuraApplication.getInstance().getVersion()
+	}
+	return hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+
+def script_hash(script) -> typing.Optional[str]:
+	"""
+	Hash the contents of a script that generates a model.
+	:param script: The path to the script, relative to the models folder.
+	:return: The hash, as hexadecimal string, or `None` if the script can't be read.
+	"""
+	script_path = os.path.join(os.path.dirname(__file__), "resources", "models", script)
+	try:
+		with open(script_path, "rb") as f:
+			return hashlib.sha256(f.read()).hexdigest()
+	except OSError:
+		return None  # Will fail to refresh, but then at least it's refreshed again next time.
+
 @cura.Utils.Threading.call_on_qt_thread  # Must be called from the Qt thread because it creates QML objects (the global stack).
-def setup_printer(settings) -> None:
+def setup_printer(settings, clear_build_plate=True) -> None:
 	"""
 	Set up a Cura printer and set the settings as desired in the screenshot instruction.
 
 	This makes sure that the model will be sliced with the correct settings.
 	:param settings: The settings to slice the model with, as a dictionary of setting keys to setting values.
+	:param clear_build_plate: Whether to remove the models from the build plate. If the next screenshot uses the same
+	models, they can stay.
 	"""
 	application = cura.CuraApplication.CuraApplication.getInstance()
 	registry = application.getContainerRegistry()
 	machine_manager = application.getMachineManager()
 
 	# Clear the build plate.
-	application.deleteAll()
+	if clear_build_plate:
+		application.deleteAll()
 
 	# Some global preferences that we need for this tool.
 	preferences = application.getPreferences()
@@ -286,10 +576,8 @@ def setup_printer(settings) -> None:
 	printer.userChanges.clear()
 
 	# Some defaults that we'll want for most screenshots to make them look good. Remove distractions.
-	printer.userChanges.setProperty("layer_height", "value", "0.06")  # Reducing layer height makes the sides look smoother. This improves compression but also reduces distraction from the layer lines.
-	printer.userChanges.setProperty("adhesion_type", "value", "none")  # Except for settings concerning bed adhesion, remove adhesion type to remove distraction from the actual object.
-	printer.userChanges.setProperty("z_seam_type", "value", "back")  # Seam alignment to "User Specified" to align the seam. This makes the seam more recognisable as such, and allows us to find a camera angle that hides it if necessary.
-	printer.userChanges.setProperty("z_seam_position", "value", "backleft")  # In case of axis-aligned models (which is pretty common) this puts the seam in a corner rather than spreading it out over a side.
+	for key, value in ScreenshotPlanner.baseline_settings.items():
+		printer.userChanges.setProperty(key, "value", str(value))
 
 	# Set the settings that we want to override for this slice.
 	specific_extruder_setting = re.compile(r"\[(\d)](.+)")
@@ -307,41 +595,90 @@ def setup_printer(settings) -> None:
 				printer.extruderList[extruder_nr].userChanges.setProperty(key, "value", value)
 			printer.userChanges.setProperty(key, "value", value)
 
+def stl_path_for(script_path, scad_params) -> str:
+	"""
+	Get the path where the STL model generated by a script is cached.
+
+	The file name contains a hash of the contents of the script and the parameters, so that changing the script
+	generates the model again.
+	:param script_path: A path to an OpenSCAD or Python script, relative to the models folder.
+	:param scad_params: A list of parameters to pass to OpenSCAD scripts, of the form "key=value".
+	:return: A path to an STL model file, which may not exist yet.
+	"""
+	file_name = os.path.splitext(os.path.basename(script_path))[0]
+	key = json.dumps({"script": script_hash(script_path), "scad_params": scad_params}, sort_keys=True)
+	digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+	stl_dir = os.path.join(UM.Resources.Resources.getDataStoragePath(), "settings_guide_screenshots")
+	return os.path.join(stl_dir, "{file_name}-{digest}.stl".format(file_name=file_name, digest=digest))
+
 def convert_model(script_path, scad_params) -> str:
 	"""
 	Use an OpenSCAD or Python script to generate a 3D model.
 
-	The STL model will be saved in a temporary file.
+	The STL model is cached in Cura's data storage folder. If the script and parameters didn't change since it was
+	generated, the cached model is used.
+
+	This may be called from multiple threads at once.
 	:param script_path: A path to an OpenSCAD model file.
 	:param scad_params: A list of parameters to pass to OpenSCAD scripts, of the form "key=value".
 	:return: A path to an STL model file.
 	"""
+	stl_path = stl_path_for(script_path, scad_params)
+	if os.path.exists(stl_path):
+		return stl_path
 	script_path = os.path.join(os.path.dirname(__file__), "resources", "models", script_path)
 	file_name = os.path.splitext(os.path.basename(script_path))[0]
-	stl_dir = os.path.join(UM.Resources.Resources.getDataStoragePath(), "settings_guide_screenshots")
-	if not os.path.exists(stl_dir):
-		os.mkdir(stl_dir)
-	stl_path = os.path.join(stl_dir, ",".join([file_name] + scad_params) + ".stl")
-	if not os.path.exists(stl_path):
-		extension = os.path.splitext(script_path)[1]
-		if extension == ".scad":
-			if not scad_params:
-				call_with_args("openscad", input=script_path, output=stl_path)
-			else:  # Insert OpenSCAD parameters in the command.
-				args = []
-				for arg in commands["openscad"]:
-					args.append(arg.format(input=script_path, output=stl_path))
-				for param in scad_params:
-					args.insert(-1, "-D")
-					args.insert(-1, param)
-				UM.Logger.Logger.info("Subprocess: " + " ".join(args))
-				subprocess.call(args)
-		elif extension == ".py":
-			spec = importlib.util.spec_from_file_location(file_name, script_path)
-			generator = spec.loader.load_module(file_name)
-			generator.generate(stl_path)
+	os.makedirs(os.path.dirname(stl_path), exist_ok=True)
+	# Write to a temporary file first, so that an interrupted conversion doesn't leave a broken model in the cache.
+	partial_path = os.path.splitext(stl_path)[0] + ".partial.stl"
+	extension = os.path.splitext(script_path)[1]
+	if extension == ".scad":
+		if not scad_params:
+			call_with_args("openscad", input=script_path, output=partial_path)
+		else:  # Insert OpenSCAD parameters in the command.
+			args = []
+			for arg in commands["openscad"]:
+				args.append(arg.format(input=script_path, output=partial_path))
+			for param in scad_params:
+				args.insert(-1, "-D")
+				args.insert(-1, param)
+			UM.Logger.Logger.info("Subprocess: " + " ".join(args))
+			subprocess.call(args)
+	elif extension == ".py":
+		spec = importlib.util.spec_from_file_location(file_name, script_path)
+		generator = spec.loader.load_module(file_name)
+		generator.generate(partial_path)
+	if os.path.exists(partial_path):
+		os.replace(partial_path, stl_path)
 	return stl_path
 
+def convert_models(models) -> None:
+	"""
+	Generate the 3D models for a number of screenshots in advance, in parallel.
+
+	Each distinct script and parameter combination is converted once. Models that are already cached are skipped.
+	:param models: The models to generate, as dictionaries with the script and the OpenSCAD parameters.
+	"""
+	to_convert = {}  # For each distinct model, the script and parameters to generate it with.
+	for model in models:
+		scad_params = list(model["scad_params"])
+		stl_path = stl_path_for(model["script"], scad_params)
+		if not os.path.exists(stl_path):
+			to_convert[stl_path] = (model["script"], scad_params)
+	if not to_convert:
+		return
+	UM.Logger.Logger.info("Converting {num_models} models with {num_workers} workers.".format(num_models=len(to_convert), num_workers=conversion_workers))
+	with concurrent.futures.ThreadPoolExecutor(max_workers=conversion_workers) as pool:  # Threads are enough, since the actual work happens in the OpenSCAD processes.
+		futures = {pool.submit(convert_model, script, scad_params): script for script, scad_params in to_convert.values()}
+		for future in concurrent.futures.as_completed(futures):
+			try:
+				stl_path = future.result()
+			except Exception as e:
+				UM.Logger.Logger.error("Unable to convert model {script}: {err}".format(script=futures[future], err=str(e)))
+				continue
+			if not os.path.exists(stl_path):
+				UM.Logger.Logger.error("Unable to convert model {script}.".format(script=futures[future]))
+
 def load_model(stl_path, transformations, object_settings) -> None:
 	"""
 	Load a 3D model into the scene to take a screenshot of.
@@ -355,7 +692,7 @@ def load_model(stl_path, transformations, object_settings) -> None:
 	job.run()  # Don't plan it in on the job queue or anything. Actually run it on this thread.
 	mesh_data = [node.getMeshData() for node in job.getResult()]  # Find the nodes by finding their mesh data in the scene after _readMeshFinished is done with them, since that re-creates the nodes.
 	application._readMeshFinished(job)  # Abuse CuraApplication's implementation to properly put the model on the build plate.
-	time.sleep(2)  # Wait for scene node update triggers to be processed.
+	wait_for_scene()  # Wait for scene node update triggers to be processed.
 
 	# Apply transformations and per-object settings to the resulting mesh.
 	for node in UM.Scene.Iterator.DepthFirstIterator.DepthFirstIterator(application.getController().getScene().getRoot()):
@@ -432,36 +769,31 @@ def load_model(stl_path, transformations, object_settings) -> None:
 			container.addInstance(new_instance)
 
 	UM.Scene.Selection.Selection.clear()  # If the preference was enabled to auto-select objects, clear selection.
-	time.sleep(2)  # Wait for scene node update triggers to be processed.
+	wait_for_scene()  # Wait for scene node update triggers to be processed.
 
 def slice_scene() -> None:
 	"""
 	Trigger a slice, so that we can show layer view in the screenshot.
+	:raises RuntimeError: Slicing failed or timed out every time it was tried.
 	"""
 	application = cura.CuraApplication.CuraApplication.getInstance()
 	backend = application.getBackend()
 
-	while True:
+	finished_states = {UM.Backend.Backend.BackendState.Done, UM.Backend.Backend.BackendState.Error}
+	for attempt in range(slice_attempts):
 		print("------------- (re)starting engine for slice")
-		backend.slice()
-		time.sleep(2)  # Give stuff some time to spin up.
-
-		# Now do a spinloop, blocking this thread until the slice is completed.
-		while backend._process:
-			time.sleep(1.2)
-			if backend._backend_state == UM.Backend.Backend.BackendState.Error:
-				break  # Restart the slice.
-		else:
-			break
-
-	time.sleep(2)  # Give stuff some time to wind down.
-
+		result = wait_for_emission(backend.backendStateChange, backend.slice, lambda state: state in finished_states, slice_timeout)
+		if result is not None and result[0] == UM.Backend.Backend.BackendState.Done:
+			return
+		UM.Logger.Logger.warning("Slicing failed or timed out (attempt {attempt} of {attempts}).".format(attempt=attempt + 1, attempts=slice_attempts))
+	raise RuntimeError("Slicing failed {attempts} times.".format(attempts=slice_attempts))
 
 def switch_to_layer_view(colour_scheme, visible_structures) -> None:
 	"""
 	Show layer view in the screenshot.
 	:param colour_scheme: The colour scheme to use for this layer view.
 	:param visible_structures: Which parts of the layer view should be made visible.
+	:raises RuntimeError: The layer data of the slice didn't become available.
 	"""
 	colour_schemes = ["material_colour", "line_type", "speed", "layer_thickness", "line_width"]  # In order in which they appear, so that we can find the correct index to set the preference to.
 	application = cura.CuraApplication.CuraApplication.getInstance()
@@ -474,12 +806,11 @@ def switch_to_layer_view(colour_scheme, visible_structures) -> None:
 	preferences.setValue("layerview/show_infill", "infill" in visible_structures)
 	preferences.setValue("layerview/show_starts", "starts" in visible_structures)
 
-	layer_view_completed = False
-	while not layer_view_completed:
-		for node in UM.Scene.Iterator.DepthFirstIterator.DepthFirstIterator(cura.CuraApplication.CuraApplication.getInstance().getController().getScene().getRoot()):
-			if node.callDecoration("getLayerData"):
-				layer_view_completed = True
-		time.sleep(1.2)
+	scene = application.getController().getScene()
+	def has_layer_data():
+		return any(node.callDecoration("getLayerData") for node in UM.Scene.Iterator.DepthFirstIterator.DepthFirstIterator(scene.getRoot()))
+	if not wait_until(scene.sceneChanged, has_layer_data, layer_data_timeout):
+		raise RuntimeError("The layer data didn't become available in {timeout} seconds.".format(timeout=layer_data_timeout))
 
 def navigate_layer_view(minimum_layer_nr, layer_nr, line_nr) -> None:
 	"""
@@ -493,7 +824,7 @@ def navigate_layer_view(minimum_layer_nr, layer_nr, line_nr) -> None:
 	layer_view_plugin.setMinimumLayer(minimum_layer_nr)
 	if line_nr >= 0:
 		layer_view_plugin.setPath(1)  # Due to a bug in layer view, setting the line sometimes makes it display the entire layer.
-		time.sleep(1.2)
+		wait_for_frame()
 		layer_view_plugin.setPath(line_nr)
 		layer_view_plugin.setMinimumPath(0)
 
@@ -503,7 +834,6 @@ def switch_to_solid_view() -> None:
 	"""
 	cura.CuraApplication.CuraApplication.getInstance().getController().setActiveStage("PrepareStage")
 
-@cura.Utils.Threading.call_on_qt_thread  # Must be called from the Qt thread because the OpenGL bindings don't support multi-threading.
 def take_snapshot(camera_position, camera_lookat, is_layer_view) -> PyQt5.QtGui.QImage:
 	"""
 	Take a snapshot of the current scene.
@@ -511,9 +841,25 @@ def take_snapshot(camera_position, camera_lookat, is_layer_view) -> PyQt5.QtGui.
 	:param camera_lookat: The position of the focal point of the camera.
 	:param is_layer_view: Whether we're looking at layer view or the model itself.
 	:return: A screenshot of the current scene.
+	:raises RuntimeError: The render output kept having the wrong size.
+	"""
+	position_camera(camera_position, camera_lookat)
+	for attempt in range(snapshot_attempts):
+		wait_for_frame()  # Let the scene nodes update for the new camera position.
+		screenshot = render_snapshot(is_layer_view)
+		if not is_layer_view or (screenshot.width(), screenshot.height()) == layer_view_size:
+			return screenshot
+		print("---- render output not correct size!")
+	raise RuntimeError("The render output is {width}x{height} instead of {correct_width}x{correct_height}.".format(width=screenshot.width(), height=screenshot.height(), correct_width=layer_view_size[0], correct_height=layer_view_size[1]))
+
+@cura.Utils.Threading.call_on_qt_thread  # Must be called from the Qt thread because it changes the scene.
+def position_camera(camera_position, camera_lookat) -> None:
+	"""
+	Move the camera to take a snapshot from.
+	:param camera_position: The position of the camera to take the snapshot with.
+	:param camera_lookat: The position of the focal point of the camera.
 	"""
 	application = cura.CuraApplication.CuraApplication.getInstance()
-	plugin_registry = application.getPluginRegistry()
 
 	# Set the camera to the desired position. We'll use the actual camera for the snapshot just because it looks cool while it's busy.
 	camera = application.getController().getScene().getActiveCamera()
@@ -533,7 +879,19 @@ def take_snapshot(camera_position, camera_lookat, is_layer_view) -> PyQt5.QtGui.
 			camera.setOrientation(UM.Math.Quaternion.Quaternion(-2, 0, 0, 2))
 		else:
 			camera.setOrientation(UM.Math.Quaternion.Quaternion(2, 0, 0, 2))
-	time.sleep(2)  # Some time to update the scene nodes. Don't know if this is necessary but it feels safer.
+
+@cura.Utils.Threading.call_on_qt_thread  # Must be called from the Qt thread because the OpenGL bindings don't support multi-threading.
+def render_snapshot(is_layer_view) -> PyQt5.QtGui.QImage:
+	"""
+	Render the current scene to an image.
+
+	Rendering happens synchronously, so the output of the render passes is
+	complete as soon as they are done rendering.
+	:param is_layer_view: Whether we're looking at layer view or the model itself.
+	:return: A screenshot of the current scene.
+	"""
+	application = cura.CuraApplication.CuraApplication.getInstance()
+	plugin_registry = application.getPluginRegistry()
 
 	# Use a transparent background.
 	gl_bindings = UM.View.GL.OpenGL.OpenGL.getInstance().getBindingsObject()
@@ -549,14 +907,7 @@ def take_snapshot(camera_position, camera_lookat, is_layer_view) -> PyQt5.QtGui.
 
 		render_pass = simulation_view_plugin.getSimulationPass()
 		render_pass.render()
-		time.sleep(1.2)
 		screenshot = render_pass.getOutput()
-		while screenshot.width() != 2524 or screenshot.height() != 1376:  # These are hard-coded to the screen size on half of my screen for now.
-			print("---- render output not correct size!")
-			gl_bindings.glClearColor(0.0, 0.0, 0.0, 0.0)
-			gl_bindings.glClear(gl_bindings.GL_COLOR_BUFFER_BIT | gl_bindings.GL_DEPTH_BUFFER_BIT)
-			time.sleep(1.5)
-			screenshot = render_pass.getOutput()
 
 		# Remove alpha channel from this picture. We don't want the semi-transparent support since we don't draw the object outline here.
 		# Sadly, QImage.convertToFormat has only 2 formats with boolean alpha and they both premultiply. So we'll go the hard way: Through Numpy.
@@ -606,12 +957,10 @@ def take_snapshot(camera_position, camera_lookat, is_layer_view) -> PyQt5.QtGui.
 
 		default_pass = renderer.getRenderPass("default")
 		default_pass.render()
-		time.sleep(1.2)
 		normal_shading = default_pass.getOutput()
 		xray_pass = renderer.getRenderPass("xray")
 		renderer.addRenderPass(xray_pass)
 		xray_pass.render()
-		time.sleep(1.2)
 		xray_shading = xray_pass.getOutput()
 
 		# Manually composite these shadings. Because the composite shader also adds a background colour.
@@ -676,8 +1025,10 @@ def save_screenshot(screenshot, image_path) -> None:
 	Save the screenshot to file in the plug-in folder.
 	:param screenshot: The image to save to the file.
 	:param image_path: The file path to store the screenshot in.
+	:raises RuntimeError: The screenshot could not be saved.
 	"""
-	screenshot.save(image_path)
+	if not screenshot.save(image_path):
+		raise RuntimeError("Unable to save the screenshot to {image_path}.".format(image_path=image_path))
 
 def combine_animation(frames, image_path, colours, delay) -> None:
 	"""
@@ -686,6 +1037,7 @@ def combine_animation(frames, image_path, colours, delay) -> None:
 	:param image_path: The path to the GIF file to store.
 	:param colours: The number of colours to use in the palette of the GIF.
 	:param delay: The duration to show each frame, in milliseconds.
+	:raises RuntimeError: The frames could not be combined.
 	"""
 	args = []
 	for arg in commands["merge_gif"]:
@@ -694,7 +1046,8 @@ def combine_animation(frames, image_path, colours, delay) -> None:
 		else:
 			args.append(arg.format(delay=round(delay / 10.0), output=image_path))
 	UM.Logger.Logger.info("Subprocess: " + " ".join(args))
-	subprocess.call(args)
+	if subprocess.call(args) != 0:
+		raise RuntimeError("Unable to combine the frames of the animation into {image_path}.".format(image_path=image_path))
 	reduce_colours(image_path, colours)
 
 def optimise_gif(image_path) -> None:
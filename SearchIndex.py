@@ -0,0 +1,310 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+import bisect  # To find the terms starting with a prefix.
+import collections  # For Counter, to count the terms in an article.
+import html  # To convert the rendered articles to plain text.
+import json  # The index is stored in JSON format.
+import math  # To calculate the inverse document frequency.
+import os  # To store the index.
+import re  # To split the articles into terms.
+import threading  # The index is filled by the background loading job and searched from the GUI thread.
+from typing import Dict, List, Optional, Tuple
+
+from UM.Logger import Logger
+
+find_tags = re.compile(r"<!--.*?-->|<[^>]*>", flags=re.DOTALL)
+find_terms = re.compile(r"\w+")
+find_title = re.compile(r"<h1>(.*?)</h1>", flags=re.DOTALL)
+
+def plain_text(rich_text: str) -> str:
+	"""
+	Convert the rendered rich text of an article to plain text.
+	:param rich_text: The rich text of an article.
+	:return: The text of the article, without any markup.
+	"""
+	text = find_tags.sub(" ", rich_text)
+	return " ".join(html.unescape(text).split())
+
+def terms(text: str) -> List[str]:
+	"""
+	Split a text into the terms that can be searched for.
+	:param text: Plain text.
+	:return: The terms in the text, in lower case.
+	"""
+	return find_terms.findall(text.lower())
+
+class SearchIndex:
+	"""
+	An inverted index of the words in all articles, to search through the
+	articles quickly.
+
+	Articles are added to the index as they get loaded. For each language
+	there is a separate index. The index is saved to disk, so that the guide
+	can be searched right away the next time Cura starts, even before all
+	articles are loaded again.
+	"""
+
+	version = 1
+	"""
+	Version number of the index format. Indices of a different version are
+	discarded.
+	"""
+
+	title_boost = 3.0  # How much more a term counts if it appears in the title of an article.
+	snippet_length = 120  # The approximate number of characters of the snippets around search results.
+
+	def __init__(self, index_file: str) -> None:
+		"""
+		Creates an empty index.
+		:param index_file: The file path to store the index in.
+		"""
+		self._index_file = index_file
+		self._documents = {}  # type: Dict[str, Dict[str, Dict]]  # For each language and article, the title, text and term counts.
+		self._postings = {}  # type: Dict[str, Dict[str, Dict[str, float]]]  # For each language and term, the articles that contain it and how often (with titles counting extra).
+		self._sorted_terms = {}  # type: Dict[str, List[str]]  # For each language, all terms in alphabetical order, to search for prefixes. Made when first needed.
+		self._dirty = False  # Whether there are changes that have not been saved to disk yet.
+		self._lock = threading.Lock()
+
+	def add(self, article_id: str, language: str, rich_text: str) -> None:
+		"""
+		Add an article to the index, or update it if it's already in there.
+		:param article_id: The ID of the article.
+		:param language: The language of the article.
+		:param rich_text: The rendered rich text of the article.
+		"""
+		text = plain_text(rich_text)
+		with self._lock:
+			document = self._documents.get(language, {}).get(article_id)
+			if document is not None and document["text"] == text:
+				return  # Already up to date.
+			title_match = find_title.search(rich_text)
+			title = plain_text(title_match.group(1)) if title_match else article_id
+			term_counts = collections.Counter(terms(text))
+			for term in terms(title):
+				term_counts[term] += self.title_boost
+			self._remove(article_id, language)
+			if language not in self._documents:
+				self._documents[language] = {}
+			self._documents[language][article_id] = {
+				"title": title,
+				"text": text,
+				"terms": dict(term_counts)
+			}
+			self._add_postings(article_id, language, term_counts)
+			self._dirty = True
+
+	def remove(self, article_id: str, language: str) -> None:
+		"""
+		Remove an article from the index, if it's in there.
+		:param article_id: The article to remove.
+		:param language: The language of the article to remove.
+		"""
+		with self._lock:
+			if article_id in self._documents.get(language, {}):
+				self._remove(article_id, language)
+				self._dirty = True
+
+	def search(self, query: str, language: str, fallback_language: str = "en_US", limit: int = 20) -> List[Tuple[str, str, str]]:
+		"""
+		Search for articles that contain all of the words in a query.
+
+		The last word of the query also matches words that start with it, so
+		that results can be shown while the user is still typing. Results are
+		ranked by how often the words appear in each article, and how rare
+		those words are among all articles.
+		:param query: The text to search for.
+		:param language: The language to search the articles of.
+		:param fallback_language: The language to search articles in that are
+		not available in the requested language.
+		:param limit: The maximum number of results to return.
+		:return: For each matching article, the article ID, its title and a
+		snippet of text around the first matching word. Best matches come first.
+		"""
+		query_terms = terms(query)
+		if not query_terms:
+			return []
+		prefix_search = not query[-1].isspace()  # Still typing the last word.
+
+		with self._lock:
+			scores = self._score(query_terms, language, prefix_search)
+			fallback_scores = self._score(query_terms, fallback_language, prefix_search) if fallback_language != language else {}
+			for article_id, score in fallback_scores.items():
+				if article_id not in self._documents.get(language, {}):  # Only if it's not translated.
+					scores[article_id] = score
+			ranked = sorted(scores.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+			results = []
+			for article_id, (_, result_language) in ranked:
+				document = self._documents[result_language][article_id]
+				results.append((article_id, document["title"], self._snippet(document["text"], document["title"], query_terms)))
+			return results
+
+	def load(self) -> None:
+		"""
+		Load the index from disk.
+		"""
+		try:
+			with open(self._index_file, encoding="utf-8") as f:
+				document = json.load(f)
+			if document.get("version") != self.version:
+				return
+			documents = document["documents"]
+			if not isinstance(documents, dict) or not all(isinstance(articles, dict) and all(self._is_valid_article(article) for article in articles.values()) for articles in documents.values()):
+				raise ValueError("The stored articles are malformed.")
+		except FileNotFoundError:
+			return  # No index yet. Start with an empty one.
+		except (OSError, ValueError, KeyError, AttributeError, TypeError) as e:  # Not readable or corrupt. Start with an empty index.
+			Logger.log("w", "Unable to read Settings Guide search index: {err}".format(err=str(e)))
+			return
+
+		with self._lock:
+			for language, articles in documents.items():
+				for article_id, article in articles.items():
+					if article_id in self._documents.get(language, {}):
+						continue  # Already added during this session, which is more recent.
+					if language not in self._documents:
+						self._documents[language] = {}
+					self._documents[language][article_id] = article
+					self._add_postings(article_id, language, article["terms"])
+
+	def save(self) -> None:
+		"""
+		Write the index to disk, if anything changed since it was loaded.
+		"""
+		with self._lock:
+			if not self._dirty:
+				return
+			document = {
+				"version": self.version,
+				"documents": self._documents
+			}
+			self._dirty = False
+			temporary_file = self._index_file + ".tmp"
+			try:
+				os.makedirs(os.path.dirname(self._index_file), exist_ok=True)
+				with open(temporary_file, "w", encoding="utf-8") as f:
+					json.dump(document, f, ensure_ascii=False, separators=(",", ":"))
+				os.replace(temporary_file, self._index_file)
+			except OSError as e:  # Perhaps no rights? Then the index gets built again next time.
+				Logger.log("w", "Unable to save Settings Guide search index: {err}".format(err=str(e)))
+
+	@staticmethod
+	def _is_valid_article(article) -> bool:
+		"""
+		Check whether an article read from the stored index is well-formed.
+		:param article: The article as stored in the index.
+		:return: `True` if it has a title, a text and term counts.
+		"""
+		if not isinstance(article, dict) or not isinstance(article.get("title"), str) or not isinstance(article.get("text"), str) or not isinstance(article.get("terms"), dict):
+			return False
+		return all(isinstance(count, (int, float)) and count > 0 for count in article["terms"].values())  # Counts are used in a logarithm.
+
+	def _add_postings(self, article_id: str, language: str, term_counts: Dict[str, float]) -> None:
+		"""
+		Add the terms of an article to the inverted index. The lock must be
+		held.
+		:param article_id: The article containing the terms.
+		:param language: The language of the article.
+		:param term_counts: How often each term appears in the article.
+		"""
+		if language not in self._postings:
+			self._postings[language] = {}
+		postings = self._postings[language]
+		for term, count in term_counts.items():
+			if term not in postings:
+				postings[term] = {}
+				self._sorted_terms.pop(language, None)  # New term, so the sorted list needs to be made again.
+			postings[term][article_id] = count
+
+	def _remove(self, article_id: str, language: str) -> None:
+		"""
+		Remove an article from the index, if it's in there. The lock must be
+		held.
+		:param article_id: The article to remove.
+		:param language: The language of the article to remove.
+		"""
+		document = self._documents.get(language, {}).pop(article_id, None)
+		if document is None:
+			return
+		postings = self._postings[language]
+		for term in document["terms"]:
+			del postings[term][article_id]
+			if not postings[term]:
+				del postings[term]
+				self._sorted_terms.pop(language, None)
+
+	def _matching_terms(self, term: str, language: str, prefix: bool) -> List[str]:
+		"""
+		Find the terms in the index that match a term of the query. The lock
+		must be held.
+		:param term: The term in the query.
+		:param language: The language to search in.
+		:param prefix: Whether the term may also match longer terms that start
+		with it.
+		:return: The terms in the index that match.
+		"""
+		postings = self._postings.get(language, {})
+		if not prefix:
+			return [term] if term in postings else []
+		if language not in self._sorted_terms:
+			self._sorted_terms[language] = sorted(postings)
+		sorted_terms = self._sorted_terms[language]
+		result = []
+		for index in range(bisect.bisect_left(sorted_terms, term), len(sorted_terms)):
+			if not sorted_terms[index].startswith(term):
+				break
+			result.append(sorted_terms[index])
+		return result
+
+	def _score(self, query_terms: List[str], language: str, prefix_search: bool) -> Dict[str, Tuple[float, str]]:
+		"""
+		Find the articles in one language that contain all query terms, and
+		score how well they match. The lock must be held.
+		:param query_terms: The terms to search for.
+		:param language: The language to search in.
+		:param prefix_search: Whether the last term may match longer terms that
+		start with it.
+		:return: For each matching article, its score and the language.
+		"""
+		postings = self._postings.get(language, {})
+		num_documents = len(self._documents.get(language, {}))
+		scores = None  # type: Optional[Dict[str, float]]
+		for index, query_term in enumerate(query_terms):
+			term_scores = {}  # type: Dict[str, float]
+			for term in self._matching_terms(query_term, language, prefix_search and index == len(query_terms) - 1):
+				inverse_frequency = math.log(1 + num_documents / len(postings[term]))
+				for article_id, count in postings[term].items():
+					term_scores[article_id] = term_scores.get(article_id, 0) + (1 + math.log(count)) * inverse_frequency
+			if scores is None:
+				scores = term_scores
+			else:
+				scores = {article_id: score + term_scores[article_id] for article_id, score in scores.items() if article_id in term_scores}  # Articles must contain all terms.
+			if not scores:
+				return {}
+		return {article_id: (score, language) for article_id, score in scores.items()}
+
+	def _snippet(self, text: str, title: str, query_terms: List[str]) -> str:
+		"""
+		Get a piece of text around the first occurrence of any query term.
+		:param text: The plain text of an article.
+		:param title: The title of the article, which is not repeated in the
+		snippet.
+		:param query_terms: The terms that were searched for.
+		:return: A piece of the text.
+		"""
+		if text.startswith(title):
+			text = text[len(title):].lstrip()
+		lower_text = text.lower()
+		positions = [lower_text.find(term) for term in query_terms]
+		positions = [position for position in positions if position >= 0]
+		position = min(positions) if positions else 0
+		start = max(0, position - self.snippet_length // 3)
+		end = min(len(text), start + self.snippet_length)
+		snippet = text[start:end]
+		if start > 0:
+			snippet = "…" + snippet
+		if end < len(text):
+			snippet += "…"
+		return snippet
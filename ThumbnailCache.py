@@ -0,0 +1,112 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+import hashlib  # To give the thumbnails a unique file name.
+import os  # To store the thumbnails.
+from PyQt5.QtCore import QSize, Qt  # To scale the images.
+from PyQt5.QtGui import QImageReader  # To scale the images. Images may be read outside of the GUI thread.
+import threading  # Thumbnails are created in the background and requested from the GUI thread.
+from typing import Dict, Optional, Tuple
+
+from UM.Logger import Logger
+
+class ThumbnailCache:
+	"""
+	Creates and stores scaled-down versions of the images in the articles.
+
+	The screenshots in the articles are often much bigger than the size at
+	which they are displayed. Decoding the complete image and scaling it down
+	every time it's shown takes a lot of time. This cache stores the images at
+	the sizes at which they are displayed, so that only the small versions need
+	to be decoded.
+
+	The thumbnails are stored on disk, so they only need to be created once.
+	They are named after the image file, its modification time and the size of
+	the thumbnail, so modified images get new thumbnails.
+	"""
+
+	def __init__(self, cache_path: str) -> None:
+		"""
+		Creates a thumbnail cache.
+		:param cache_path: The folder to store the thumbnails in.
+		"""
+		self._cache_path = cache_path
+		self._thumbnails = {}  # type: Dict[Tuple[str, int, int], str]  # For each image and maximum size, the file containing the thumbnail.
+		self._lock = threading.Lock()
+
+	def get(self, image_file: str, width: int, height: int) -> Optional[str]:
+		"""
+		Get the thumbnail of an image, if it has already been created.
+
+		This doesn't access the disk, so it's cheap enough to call from the GUI
+		thread.
+		:param image_file: The original image.
+		:param width: The maximum width of the thumbnail, or 0 if the width
+		is not limited.
+		:param height: The maximum height of the thumbnail, or 0 if the height
+		is not limited.
+		:return: The file path of the thumbnail, or `None` if it's not created
+		yet.
+		"""
+		with self._lock:
+			return self._thumbnails.get((image_file, width, height))
+
+	def create(self, image_file: str, width: int, height: int) -> Optional[str]:
+		"""
+		Get the thumbnail of an image, creating it if it doesn't exist yet.
+
+		The thumbnail keeps the aspect ratio of the original image. Images that
+		are already smaller than the thumbnail size are not scaled. For those,
+		the original image is returned. For animated images, the thumbnail is a
+		still image of the first frame.
+		:param image_file: The original image.
+		:param width: The maximum width of the thumbnail, or 0 if the width
+		is not limited.
+		:param height: The maximum height of the thumbnail, or 0 if the height
+		is not limited.
+		:return: The file path of the thumbnail, or `None` if the original
+		image can't be read.
+		"""
+		thumbnail = self.get(image_file, width, height)
+		if thumbnail is not None:
+			return thumbnail
+
+		reader = QImageReader(image_file)  # Only reads the header here, not the image itself.
+		original_size = reader.size()
+		if not original_size.isValid():
+			return None
+		maximum_size = QSize(width if width > 0 else original_size.width(), height if height > 0 else original_size.height())
+		if original_size.width() <= maximum_size.width() and original_size.height() <= maximum_size.height():
+			thumbnail = image_file  # Small enough already.
+		else:
+			try:
+				stat = os.stat(image_file)
+			except OSError:
+				return None
+			key = "{file}|{mtime}|{size}".format(file=image_file, mtime=stat.st_mtime_ns, size=stat.st_size)
+			thumbnail = os.path.join(self._cache_path, "{hash}_{width}x{height}.png".format(hash=hashlib.sha1(key.encode("utf-8")).hexdigest(), width=width, height=height))
+			if not os.path.exists(thumbnail):
+				image = reader.read()
+				if image.isNull():
+					return None
+				image = image.scaled(maximum_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+				try:
+					os.makedirs(self._cache_path, exist_ok=True)
+				except OSError as e:
+					Logger.log("w", "Unable to create Settings Guide thumbnail folder: {err}".format(err=str(e)))
+					return None
+				temporary_file = thumbnail + ".tmp.png"
+				if not image.save(temporary_file, "PNG"):
+					Logger.log("w", "Unable to save thumbnail of {image_file}.".format(image_file=image_file))
+					return None
+				try:
+					os.replace(temporary_file, thumbnail)
+				except OSError as e:
+					Logger.log("w", "Unable to save thumbnail of {image_file}: {err}".format(image_file=image_file, err=str(e)))
+					return None
+
+		with self._lock:
+			self._thumbnails[(image_file, width, height)] = thumbnail
+		return thumbnail
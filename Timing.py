@@ -0,0 +1,105 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+This module measures how long the various phases of loading the Settings Guide take.
+
+For each phase, the wall time, the CPU time of the thread that executed it and the change in the number of allocated
+memory blocks are recorded. The number of allocated blocks is counted for the whole process, so if other threads are
+allocating memory at the same time, this is only an indication. Phases that are executed multiple times are summed.
+
+For each article that gets rendered, the time it took to render is recorded too, so that slow articles can be found.
+"""
+
+import contextlib  # To measure phases with a context manager.
+import json  # To store the timing report.
+import os  # To store the timing report.
+import sys  # To count the allocated memory blocks.
+import threading  # Phases are measured on the GUI thread as well as in background jobs.
+import time  # To measure time.
+from typing import Any, Dict, Iterator
+
+from UM.Logger import Logger
+
+_lock = threading.Lock()
+_phases = {}  # type: Dict[str, Dict[str, float]]  # For each phase, the number of times it was executed, the total wall time, CPU time and allocated blocks, and the longest wall time.
+_articles = {}  # type: Dict[str, float]  # For each rendered article and language, the time it took to render it.
+
+slowest_articles_reported = 10  # How many of the slowest articles to list in the log.
+
+@contextlib.contextmanager
+def measure(phase: str) -> Iterator[None]:
+	"""
+	Measure the execution of a phase of loading the guide.
+
+	Use this as a context manager, around the code of the phase.
+	:param phase: The name of the phase.
+	"""
+	start_blocks = sys.getallocatedblocks()
+	start_cpu = time.thread_time()
+	start_wall = time.perf_counter()
+	try:
+		yield
+	finally:
+		wall = time.perf_counter() - start_wall
+		cpu = time.thread_time() - start_cpu
+		blocks = sys.getallocatedblocks() - start_blocks
+		with _lock:
+			if phase not in _phases:
+				_phases[phase] = {"count": 0, "wall": 0.0, "cpu": 0.0, "allocated_blocks": 0, "longest_wall": 0.0}
+			record = _phases[phase]
+			record["count"] += 1
+			record["wall"] += wall
+			record["cpu"] += cpu
+			record["allocated_blocks"] += blocks
+			record["longest_wall"] = max(record["longest_wall"], wall)
+
+def record_article(article_id: str, language: str, duration: float) -> None:
+	"""
+	Record how long it took to render an article.
+	:param article_id: The article that was rendered.
+	:param language: The language of the article.
+	:param duration: The time it took, in seconds.
+	"""
+	with _lock:
+		_articles[article_id + "/" + language] = duration
+
+def report() -> Dict[str, Any]:
+	"""
+	Get all measurements so far.
+	:return: A JSON-serialisable document with the measurements of each phase
+	and the render time of each article, in seconds.
+	"""
+	with _lock:
+		return {
+			"phases": {phase: dict(record) for phase, record in _phases.items()},
+			"articles": dict(_articles)
+		}
+
+def log_report() -> None:
+	"""
+	Write a summary of the measurements to the log.
+	"""
+	document = report()
+	for phase, record in sorted(document["phases"].items()):
+		Logger.log("i", "Settings Guide phase {phase}: {count}x, {wall:.1f} ms wall time, {cpu:.1f} ms CPU time, {blocks} blocks allocated.".format(phase=phase, count=record["count"], wall=record["wall"] * 1000, cpu=record["cpu"] * 1000, blocks=record["allocated_blocks"]))
+	articles = document["articles"]
+	if articles:
+		total = sum(articles.values())
+		Logger.log("i", "Settings Guide rendered {count} articles in {total:.1f} ms.".format(count=len(articles), total=total * 1000))
+		slowest = sorted(articles.items(), key=lambda item: -item[1])[:slowest_articles_reported]
+		Logger.log("i", "Slowest Settings Guide articles: " + ", ".join("{article} ({duration:.1f} ms)".format(article=article, duration=duration * 1000) for article, duration in slowest))
+
+def save(report_file: str) -> None:
+	"""
+	Store the measurements in a JSON file.
+	:param report_file: The file to store the measurements in.
+	"""
+	try:
+		os.makedirs(os.path.dirname(report_file), exist_ok=True)
+		with open(report_file, "w", encoding="utf-8") as f:
+			json.dump(report(), f, indent=1, sort_keys=True)
+	except OSError as e:
+		Logger.log("w", "Unable to save Settings Guide timing report: {err}".format(err=str(e)))
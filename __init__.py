@@ -4,10 +4,16 @@
 #This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
 #You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
 
-from . import CuraSettingsGuide
+import time  # To measure how long it takes to register the plug-in.
+
+from UM.Logger import Logger
 
 def getMetaData():
 	return {}
 
 def register(app):
-	return {"extension": CuraSettingsGuide.CuraSettingsGuide()}
+	start_time = time.perf_counter()
+	from . import CuraSettingsGuide  # Only imported when registering, so that Cura can load the metadata without importing the whole plug-in.
+	extension = CuraSettingsGuide.CuraSettingsGuide()
+	Logger.log("i", "Registering the Settings Guide took {duration:.1f} ms.".format(duration=(time.perf_counter() - start_time) * 1000))
+	return {"extension": extension}
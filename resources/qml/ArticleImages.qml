@@ -77,7 +77,7 @@ GridLayout {
 
 				Image {
 					id: thumbnail
-					source: modelData.substring(0, modelData.indexOf("|"))
+					source: manager.thumbnail(modelData.substring(0, modelData.indexOf("|")))
 					fillMode: Image.PreserveAspectFit
 					anchors.fill: parent
 					sourceSize.width: width
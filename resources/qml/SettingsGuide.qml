@@ -242,7 +242,8 @@ Window {
 					height: zoom_layer.height * 3 / 4
 					fillMode: Image.PreserveAspectFit
 					mipmap: true
-					onStatusChanged: playing = (status == AnimatedImage.Ready)
+					cache: false //Don't keep the decoded frames around after zooming out.
+					playing: status == AnimatedImage.Ready && visible //Only decode frames while the image is shown.
 					visible: settingsGuideBase.zoomed_image.split('.').pop() !== "svg" //Only for non-SVG.
 				}
 
@@ -0,0 +1,145 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for compiling articles into bundles and reading them back.
+"""
+
+import hashlib  # To check the signatures of the articles.
+import importlib  # To import the module under test.
+import json  # To create bundles with a broken index.
+import os  # To create the articles.
+import tempfile  # To create the articles and bundles in.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+ArticleBundle = importlib.import_module("SettingsGuide.ArticleBundle")
+
+class TestArticleBundle(unittest.TestCase):
+	"""
+	Tests for compiling articles into bundles and reading them back.
+	"""
+
+	articles = {
+		"articles/infill/infill_sparse_density.md": "Infill density\n====\nHow much of the interior is filled.\n".encode("utf-8"),
+		"articles/infill/infill_pattern.md": "Infill pattern\r\n====\r\nThe shape of the infill.\r\n".encode("utf-8"),  # Windows line endings.
+		"articles/shell/empty.md": b"",
+		"articles/shell/wall_thickness.md": "Wall thickness ≥ 0.8 mm — «fine»\n".encode("utf-8"),
+		"translations/nl_NL/infill/infill_pattern.md": "Vulpatroon\r\n====\r\nDe vorm van de vulling.\r\n".encode("utf-8"),
+		"translations/ru_RU/shell/wall_thickness.md": "Толщина стенки\n".encode("utf-8")
+	}
+
+	def setUp(self):
+		"""
+		Creates a small resources folder with articles, and compiles it into
+		bundles.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.resources_path = os.path.join(self.folder.name, "resources")
+		for path, contents in self.articles.items():
+			full_path = os.path.join(self.resources_path, *path.split("/"))
+			os.makedirs(os.path.dirname(full_path), exist_ok=True)
+			with open(full_path, "wb") as f:
+				f.write(contents)
+		self.bundles_path = os.path.join(self.folder.name, "bundles")
+		ArticleBundle.write_bundles(self.resources_path, self.bundles_path)
+
+	def tearDown(self):
+		"""
+		Removes the resources and bundles.
+		"""
+		self.folder.cleanup()
+
+	def test_round_trip(self):
+		"""
+		Tests that every article is read back from the bundles byte for byte,
+		with a signature of its contents.
+		"""
+		self.assertEqual(sorted(os.listdir(self.bundles_path)), ["en_US.bundle", "nl_NL.bundle", "ru_RU.bundle"])
+		for path, contents in self.articles.items():
+			with self.subTest(path=path):
+				language = "en_US" if path.startswith("articles/") else path.split("/")[1]
+				article_id = os.path.splitext(os.path.basename(path))[0]
+				markdown_file = os.path.join(self.resources_path, *path.split("/"))
+				bundle = ArticleBundle.ArticleBundle(os.path.join(self.bundles_path, language + ".bundle"), self.resources_path)
+				try:
+					self.assertEqual(bundle.read(article_id).encode("utf-8"), contents)
+					self.assertEqual(bundle.signature(article_id, markdown_file), ["sha1", hashlib.sha1(contents).hexdigest()])
+				finally:
+					bundle.close()
+
+	def test_missing_article(self):
+		"""
+		Tests reading an article that is not in the bundle, or that was compiled
+		from a different file.
+		"""
+		bundle = ArticleBundle.ArticleBundle(os.path.join(self.bundles_path, "nl_NL.bundle"), self.resources_path)
+		try:
+			self.assertIsNone(bundle.read("wall_thickness"))
+			self.assertIsNone(bundle.signature("wall_thickness", os.path.join(self.resources_path, "articles", "shell", "wall_thickness.md")))
+			self.assertIsNone(bundle.signature("infill_pattern", os.path.join(self.resources_path, "translations", "nl_NL", "moved", "infill_pattern.md")))
+		finally:
+			bundle.close()
+
+	def write_bundle(self, contents: bytes) -> str:
+		"""
+		Write a bundle file with arbitrary contents.
+		:param contents: The contents of the bundle.
+		:return: The path to the bundle file.
+		"""
+		bundle_file = os.path.join(self.bundles_path, "test.bundle")
+		with open(bundle_file, "wb") as f:
+			f.write(contents)
+		return bundle_file
+
+	def test_truncated(self):
+		"""
+		Tests that a bundle that is cut off anywhere is rejected.
+		"""
+		with open(os.path.join(self.bundles_path, "en_US.bundle"), "rb") as f:
+			contents = f.read()
+		for length in range(len(contents)):
+			with self.subTest(length=length):
+				bundle_file = self.write_bundle(contents[:length])
+				with self.assertRaises(ValueError):
+					ArticleBundle.ArticleBundle(bundle_file, self.resources_path)
+
+	def test_bad_magic(self):
+		"""
+		Tests that a file that is not a bundle is rejected.
+		"""
+		with open(os.path.join(self.bundles_path, "en_US.bundle"), "rb") as f:
+			contents = f.read()
+		bundle_file = self.write_bundle(b"NOBUNDLE" + contents[len(ArticleBundle.magic):])
+		with self.assertRaises(ValueError):
+			ArticleBundle.ArticleBundle(bundle_file, self.resources_path)
+
+	def test_other_version(self):
+		"""
+		Tests that a bundle of a different format is rejected.
+		"""
+		with open(os.path.join(self.bundles_path, "en_US.bundle"), "rb") as f:
+			contents = f.read()
+		_, index_length = ArticleBundle.header.unpack_from(contents, len(ArticleBundle.magic))
+		header = ArticleBundle.header.pack(ArticleBundle.version + 1, index_length)
+		bundle_file = self.write_bundle(ArticleBundle.magic + header + contents[len(ArticleBundle.magic) + ArticleBundle.header.size:])
+		with self.assertRaises(ValueError):
+			ArticleBundle.ArticleBundle(bundle_file, self.resources_path)
+
+	def test_broken_index(self):
+		"""
+		Tests that a bundle with an index that doesn't make sense is rejected.
+		"""
+		for index in [[], {"article": "not a list"}, {"article": [0, 10]}, {"article": [0, -1, "hash", "path.md"]}, {"article": [0, 100, "hash", "path.md"]}]:
+			with self.subTest(index=index):
+				index_serialised = json.dumps(index).encode("utf-8")
+				bundle_file = self.write_bundle(ArticleBundle.magic + ArticleBundle.header.pack(ArticleBundle.version, len(index_serialised)) + index_serialised + b"0123456789")
+				with self.assertRaises(ValueError):
+					ArticleBundle.ArticleBundle(bundle_file, self.resources_path)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,299 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for the caches of rendered articles.
+"""
+
+import importlib  # To import the module under test.
+import json  # To inspect and modify the cache files.
+import os  # To create and modify source files.
+import tempfile  # To store the caches and source files.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+ArticleCache = importlib.import_module("SettingsGuide.ArticleCache")
+
+class TestArticleDiskCache(unittest.TestCase):
+	"""
+	Tests for the persistent cache of rendered articles.
+	"""
+
+	render_key = {"cura_version": "4.13.0", "link_colour": "#196ef0"}
+
+	parts = [["rich_text", "<h1>Title</h1>"], ["images", "image.png"]]
+
+	def setUp(self):
+		"""
+		Creates a temporary folder with a source file to cache.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.cache_file = os.path.join(self.folder.name, "cache", "articles.json")
+		self.source_file = os.path.join(self.folder.name, "article.md")
+		self.write_source("# Title")
+
+	def tearDown(self):
+		"""
+		Removes the temporary folder.
+		"""
+		self.folder.cleanup()
+
+	def write_source(self, contents: str, mtime_ns: int = 1000000000000000000) -> None:
+		"""
+		Write the source file of the cached article.
+		:param contents: The Markdown to write.
+		:param mtime_ns: The modification time to give the file, in nanoseconds.
+		"""
+		with open(self.source_file, "w", encoding="utf-8") as f:
+			f.write(contents)
+		os.utime(self.source_file, ns=(mtime_ns, mtime_ns))
+
+	def filled_cache(self, signature=None) -> "ArticleCache.ArticleDiskCache":
+		"""
+		Create a cache with one article in it, saved to disk.
+		:param signature: The signature to store the article with, if it's not
+		read from the source file.
+		:return: The cache.
+		"""
+		cache = ArticleCache.ArticleDiskCache(self.cache_file)
+		cache.load(self.render_key)
+		cache.put("article", "en_US", self.source_file, self.parts, "<h1>Title</h1>", signature)
+		cache.save()
+		return cache
+
+	def reloaded_cache(self, render_key=None) -> "ArticleCache.ArticleDiskCache":
+		"""
+		Load the cache file in a new cache, as it would be in the next session.
+		:param render_key: The render key to load the cache with. By default,
+		the same render key as the one it was saved with.
+		:return: The loaded cache.
+		"""
+		cache = ArticleCache.ArticleDiskCache(self.cache_file)
+		cache.load(render_key if render_key is not None else self.render_key)
+		return cache
+
+	def test_round_trip(self):
+		"""
+		Tests that an article that was saved can be read back in the next
+		session.
+		"""
+		self.filled_cache()
+		self.assertEqual(self.reloaded_cache().get("article", "en_US", self.source_file), (self.parts, "<h1>Title</h1>"))
+
+	def test_render_key_changed(self):
+		"""
+		Tests that the whole cache is discarded if the render key changed.
+		"""
+		self.filled_cache()
+		for key, value in {"cura_version": "5.0.0", "link_colour": "#ff0000", "platform": "linux"}.items():
+			with self.subTest(key=key):
+				render_key = dict(self.render_key)
+				render_key[key] = value
+				self.assertIsNone(self.reloaded_cache(render_key).get("article", "en_US", self.source_file))
+
+	def test_source_modified(self):
+		"""
+		Tests that an entry is rejected if its source file was modified since it
+		was cached.
+		"""
+		self.filled_cache()
+		self.write_source("# Title", mtime_ns=2000000000000000000)  # Same size, different modification time.
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", self.source_file))
+
+		self.filled_cache()
+		self.write_source("# Other title")  # Same modification time, different size.
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", self.source_file))
+
+	def test_source_deleted(self):
+		"""
+		Tests that an entry is rejected if its source file is gone.
+		"""
+		self.filled_cache()
+		os.remove(self.source_file)
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", self.source_file))
+
+	def test_source_moved(self):
+		"""
+		Tests that an entry is rejected if the article is now read from a
+		different file.
+		"""
+		self.filled_cache()
+		other_file = os.path.join(self.folder.name, "other.md")
+		os.replace(self.source_file, other_file)
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", other_file))
+
+	def test_bundle_hash_changed(self):
+		"""
+		Tests that an entry read from a bundle is rejected if the hash of the
+		article in the bundle changed.
+		"""
+		self.filled_cache(signature=["abc123"])
+		cache = self.reloaded_cache()
+		self.assertEqual(cache.get("article", "en_US", self.source_file, ["abc123"]), (self.parts, "<h1>Title</h1>"))
+		self.assertIsNone(cache.get("article", "en_US", self.source_file, ["def456"]))
+		self.assertIsNone(cache.get("article", "en_US", self.source_file))  # Not in a bundle any more, so the file signature is used.
+
+	def test_corrupt_file(self):
+		"""
+		Tests that a corrupt cache file is ignored.
+		"""
+		self.filled_cache()
+		with open(self.cache_file, "r+b") as f:
+			f.truncate(os.path.getsize(self.cache_file) // 2)
+		cache = self.reloaded_cache()
+		self.assertIsNone(cache.get("article", "en_US", self.source_file))
+
+		header = json.dumps({"render_key": dict(self.render_key, format=ArticleCache.ArticleDiskCache.version)}) + "\n"
+		metadata = {"article_id": "article", "language": "en_US", "source": self.source_file, "signature": ArticleCache.ArticleDiskCache.signature(self.source_file)}
+		for document in ["[1, 2, 3]\n", "\"render_key\"\n", "{\"render_key\": 3\n", header + "3\n", header + "{\"article_id\": \"article\"}\n", header + json.dumps(metadata) + "\n", header + json.dumps(dict(metadata, parts=self.parts, rich_text="<h1>Title</h1>"))[:-10]]:  # The last one is truncated.
+			with self.subTest(document=document):
+				with open(self.cache_file, "w", encoding="utf-8") as f:
+					f.write(document)
+				cache = self.reloaded_cache()
+				self.assertIsNone(cache.get("article", "en_US", self.source_file))
+				cache.remove("article", "en_US")
+				cache.put("article", "en_US", self.source_file, self.parts, "<h1>Title</h1>")  # Overwrites the corrupt entry.
+				self.assertEqual(cache.get("article", "en_US", self.source_file), (self.parts, "<h1>Title</h1>"))
+
+	def test_old_version(self):
+		"""
+		Tests that a cache written by a different version of the cache format is
+		ignored.
+		"""
+		self.filled_cache()
+		with open(self.cache_file, encoding="utf-8") as f:
+			header, *entries = f.readlines()
+		header = json.loads(header)
+		header["render_key"]["format"] = ArticleCache.ArticleDiskCache.version - 1
+		with open(self.cache_file, "w", encoding="utf-8") as f:
+			f.write(json.dumps(header) + "\n" + "".join(entries))
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", self.source_file))
+
+	def test_saved_articles_read_from_disk(self):
+		"""
+		Tests that articles are not kept in memory after they are saved, but
+		read from the cache file when they are needed.
+		"""
+		cache = ArticleCache.ArticleDiskCache(self.cache_file)
+		cache.load(self.render_key)
+		cache.put("article", "en_US", self.source_file, self.parts, "<h1>Title</h1>")
+		os.makedirs(os.path.dirname(self.cache_file))
+		with open(self.cache_file, "w", encoding="utf-8") as f:
+			f.write("Not a cache.")
+		self.assertEqual(cache.get("article", "en_US", self.source_file), (self.parts, "<h1>Title</h1>"))  # Not saved yet, so still in memory.
+
+		cache.save()
+		os.remove(self.cache_file)
+		self.assertIsNone(cache.get("article", "en_US", self.source_file))  # Saved, so only on disk.
+
+	def test_save_again(self):
+		"""
+		Tests that articles saved earlier are kept when the cache is saved
+		again with new articles.
+		"""
+		cache = self.filled_cache()
+		other_file = os.path.join(self.folder.name, "other.md")
+		with open(other_file, "w", encoding="utf-8") as f:
+			f.write("# Other")
+		cache.put("other", "nl_NL", other_file, [["rich_text", "<h1>Ander</h1>"]], "<h1>Ander</h1>")
+		cache.save()
+		self.assertEqual(cache.get("article", "en_US", self.source_file), (self.parts, "<h1>Title</h1>"))
+		reloaded = self.reloaded_cache()
+		self.assertEqual(reloaded.get("article", "en_US", self.source_file), (self.parts, "<h1>Title</h1>"))
+		self.assertEqual(reloaded.get("other", "nl_NL", other_file), ([["rich_text", "<h1>Ander</h1>"]], "<h1>Ander</h1>"))
+
+	def test_remove(self):
+		"""
+		Tests removing an article from the cache.
+		"""
+		cache = self.filled_cache()
+		cache.remove("article", "en_US")
+		cache.save()
+		self.assertIsNone(self.reloaded_cache().get("article", "en_US", self.source_file))
+
+class TestArticleMemoryCache(unittest.TestCase):
+	"""
+	Tests for keeping the rendered articles in memory within a budget.
+	"""
+
+	def article(self, text: str):
+		"""
+		Create the parts and rich text of an article.
+		:param text: A text to put in the article. Its length determines the
+		size of the article.
+		:return: The parts and the rich text of the article.
+		"""
+		return [["rich_text", text], ["images", "a.png", "b.png"]], text
+
+	def test_measure(self):
+		"""
+		Tests that the size of an article includes all of its strings and the
+		lists containing them.
+		"""
+		parts, rich_text = self.article("x" * 1000)
+		size = ArticleCache.ArticleMemoryCache.measure(parts) + ArticleCache.ArticleMemoryCache.measure(rich_text)
+		self.assertGreater(size, 2000)  # The text is in there twice.
+		bigger_parts = parts + [["images"] + ["image_{index}.png".format(index=index) for index in range(100)]]
+		self.assertGreater(ArticleCache.ArticleMemoryCache.measure(bigger_parts), ArticleCache.ArticleMemoryCache.measure(parts) + 100 * len("image_00.png"))
+
+		cache = ArticleCache.ArticleMemoryCache(budget=1000000)
+		cache.put("article", "en_US", parts, rich_text)
+		self.assertEqual(cache.size, size)
+		cache.remove("article", "en_US")
+		self.assertEqual(cache.size, 0)
+
+	def test_evict_within_budget(self):
+		"""
+		Tests that articles in other languages are evicted to stay within the
+		budget, least recently used first.
+		"""
+		article_size = sum(ArticleCache.ArticleMemoryCache.measure(item) for item in self.article("x" * 1000))
+		cache = ArticleCache.ArticleMemoryCache(budget=article_size * 3)
+		for index in range(3):
+			cache.put("article{index}".format(index=index), "nl_NL", *self.article("x" * 1000))
+		self.assertLessEqual(cache.size, article_size * 3)
+		self.assertIsNotNone(cache.get("article0", "nl_NL"))  # Now article1 is the least recently used.
+
+		cache.put("article3", "nl_NL", *self.article("x" * 1000))
+		self.assertLessEqual(cache.size, article_size * 3)
+		self.assertIsNone(cache.get("article1", "nl_NL"))
+		for article_id in ["article0", "article2", "article3"]:
+			self.assertIsNotNone(cache.get(article_id, "nl_NL"))
+
+	def test_keep_resident_languages(self):
+		"""
+		Tests that English articles and articles in the active language are
+		never evicted, even if they exceed the budget.
+		"""
+		cache = ArticleCache.ArticleMemoryCache(budget=100, active_language="fr_FR")
+		for index in range(10):
+			cache.put("article{index}".format(index=index), "en_US", *self.article("x" * 1000))
+			cache.put("article{index}".format(index=index), "fr_FR", *self.article("x" * 1000))
+			cache.put("article{index}".format(index=index), "nl_NL", *self.article("x" * 1000))
+		for index in range(10):
+			self.assertIsNotNone(cache.get("article{index}".format(index=index), "en_US"))
+			self.assertIsNotNone(cache.get("article{index}".format(index=index), "fr_FR"))
+			self.assertIsNone(cache.get("article{index}".format(index=index), "nl_NL"))
+		self.assertEqual(cache.size, 20 * sum(ArticleCache.ArticleMemoryCache.measure(item) for item in self.article("x" * 1000)))
+
+	def test_change_active_language(self):
+		"""
+		Tests that the articles of the previously active language become
+		evictable when the active language changes.
+		"""
+		cache = ArticleCache.ArticleMemoryCache(budget=100, active_language="fr_FR")
+		cache.put("article", "en_US", *self.article("x" * 1000))
+		cache.put("article", "fr_FR", *self.article("x" * 1000))
+		cache.set_active_language("nl_NL")
+		self.assertIsNone(cache.get("article", "fr_FR"))  # Over budget, so evicted right away.
+		self.assertIsNotNone(cache.get("article", "en_US"))
+		cache.put("article", "nl_NL", *self.article("x" * 1000))
+		self.assertIsNotNone(cache.get("article", "nl_NL"))
+		self.assertEqual(cache.active_language, "nl_NL")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,153 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for the manifest of article locations.
+"""
+
+import importlib  # To import the module under test.
+import json  # To modify the manifest.
+import os  # To create the articles.
+import shutil  # To remove folders of articles.
+import tempfile  # To create the articles and manifest in.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+ArticleManifest = importlib.import_module("SettingsGuide.ArticleManifest")
+
+class TestArticleManifest(unittest.TestCase):
+	"""
+	Tests for the manifest of article locations.
+	"""
+
+	articles = {
+		"articles/infill/infill_sparse_density.md": "Infill density",
+		"articles/infill/infill_pattern.md": "Infill pattern",
+		"articles/shell/wall_thickness.md": "Wall thickness",
+		"translations/nl_NL/infill/infill_sparse_density.md": "Vullingsdichtheid",
+		"translations/nl_NL/shell/not_in_english.md": "Only translated",
+		"translations/fr_FR/infill/infill_pattern.md": "Motif de remplissage"
+	}
+
+	def setUp(self):
+		"""
+		Creates a small resources folder with articles and translations.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.resources_path = self.folder.name
+		for path, contents in self.articles.items():
+			full_path = os.path.join(self.resources_path, *path.split("/"))
+			os.makedirs(os.path.dirname(full_path), exist_ok=True)
+			with open(full_path, "w", encoding="utf-8") as f:
+				f.write(contents)
+		self.manifest_file = os.path.join(self.resources_path, "article_manifest.json")
+
+	def tearDown(self):
+		"""
+		Removes the resources folder.
+		"""
+		self.folder.cleanup()
+
+	def test_walk(self):
+		"""
+		Tests finding the articles by searching through the folders.
+		"""
+		result = ArticleManifest.walk_articles(self.resources_path)
+		self.assertEqual(set(result), {"infill_sparse_density", "infill_pattern", "wall_thickness"})  # Articles that only exist in translation are ignored.
+		self.assertEqual(set(result["infill_sparse_density"]), {"en_US", "nl_NL"})
+		self.assertEqual(set(result["infill_pattern"]), {"en_US", "fr_FR"})
+		self.assertEqual(result["wall_thickness"], {"en_US": os.path.join(self.resources_path, "articles", "shell", "wall_thickness.md")})
+
+	def test_round_trip(self):
+		"""
+		Tests that reading the manifest gives the same locations as searching.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		self.assertEqual(ArticleManifest.read_manifest(self.resources_path, self.manifest_file), ArticleManifest.walk_articles(self.resources_path))
+
+	def test_missing(self):
+		"""
+		Tests that there is no result if there is no manifest.
+		"""
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_languages_changed(self):
+		"""
+		Tests that the manifest is stale if a translation was added or removed.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		os.makedirs(os.path.join(self.resources_path, "translations", "de_DE"))
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_article_added(self):
+		"""
+		Tests that the manifest is stale if an article was added, even in a
+		new folder.
+		"""
+		for path in ["articles/infill/infill_line_distance.md", "articles/support/support_enable.md", "translations/nl_NL/shell/wall_thickness.md"]:
+			with self.subTest(path=path):
+				ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+				full_path = os.path.join(self.resources_path, *path.split("/"))
+				os.makedirs(os.path.dirname(full_path), exist_ok=True)
+				with open(full_path, "w", encoding="utf-8") as f:
+					f.write("New article")
+				self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_article_renamed(self):
+		"""
+		Tests that the manifest is stale if an article was renamed.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		os.rename(os.path.join(self.resources_path, "articles", "infill", "infill_pattern.md"), os.path.join(self.resources_path, "articles", "infill", "infill_shape.md"))
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_article_removed(self):
+		"""
+		Tests that the manifest is stale if an article or a whole folder was
+		removed.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		os.remove(os.path.join(self.resources_path, "translations", "fr_FR", "infill", "infill_pattern.md"))
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		shutil.rmtree(os.path.join(self.resources_path, "articles", "shell"))
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_article_edited(self):
+		"""
+		Tests that the manifest is still used if only the contents of an
+		article changed.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		with open(os.path.join(self.resources_path, "articles", "infill", "infill_pattern.md"), "w", encoding="utf-8") as f:
+			f.write("Changed contents")
+		self.assertEqual(ArticleManifest.read_manifest(self.resources_path, self.manifest_file), ArticleManifest.walk_articles(self.resources_path))
+
+	def test_other_version(self):
+		"""
+		Tests that a manifest of a different format is ignored.
+		"""
+		ArticleManifest.write_manifest(self.resources_path, self.manifest_file)
+		with open(self.manifest_file, encoding="utf-8") as f:
+			manifest = json.load(f)
+		manifest["version"] = ArticleManifest.version + 1
+		with open(self.manifest_file, "w", encoding="utf-8") as f:
+			json.dump(manifest, f)
+		self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+	def test_corrupt(self):
+		"""
+		Tests that a corrupt manifest is ignored.
+		"""
+		for document in ["{", "[]", "{\"version\": 2}", "{\"version\": 2, \"languages\": [\"fr_FR\", \"nl_NL\"], \"folders\": {}, \"articles\": {\"infill_pattern\": {\"en_US\": 3}}}", "{\"version\": 2, \"languages\": [\"fr_FR\", \"nl_NL\"], \"folders\": {\"articles\": \"abc\"}, \"articles\": {}}"]:
+			with self.subTest(document=document):
+				with open(self.manifest_file, "w", encoding="utf-8") as f:
+					f.write(document)
+				self.assertIsNone(ArticleManifest.read_manifest(self.resources_path, self.manifest_file))
+
+if __name__ == "__main__":
+	unittest.main()
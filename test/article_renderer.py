@@ -0,0 +1,62 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for rendering the articles outside of Cura.
+"""
+
+import importlib  # To import the module under test.
+import multiprocessing  # To check whether rendering in parallel is supported.
+import os  # To find the articles.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+mistune_file = plugin_loader.mistune_file()
+if mistune_file is not None:
+	plugin_loader.import_plugin(mistune_file)
+	ArticleManifest = importlib.import_module("SettingsGuide.ArticleManifest")
+	ArticleRenderer = importlib.import_module("SettingsGuide.ArticleRenderer")
+
+@unittest.skipIf(mistune_file is None, "Mistune is not available.")
+class TestRenderFiles(unittest.TestCase):
+	"""
+	Tests for rendering articles in worker processes.
+	"""
+
+	def setUp(self):
+		"""
+		Selects a sample of the real articles, in all languages.
+		"""
+		self.settings = ArticleRenderer.RenderSettings(link_colour="#196ef0", image_width=150, cura_version="4.13.0", platform="linux")
+		article_locations = ArticleManifest.walk_articles(plugin_loader.resources_path)
+		self.tasks = []
+		for article_id in sorted(article_locations)[::10]:
+			for language, markdown_file in sorted(article_locations[article_id].items()):
+				self.tasks.append((article_id, language, markdown_file))
+
+	@unittest.skipIf("forkserver" not in multiprocessing.get_all_start_methods(), "This platform doesn't have a fork server.")
+	def test_parallel_matches_serial(self):
+		"""
+		Tests that rendering the articles in worker processes gives the same
+		parts and rich text as rendering them in this process.
+		"""
+		missing_file = os.path.join(plugin_loader.resources_path, "articles", "does_not_exist.md")
+		tasks = self.tasks + [("does_not_exist", "en_US", missing_file)]
+		parallel = list(ArticleRenderer.render_files(tasks, self.settings, max_workers=2))
+		self.assertEqual(len(parallel), len(tasks))
+		for (article_id, language, markdown_file), result in zip(tasks, parallel):
+			with self.subTest(article_id=article_id, language=language):
+				self.assertEqual(result, ArticleRenderer.render_file(article_id, language, markdown_file, self.settings))
+		self.assertIsNone(parallel[-1])  # The file that doesn't exist.
+
+	def test_no_tasks(self):
+		"""
+		Tests that rendering nothing in parallel doesn't start any processes.
+		"""
+		self.assertEqual(list(ArticleRenderer.render_files([], self.settings)), [])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,270 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Benchmarks of the article rendering pipeline, without running Cura.
+
+This renders the real articles and translations in the resources folder, and measures the throughput and peak memory
+usage of each step. The plug-in's rendering modules don't access Cura directly, but the render settings are normally
+taken from Cura's application and theme. Those are replaced here by local stand-ins that provide the same values.
+
+The results are appended to a results file, one JSON document per line, along with the Git commit that was measured.
+The results are compared to the previous line in that file, so that regressions can be spotted.
+
+Usage:
+`python3 benchmark.py --mistune <path to mistune.py> [--results <results file>] [--repeat <number of repeats>]`
+"""
+
+import argparse  # To parse the command line arguments.
+import datetime  # To record when the benchmark was executed.
+import gc  # To start each benchmark with a clean slate.
+import importlib  # To import the plug-in's modules.
+import json  # To store the results.
+import os  # To find the resources and the plug-in's modules.
+import platform  # To record which Python was measured.
+import subprocess  # To find the Git commit being measured.
+import time  # To measure time.
+import tracemalloc  # To measure peak memory usage.
+import types  # Type hints for the plug-in's modules.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_path = plugin_loader.plugin_path
+resources_path = plugin_loader.resources_path
+
+class StandInColour:
+	"""
+	Stand-in for QColor, as returned by the theme.
+	"""
+
+	def __init__(self, name: str) -> None:
+		self._name = name
+
+	def name(self) -> str:
+		return self._name
+
+class StandInSize:
+	"""
+	Stand-in for QSizeF, as returned by the theme.
+	"""
+
+	def __init__(self, width: float, height: float) -> None:
+		self._width = width
+		self._height = height
+
+	def width(self) -> float:
+		return self._width
+
+	def height(self) -> float:
+		return self._height
+
+class StandInTheme:
+	"""
+	Stand-in for Uranium's Theme singleton, with the values of Cura's default
+	theme at a font size of 10 pixels per em.
+	"""
+
+	_instance = None
+
+	@classmethod
+	def getInstance(cls) -> "StandInTheme":
+		if cls._instance is None:
+			cls._instance = cls()
+		return cls._instance
+
+	def getColor(self, name: str) -> StandInColour:
+		return StandInColour({"text_link": "#196ef0"}.get(name, "#000000"))
+
+	def getSize(self, name: str) -> StandInSize:
+		return {"tooltip": StandInSize(200, 100), "default_margin": StandInSize(10, 10)}.get(name, StandInSize(10, 10))
+
+class StandInApplication:
+	"""
+	Stand-in for Uranium's Application and Cura's CuraApplication singletons.
+	"""
+
+	_instance = None
+
+	@classmethod
+	def getInstance(cls) -> "StandInApplication":
+		if cls._instance is None:
+			cls._instance = cls()
+		return cls._instance
+
+	def getVersion(self) -> str:
+		return "4.13.0"
+
+def render_settings(article_renderer: types.ModuleType):
+	"""
+	Create the render settings in the same way as the plug-in does, from the
+	stand-ins of the theme and application.
+	:param article_renderer: The ArticleRenderer module.
+	:return: The render settings.
+	"""
+	theme = StandInTheme.getInstance()
+	margin = theme.getSize("default_margin").width()
+	return article_renderer.RenderSettings(
+		link_colour=theme.getColor("text_link").name(),
+		image_width=theme.getSize("tooltip").width() * 2.5 / 3 - margin * 2,
+		cura_version=StandInApplication.getInstance().getVersion(),
+		platform=platform.system().lower()
+	)
+
+def measure(function, repeat: int):
+	"""
+	Measure the execution time and peak memory usage of a function.
+
+	The time is measured without tracing memory allocations, since that slows
+	down the function. The peak memory is measured in a separate run.
+	:param function: The function to measure. It must return the number of
+	articles and the number of bytes it processed.
+	:param repeat: How many times to execute the function to measure the time.
+	The fastest time is reported.
+	:return: A dictionary with the measurements.
+	"""
+	durations = []
+	for _ in range(repeat):
+		gc.collect()
+		start_time = time.perf_counter()
+		num_articles, num_bytes = function()
+		durations.append(time.perf_counter() - start_time)
+	gc.collect()
+	tracemalloc.start()
+	function()
+	_, peak_memory = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	duration = min(durations)
+	return {
+		"articles": num_articles,
+		"bytes": num_bytes,
+		"seconds": duration,
+		"articles_per_second": num_articles / duration if duration > 0 else 0,
+		"mb_per_second": num_bytes / 1024 / 1024 / duration if duration > 0 else 0,
+		"peak_memory": peak_memory
+	}
+
+def run_benchmarks(repeat: int):
+	"""
+	Run all benchmarks.
+	:param repeat: How many times to execute each benchmark.
+	:return: For each benchmark, the measurements.
+	"""
+	article_manifest = importlib.import_module("SettingsGuide.ArticleManifest")
+	article_renderer = importlib.import_module("SettingsGuide.ArticleRenderer")
+	qt_markdown_renderer = importlib.import_module("SettingsGuide.QtMarkdownRenderer")
+	settings = render_settings(article_renderer)
+
+	article_locations = article_manifest.walk_articles(resources_path)
+	sources = {}  # For each article and language, the Markdown source.
+	for article_id, languages in article_locations.items():
+		for language, path in languages.items():
+			with open(path, encoding="utf-8") as f:
+				sources[(article_id, language)] = f.read()
+	languages = sorted({language for _, language in sources})
+	rendered = {}  # For each article and language, the parts and rich text.
+
+	def load_corpus():
+		num_bytes = 0
+		for (article_id, language), markdown in sources.items():
+			rendered[(article_id, language)] = article_renderer.render_article(markdown, os.path.dirname(article_locations[article_id][language]), settings, language)
+			num_bytes += len(markdown.encode("utf-8"))
+		return len(sources), num_bytes
+
+	def load_language(language):
+		def load():
+			num_articles = 0
+			num_bytes = 0
+			for article_id, article_languages in article_locations.items():
+				article_language = language if language in article_languages else "en_US"
+				markdown = sources[(article_id, article_language)]
+				article_renderer.render_article(markdown, os.path.dirname(article_languages[article_language]), settings, article_language)
+				num_articles += 1
+				num_bytes += len(markdown.encode("utf-8"))
+			return num_articles, num_bytes
+		return load
+
+	def preprocess_conditionals():
+		num_bytes = 0
+		for (_, language), markdown in sources.items():
+			qt_markdown_renderer.QtMarkdownRenderer.preprocess_conditionals(markdown, {"cura_version": settings.cura_version, "language": language, "platform": settings.platform})
+			num_bytes += len(markdown.encode("utf-8"))
+		return len(sources), num_bytes
+
+	def preprocess_tooltips():
+		num_bytes = 0
+		for parts, rich_text in rendered.values():
+			article_renderer.preprocess_tooltip(rich_text)
+			article_renderer.preprocess_tooltip(article_renderer.render_digest(parts, settings))
+			num_bytes += len(rich_text.encode("utf-8"))
+		return len(rendered), num_bytes
+
+	results = {}
+	results["find_articles"] = measure(lambda: (len(article_manifest.walk_articles(resources_path)), 0), repeat)
+	results["full_corpus"] = measure(load_corpus, repeat)
+	for language in languages:
+		results["language_" + language] = measure(load_language(language), repeat)
+	results["preprocess_conditionals"] = measure(preprocess_conditionals, repeat)
+	results["preprocess_tooltips"] = measure(preprocess_tooltips, repeat)
+	return results
+
+def git_commit() -> str:
+	"""
+	Get the Git commit that is being benchmarked.
+	:return: The commit hash, or an empty string if it's not known.
+	"""
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], cwd=plugin_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, universal_newlines=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ""
+
+def previous_results(results_file: str):
+	"""
+	Get the results of the previous benchmark run.
+	:param results_file: The file that the results are stored in.
+	:return: The results of the last run in that file, or `None` if there are
+	none.
+	"""
+	try:
+		with open(results_file, encoding="utf-8") as f:
+			lines = [line for line in f if line.strip()]
+		if not lines:
+			return None
+		return json.loads(lines[-1])
+	except (OSError, ValueError):
+		return None
+
+def report(results, previous) -> None:
+	"""
+	Print the results, compared to the previous run.
+	:param results: The results of this run.
+	:param previous: The results of the previous run, or `None` if there is no
+	previous run.
+	"""
+	print("{name:<30} {articles:>8} {rate:>12} {throughput:>10} {peak:>10} {change:>10}".format(name="Benchmark", articles="Articles", rate="Articles/s", throughput="MB/s", peak="Peak MB", change="Change"))
+	for name, result in results["benchmarks"].items():
+		change = ""
+		if previous is not None and name in previous.get("benchmarks", {}) and previous["benchmarks"][name]["seconds"] > 0:
+			change = "{percentage:+.1f}%".format(percentage=(result["seconds"] / previous["benchmarks"][name]["seconds"] - 1) * 100)
+		print("{name:<30} {articles:>8} {rate:>12.1f} {throughput:>10.2f} {peak:>10.2f} {change:>10}".format(name=name, articles=result["articles"], rate=result["articles_per_second"], throughput=result["mb_per_second"], peak=result["peak_memory"] / 1024 / 1024, change=change))
+	if previous is not None:
+		print("Change in time compared to commit {commit}.".format(commit=previous.get("commit") or "unknown"))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Benchmark the article rendering pipeline of the Settings Guide.")
+	parser.add_argument("--mistune", required=True, help="The location of mistune.py, version 0.8.4.")
+	parser.add_argument("--results", default="benchmark_results.jsonl", help="The file to append the results to.")
+	parser.add_argument("--repeat", type=int, default=3, help="How many times to execute each benchmark. The fastest time is reported.")
+	arguments = parser.parse_args()
+
+	plugin_loader.import_plugin(arguments.mistune)
+	results = {
+		"commit": git_commit(),
+		"date": datetime.datetime.now().isoformat(),
+		"python": platform.python_version(),
+		"benchmarks": run_benchmarks(arguments.repeat)
+	}
+	report(results, previous_results(arguments.results))
+	with open(arguments.results, "a", encoding="utf-8") as f:
+		f.write(json.dumps(results, sort_keys=True) + "\n")
@@ -0,0 +1,139 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for showing and hiding conditional content in the articles.
+"""
+
+import importlib  # To import the module under test.
+import os  # To find the articles.
+import re  # For the reference implementation.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+mistune_file = plugin_loader.mistune_file()
+if mistune_file is not None:
+	plugin_loader.import_plugin(mistune_file)
+	ArticleManifest = importlib.import_module("SettingsGuide.ArticleManifest")
+	QtMarkdownRenderer = importlib.import_module("SettingsGuide.QtMarkdownRenderer").QtMarkdownRenderer
+
+def reference_preprocess_conditionals(markdown, variables):
+	"""
+	The original implementation of pre-processing conditional content, which
+	parses the Markdown every time. The compiled conditionals must give the
+	same result.
+
+	The only difference with the original is that variable names may contain
+	digits (`0-9` instead of `09`).
+	:param markdown: A piece of Markdown that needs to get pre-processed.
+	:param variables: A dictionary with the values of the variables.
+	:return: The Markdown with the conditional content that should be shown.
+	"""
+	condition_pattern = r"([A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?(\s+and\s+[A-Za-z0-9_]+\s*(<=|==|!=|>=|<|>)\s*[^-^:]+?)*)"
+	exposed_pattern = r"<!--if\s+" + condition_pattern + r"\s*-->(.*?)<!--endif-->"
+	hidden_pattern = r"<!--if\s+" + condition_pattern + r"\s*:(.*?)-->"
+
+	markdown = re.sub(exposed_pattern, r"<!--if \1:\5-->", markdown, flags=re.DOTALL)
+
+	result = ""
+	condition_met = False
+	for i, part in enumerate(re.split(hidden_pattern, markdown, flags=re.DOTALL)):
+		if i % 6 == 0:
+			result += part
+		elif i % 6 == 1:
+			condition_met = QtMarkdownRenderer.condition_met(part, variables)
+		elif i % 6 == 5:
+			if condition_met:
+				result += part
+	return result
+
+@unittest.skipIf(mistune_file is None, "Mistune is not available.")
+class TestConditionalContent(unittest.TestCase):
+	"""
+	Tests for showing and hiding conditional content in the articles.
+	"""
+
+	variable_sets = [
+		{"cura_version": cura_version, "language": language, "platform": platform}
+		for cura_version in ["4.0", "4.4", "4.8", "4.13", "5.0"]
+		for language in ["en_US", "nl_NL"]
+		for platform in ["windows", "linux"]
+	]
+
+	cases = {
+		"none": "No conditional content.",
+		"exposed": "Before <!--if cura_version >= 4.4-->new<!--endif--> after.",
+		"hidden": "Before <!--if cura_version < 4.4:old--> after.",
+		"and": "<!--if cura_version >= 4.4 and cura_version < 5.0 and platform == linux-->Only 4.x on Linux.<!--endif-->",
+		"multiline": "<!--if cura_version >= 4.1-->\nGyroid\n----\n![Gyroid](gyroid.png)\n\n* Sturdy.\n<!--endif-->\nAfter.",
+		"adjacent": "<!--if cura_version < 4.4-->old<!--endif--><!--if cura_version >= 4.4-->new<!--endif-->",
+		"else": "<!--if cura_version < 4.4-->old<!--else-->new<!--endif-->",  # There is no else syntax, so the else comment stays in the text.
+		"nested": "<!--if cura_version >= 4.0-->A<!--if platform == linux-->B<!--endif-->C<!--endif-->D",
+		"nested_hidden": "<!--if cura_version >= 4.0-->A<!--if platform == linux:B-->C<!--endif-->D",
+		"digit_in_variable": "<!--if version2 == 1-->Unknown variable.<!--endif-->Known.",
+		"unknown_variable": "<!--if printer == ultimaker-->Unknown variable.<!--endif-->Known.",
+		"language": "<!--if language == nl_NL-->Dutch<!--endif--><!--if language != nl_NL-->Not Dutch<!--endif-->",
+		"unclosed": "<!--if cura_version >= 4.4-->Never closed."
+	}
+
+	def test_cases(self):
+		"""
+		Tests that the compiled conditionals give the same result as the
+		original implementation for various kinds of conditional content.
+		"""
+		for name, markdown in self.cases.items():
+			for variables in self.variable_sets:
+				with self.subTest(case=name, variables=variables):
+					self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(markdown, variables), reference_preprocess_conditionals(markdown, variables))
+
+	def test_expected(self):
+		"""
+		Tests the result of a few cases directly, in case the reference
+		implementation were wrong as well.
+		"""
+		old = {"cura_version": "4.0", "language": "en_US", "platform": "linux"}
+		new = {"cura_version": "4.13", "language": "nl_NL", "platform": "windows"}
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["exposed"], old), "Before  after.")
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["exposed"], new), "Before new after.")
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["hidden"], old), "Before old after.")
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["adjacent"], new), "new")
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["language"], new), "Dutch")
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["digit_in_variable"], dict(new, version2="1")), "Unknown variable.Known.")  # Variable names may contain digits.
+		self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(self.cases["unknown_variable"], new), "Known.")
+
+	def test_support_pattern(self):
+		"""
+		Tests that the multi-line conditional section of the support pattern
+		article is shown or hidden as a whole, without leaving behind any of the
+		conditional syntax.
+		"""
+		with open(os.path.join(plugin_loader.resources_path, "articles", "support", "support_pattern.md"), encoding="utf-8") as f:
+			markdown = f.read()
+		for cura_version, shows_gyroid in [("4.0", False), ("4.1", True), ("4.13", True)]:
+			with self.subTest(cura_version=cura_version):
+				result = QtMarkdownRenderer.preprocess_conditionals(markdown, {"cura_version": cura_version, "language": "en_US", "platform": "linux"})
+				self.assertNotIn("<!--if", result)
+				self.assertNotIn("<!--endif-->", result)
+				self.assertEqual("Gyroid\n----" in result, shows_gyroid)
+
+	def test_all_articles(self):
+		"""
+		Tests that the compiled conditionals give the same result as the
+		original implementation for every article and translation.
+		"""
+		for article_id, languages in sorted(ArticleManifest.walk_articles(plugin_loader.resources_path).items()):
+			for language, markdown_file in sorted(languages.items()):
+				with open(markdown_file, encoding="utf-8") as f:
+					markdown = f.read()
+				if "<!--if" not in markdown:
+					continue
+				for variables in self.variable_sets:
+					variables = dict(variables, language=language)
+					with self.subTest(article_id=article_id, language=language, variables=variables):
+						self.assertEqual(QtMarkdownRenderer.preprocess_conditionals(markdown, variables), reference_preprocess_conditionals(markdown, variables))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,152 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for exporting the guide to static HTML pages.
+"""
+
+import importlib  # To import the module under test.
+import json  # To read the export manifest.
+import os  # To create the articles and check the exported files.
+import shutil  # To delete articles.
+import tempfile  # To create the articles and export them in.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+mistune_file = plugin_loader.mistune_file()
+if mistune_file is not None:
+	plugin_loader.import_plugin(mistune_file)
+	ArticleRenderer = importlib.import_module("SettingsGuide.ArticleRenderer")
+	HtmlExport = importlib.import_module("SettingsGuide.HtmlExport")
+
+@unittest.skipIf(mistune_file is None, "Mistune is not available.")
+class TestHtmlExport(unittest.TestCase):
+	"""
+	Tests for exporting the guide to static HTML pages.
+	"""
+
+	files = {
+		"articles/infill/infill_sparse_density.md": "Infill Density\n====\nSee [the pattern](infill_pattern.md).\n\n![Dense](../../images/dense.png)\n".encode("utf-8"),
+		"articles/infill/infill_pattern.md": "Infill Pattern\n====\nSee [Wikipedia](https://en.wikipedia.org/wiki/Infill.md).\n\n![Grid](../../images/grid.png)\n".encode("utf-8"),
+		"translations/nl_NL/infill/infill_pattern.md": "Vulpatroon\n====\nDe vorm.\n\n![Raster](../../../images/grid.png)\n".encode("utf-8"),
+		"images/dense.png": b"dense image",
+		"images/grid.png": b"grid image"
+	}
+
+	def setUp(self):
+		"""
+		Creates a small resources folder with articles and images.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.resources_path = os.path.join(self.folder.name, "resources")
+		for path, contents in self.files.items():
+			full_path = os.path.join(self.resources_path, *path.split("/"))
+			os.makedirs(os.path.dirname(full_path), exist_ok=True)
+			with open(full_path, "wb") as f:
+				f.write(contents)
+		self.output_path = os.path.join(self.folder.name, "output")
+		self.settings = ArticleRenderer.RenderSettings(link_colour="#196ef0", image_width=300, cura_version="4.13.0", platform="linux")
+
+	def tearDown(self):
+		"""
+		Removes the resources and the export.
+		"""
+		self.folder.cleanup()
+
+	def export(self):
+		"""
+		Export the resources folder and read the resulting manifest.
+		:return: The article entries in the export manifest.
+		"""
+		HtmlExport.export(self.resources_path, self.output_path, self.settings, max_workers=1)
+		with open(os.path.join(self.output_path, "export_manifest.json"), encoding="utf-8") as f:
+			return json.load(f)["articles"]
+
+	def output_exists(self, *path: str) -> bool:
+		"""
+		Check whether a file was exported.
+		:param path: The path of the file relative to the output folder.
+		:return: Whether the file exists.
+		"""
+		return os.path.exists(os.path.join(self.output_path, *path))
+
+	def test_export(self):
+		"""
+		Tests that every article is exported in every language, with links and
+		images rewritten to the exported files.
+		"""
+		articles = self.export()
+		self.assertEqual(set(articles), {"infill_sparse_density/en_US", "infill_pattern/en_US", "infill_sparse_density/nl_NL", "infill_pattern/nl_NL"})
+		self.assertEqual(articles["infill_pattern/nl_NL"]["title"], "Vulpatroon")
+		self.assertEqual(articles["infill_sparse_density/nl_NL"]["title"], "Infill Density")  # Not translated, so in English.
+		with open(os.path.join(self.output_path, "en_US", "infill_sparse_density.html"), encoding="utf-8") as f:
+			page = f.read()
+		self.assertIn("<a href=\"infill_pattern.html\"", page)
+		self.assertIn("<img src=\"../images/images/dense.png\"", page)
+		with open(os.path.join(self.output_path, "en_US", "infill_pattern.html"), encoding="utf-8") as f:
+			self.assertIn("<a href=\"https://en.wikipedia.org/wiki/Infill.md\"", f.read())  # Links to the internet are kept.
+		with open(os.path.join(self.output_path, "images", "images", "grid.png"), "rb") as f:
+			self.assertEqual(f.read(), b"grid image")
+
+	def test_unchanged(self):
+		"""
+		Tests that articles that didn't change are not exported again.
+		"""
+		self.export()
+		page_file = os.path.join(self.output_path, "en_US", "infill_pattern.html")
+		with open(page_file, "w", encoding="utf-8") as f:
+			f.write("Not overwritten.")
+		self.export()
+		with open(page_file, encoding="utf-8") as f:
+			self.assertEqual(f.read(), "Not overwritten.")
+
+		self.settings = self.settings._replace(image_width=150)
+		self.export()
+		with open(page_file, encoding="utf-8") as f:
+			self.assertIn("width=\"150\"", f.read())  # Different settings, so exported again.
+
+	def test_deleted_article(self):
+		"""
+		Tests that the pages and images of deleted articles are removed.
+		"""
+		self.export()
+		os.remove(os.path.join(self.resources_path, "articles", "infill", "infill_sparse_density.md"))
+		articles = self.export()
+		self.assertEqual(set(articles), {"infill_pattern/en_US", "infill_pattern/nl_NL"})
+		self.assertFalse(self.output_exists("en_US", "infill_sparse_density.html"))
+		self.assertFalse(self.output_exists("nl_NL", "infill_sparse_density.html"))
+		self.assertFalse(self.output_exists("images", "images", "dense.png"))  # No longer used by any article.
+		self.assertTrue(self.output_exists("images", "images", "grid.png"))
+		with open(os.path.join(self.output_path, "en_US", "index.html"), encoding="utf-8") as f:
+			self.assertNotIn("infill_sparse_density", f.read())
+
+	def test_deleted_language(self):
+		"""
+		Tests that the pages of a language that is no longer translated are
+		removed.
+		"""
+		self.export()
+		shutil.rmtree(os.path.join(self.resources_path, "translations", "nl_NL"))
+		articles = self.export()
+		self.assertEqual(set(articles), {"infill_sparse_density/en_US", "infill_pattern/en_US"})
+		self.assertFalse(self.output_exists("nl_NL"))
+		self.assertTrue(self.output_exists("en_US", "infill_pattern.html"))
+
+	def test_corrupt_manifest(self):
+		"""
+		Tests that a corrupt export manifest causes everything to be exported
+		again.
+		"""
+		for document in ["{", "[]", "{\"version\": 1, \"articles\": {\"infill_pattern/en_US\": \"not a dict\"}}"]:
+			with self.subTest(document=document):
+				os.makedirs(self.output_path, exist_ok=True)
+				with open(os.path.join(self.output_path, "export_manifest.json"), "w", encoding="utf-8") as f:
+					f.write(document)
+				self.assertEqual(HtmlExport.read_export_manifest(os.path.join(self.output_path, "export_manifest.json")), (None, {}))
+				self.assertEqual(len(self.export()), 4)
+
+if __name__ == "__main__":
+	unittest.main()
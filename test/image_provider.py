@@ -0,0 +1,90 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for providing the images of the articles to QML.
+"""
+
+import importlib  # To import the module under test.
+import os  # To create the images.
+import tempfile  # To store the images and thumbnails.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+try:
+	from PyQt5.QtCore import QSize  # To request images.
+	from PyQt5.QtGui import QImage  # To create the images.
+	qt_available = True
+except ImportError:  # PyQt isn't installed.
+	qt_available = False
+if qt_available:
+	plugin_loader.import_plugin()
+	ImageProvider = importlib.import_module("SettingsGuide.ImageProvider")
+	ThumbnailCache = importlib.import_module("SettingsGuide.ThumbnailCache")
+
+@unittest.skipIf(not qt_available, "PyQt5 is not available.")
+class TestImageProvider(unittest.TestCase):
+	"""
+	Tests for providing the images of the articles to QML.
+	"""
+
+	def setUp(self):
+		"""
+		Creates an image and a provider to request it from.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.image_file = os.path.join(self.folder.name, "an image #1.png")  # With characters that need to be quoted in a URL.
+		image = QImage(800, 400, QImage.Format_RGB32)
+		image.fill(0x196ef0)
+		self.assertTrue(image.save(self.image_file, "PNG"))
+		self.provider = ImageProvider.ImageProvider(ThumbnailCache.ThumbnailCache(os.path.join(self.folder.name, "thumbnails")), budget=10000000)
+
+	def tearDown(self):
+		"""
+		Removes the image and the thumbnails.
+		"""
+		self.folder.cleanup()
+
+	def request(self, url: str) -> "QImage":
+		"""
+		Request an image from the provider, as QML would.
+		:param url: The URL of the image.
+		:return: The image that the provider gives.
+		"""
+		prefix = "image://{provider_id}/".format(provider_id=ImageProvider.provider_id)
+		self.assertTrue(url.startswith(prefix))
+		image, size = self.provider.requestImage(url[len(prefix):], QSize())
+		if not image.isNull():
+			self.assertEqual(image.size(), size)
+		return image
+
+	def test_original_size(self):
+		"""
+		Tests requesting an image at its original size.
+		"""
+		image = self.request(ImageProvider.image_url(self.image_file))
+		self.assertEqual((image.width(), image.height()), (800, 400))
+
+	def test_thumbnail(self):
+		"""
+		Tests requesting an image at the size at which it is displayed, also if
+		that size is not a whole number of pixels.
+		"""
+		for width, height, expected_width, expected_height in [(200, 0, 200, 100), (0, 100, 200, 100), (166.666, 0, 167, 83)]:
+			with self.subTest(width=width, height=height):
+				image = self.request(ImageProvider.image_url(self.image_file, width, height))
+				self.assertFalse(image.isNull())
+				self.assertEqual((image.width(), image.height()), (expected_width, expected_height))
+
+	def test_missing(self):
+		"""
+		Tests that an empty image is given if the image or the URL is invalid.
+		"""
+		self.assertTrue(self.request(ImageProvider.image_url(os.path.join(self.folder.name, "missing.png"), 200, 0)).isNull())
+		self.assertTrue(self.provider.requestImage("not a size/" + self.image_file, QSize())[0].isNull())
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,89 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for the graph of links between articles.
+"""
+
+import importlib  # To import the module under test.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+LinkGraph = importlib.import_module("SettingsGuide.LinkGraph")
+
+class TestLinkGraph(unittest.TestCase):
+	"""
+	Tests for the graph of links between articles.
+	"""
+
+	sources = {
+		"infill_sparse_density": "See also [the pattern](infill_pattern.md) and [walls](../shell/wall_thickness.md \"Wall thickness\").",
+		"infill_pattern": "Depends on [density](infill_sparse_density.md). ![Image](../images/infill_pattern.md) [Itself](infill_pattern.md)",
+		"wall_thickness": "Read [the manual](https://example.com/manual.md) or [an old article](removed_article.md).",
+		"unreadable": None
+	}
+
+	def setUp(self):
+		"""
+		Builds a graph of a few articles.
+		"""
+		self.graph = LinkGraph.LinkGraph.build(self.sources.keys(), self.sources.get)
+
+	def test_article_id_from_link(self):
+		"""
+		Tests getting the article ID from various kinds of links.
+		"""
+		self.assertEqual(LinkGraph.article_id_from_link("infill_pattern.md"), "infill_pattern")
+		self.assertEqual(LinkGraph.article_id_from_link("../shell/wall_thickness.md"), "wall_thickness")
+		self.assertEqual(LinkGraph.article_id_from_link("..\\shell\\wall_thickness.md"), "wall_thickness")
+		self.assertEqual(LinkGraph.article_id_from_link("file:///resources/articles/shell/wall_thickness.md"), "wall_thickness")
+		self.assertIsNone(LinkGraph.article_id_from_link("https://example.com/manual.md"))
+		self.assertIsNone(LinkGraph.article_id_from_link("../images/infill_pattern.png"))
+
+	def test_extract_links(self):
+		"""
+		Tests finding links in Markdown, ignoring images.
+		"""
+		self.assertEqual(LinkGraph.extract_links(self.sources["infill_sparse_density"]), {"infill_pattern", "wall_thickness"})
+		self.assertEqual(LinkGraph.extract_links(self.sources["infill_pattern"]), {"infill_sparse_density", "infill_pattern"})
+		self.assertEqual(LinkGraph.extract_links("No links here."), set())
+
+	def test_build(self):
+		"""
+		Tests building the graph, leaving out links to unknown articles and to
+		the article itself.
+		"""
+		self.assertEqual(self.graph.links("infill_sparse_density"), ["infill_pattern", "wall_thickness"])
+		self.assertEqual(self.graph.links("infill_pattern"), ["infill_sparse_density"])
+		self.assertEqual(self.graph.links("wall_thickness"), [])
+		self.assertEqual(self.graph.links("unreadable"), [])
+		self.assertEqual(self.graph.links("nonexistent"), [])
+
+	def test_backlinks(self):
+		"""
+		Tests finding the articles that link to an article.
+		"""
+		self.assertEqual(self.graph.backlinks("infill_pattern"), ["infill_sparse_density"])
+		self.assertEqual(self.graph.backlinks("wall_thickness"), ["infill_sparse_density"])
+		self.assertEqual(self.graph.backlinks("infill_sparse_density"), ["infill_pattern"])
+		self.assertEqual(self.graph.backlinks("removed_article"), [])
+
+	def test_update(self):
+		"""
+		Tests that changing the links of an article updates the backlinks too.
+		"""
+		self.graph.update("infill_sparse_density", {"wall_thickness"})
+		self.assertEqual(self.graph.links("infill_sparse_density"), ["wall_thickness"])
+		self.assertEqual(self.graph.backlinks("infill_pattern"), [])
+		self.assertEqual(self.graph.backlinks("wall_thickness"), ["infill_sparse_density"])
+		self.graph.update("wall_thickness", {"infill_pattern"})
+		self.assertEqual(self.graph.backlinks("infill_pattern"), ["wall_thickness"])
+		self.graph.update("wall_thickness", set())
+		self.assertEqual(self.graph.backlinks("infill_pattern"), [])
+
+if __name__ == "__main__":
+	unittest.main()
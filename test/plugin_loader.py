@@ -0,0 +1,82 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Makes the plug-in's modules importable for the tests and benchmarks, without running Cura.
+
+The plug-in is registered as the package `SettingsGuide`. The package is written to a temporary folder that is added to
+the Python path, so that it can also be imported by worker processes. If Uranium is not installed, the stand-ins for
+Uranium in the `stand_ins` folder are used instead.
+
+Mistune is not part of the source tree. Its location is taken from the environment variable `SETTINGSGUIDE_MISTUNE`,
+which CMake sets for the tests. If that isn't set, Mistune is expected in the Mistune folder of the plug-in.
+"""
+
+import atexit  # To clean up the package when the tests are done.
+import importlib  # To import the plug-in's modules.
+import os  # To find the plug-in and Mistune.
+import shutil  # To clean up the package when the tests are done.
+import sys  # To add the package to the Python path.
+import tempfile  # To create the package in.
+import types  # Type hint for the package.
+from typing import Optional
+
+plugin_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+resources_path = os.path.join(plugin_path, "resources")
+stand_ins_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stand_ins")
+
+package_template = """
+# Generated by the tests. The modules are loaded from the source tree and from the location of Mistune.
+__path__ = {path!r}
+"""
+
+def mistune_file() -> Optional[str]:
+	"""
+	Find the location of mistune.py.
+	:return: The path to mistune.py, or `None` if it can't be found.
+	"""
+	candidates = [os.environ.get("SETTINGSGUIDE_MISTUNE", ""), os.path.join(plugin_path, "Mistune", "mistune.py")]
+	for candidate in candidates:
+		if candidate and os.path.isfile(candidate):
+			return os.path.abspath(candidate)
+	return None
+
+def install_uranium_stand_ins() -> None:
+	"""
+	If Uranium is not installed, put the stand-ins for Uranium on the Python
+	path.
+	"""
+	try:
+		import UM.Logger
+		import UM.Version
+		return  # Uranium is available. Use the real thing.
+	except ImportError:
+		pass
+	sys.path.append(stand_ins_path)
+
+def import_plugin(mistune: Optional[str] = None) -> types.ModuleType:
+	"""
+	Register the plug-in as a package, without executing its registration
+	code, so that its modules can be imported.
+	:param mistune: The location of mistune.py. If not provided, the modules
+	that render Markdown can't be imported.
+	:return: The package of the plug-in.
+	"""
+	if "SettingsGuide" in sys.modules:
+		return sys.modules["SettingsGuide"]
+	install_uranium_stand_ins()
+	package_parent = tempfile.mkdtemp()
+	atexit.register(shutil.rmtree, package_parent, ignore_errors=True)
+	package_folder = os.path.join(package_parent, "SettingsGuide")
+	os.makedirs(package_folder)
+	path = [plugin_path]
+	if mistune is not None:
+		os.makedirs(os.path.join(package_folder, "Mistune"))
+		shutil.copy(mistune, os.path.join(package_folder, "Mistune", "mistune.py"))
+		path.append(package_folder)  # The Mistune folder is found in the second location.
+	with open(os.path.join(package_folder, "__init__.py"), "w", encoding="utf-8") as f:
+		f.write(package_template.format(path=path))
+	sys.path.insert(0, package_parent)
+	return importlib.import_module("SettingsGuide")
@@ -0,0 +1,299 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for planning which screenshots to take, and in which order.
+"""
+
+import importlib  # To import the module under test.
+import json  # To write screenshot instructions in the articles.
+import os  # To create the articles.
+import tempfile  # To create the articles in.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+ScreenshotPlanner = importlib.import_module("SettingsGuide.ScreenshotPlanner")
+
+def instruction(image_path: str, script: str = "cube.scad", **fields):
+	"""
+	Create a normalised screenshot instruction.
+	:param image_path: The image that the screenshot is stored in.
+	:param script: The script of the only model in the scene.
+	:param fields: Any other fields of the instruction.
+	:return: The normalised instruction.
+	"""
+	return ScreenshotPlanner.normalise(dict({"image_path": image_path, "models": [{"script": script}], "camera_position": [0, 0, 100]}, **fields))
+
+class TestPlan(unittest.TestCase):
+	"""
+	Tests for grouping and ordering the screenshots.
+	"""
+
+	def test_shared_slice(self):
+		"""
+		Tests that two screenshots of the same print, in different colour
+		schemes and at different layers, are taken from one slice.
+		"""
+		line_type = instruction("support_pattern_line_type.png", settings={"support_enable": True, "support_pattern": "zigzag"}, layer=20)
+		speed = instruction("support_pattern_speed.png", settings={"support_pattern": "zigzag", "support_enable": True}, layer=[10, 20], colour_scheme="speed", camera_position=[50, 0, 100])
+		setups = ScreenshotPlanner.plan([line_type, speed])
+		self.assertEqual(len(setups), 1)
+		self.assertTrue(setups[0].reload_models)
+		self.assertTrue(setups[0].slice)
+		self.assertEqual([screenshot["image_path"] for screenshot in setups[0].screenshots], ["support_pattern_line_type.png", "support_pattern_speed.png"])
+		self.assertEqual(ScreenshotPlanner.estimate(setups)["slices"], 1)
+
+	def test_baseline_settings(self):
+		"""
+		Tests that settings that are equal to the baseline of the screenshot
+		tool, or that only differ in how a number is written, don't need
+		another slice.
+		"""
+		plain = instruction("wall_line_count.png", settings={"wall_line_count": 2})
+		explicit = instruction("wall_line_count_seam.png", settings={"wall_line_count": 2.0, "z_seam_type": "back", "layer_height": 0.06})
+		different = instruction("wall_line_count_shortest.png", settings={"wall_line_count": 2, "z_seam_type": "shortest"})
+		self.assertEqual(ScreenshotPlanner.slice_key(plain), ScreenshotPlanner.slice_key(explicit))
+		self.assertNotEqual(ScreenshotPlanner.slice_key(plain), ScreenshotPlanner.slice_key(different))
+		self.assertEqual(ScreenshotPlanner.estimate(ScreenshotPlanner.plan([plain, explicit, different]))["slices"], 2)
+
+	def test_effective_settings(self):
+		"""
+		Tests leaving out the settings that are equal to the baseline.
+		"""
+		self.assertEqual(ScreenshotPlanner.effective_settings({"adhesion_type": "none", "layer_height": 0.1, "infill_angles": [0, 90], "support_enable": True}), {"layer_height": 0.1, "infill_angles": [0.0, 90.0], "support_enable": True})
+		self.assertEqual(ScreenshotPlanner.effective_settings({}), {})
+
+	def test_models_loaded_once(self):
+		"""
+		Tests that setups with the same models are consecutive, so that the
+		models only need to be loaded once.
+		"""
+		instructions = [
+			instruction("cube_a.png", settings={"infill_sparse_density": 10}),
+			instruction("cylinder.png", script="cylinder.scad"),
+			instruction("cube_b.png", settings={"infill_sparse_density": 20})
+		]
+		setups = ScreenshotPlanner.plan(instructions)
+		self.assertEqual(len(setups), 3)
+		self.assertEqual([setup.models[0]["script"] for setup in setups], ["cube.scad", "cube.scad", "cylinder.scad"])
+		self.assertEqual([setup.reload_models for setup in setups], [True, False, True])
+		self.assertEqual(ScreenshotPlanner.estimate(setups)["model_loads"], 2)
+
+	def test_fewest_setting_changes(self):
+		"""
+		Tests that the settings are changed as little as possible between
+		setups with the same models.
+		"""
+		instructions = [
+			instruction("both.png", settings={"support_enable": True, "support_pattern": "lines"}),
+			instruction("none.png"),
+			instruction("support.png", settings={"support_enable": True})
+		]
+		setups = ScreenshotPlanner.plan(instructions)
+		self.assertEqual([setup.screenshots[0]["image_path"] for setup in setups], ["none.png", "support.png", "both.png"])
+
+	def test_solid_view(self):
+		"""
+		Tests that solid view screenshots are taken before slicing, and that
+		a setup with only solid view screenshots isn't sliced.
+		"""
+		layer_view = instruction("layer_view.png", settings={"support_enable": True})
+		solid_view = instruction("solid_view.png", settings={"support_enable": True}, layer=-1)
+		solid_only = instruction("solid_only.png", layer=-1)
+		setups = ScreenshotPlanner.plan([layer_view, solid_view, solid_only])
+		self.assertEqual(len(setups), 2)
+		self.assertFalse(setups[0].slice)
+		self.assertEqual([screenshot["image_path"] for screenshot in setups[1].screenshots], ["solid_view.png", "layer_view.png"])
+		self.assertTrue(setups[1].slice)
+
+	def test_frames(self):
+		"""
+		Tests getting the layers of the frames of an animation.
+		"""
+		self.assertEqual(ScreenshotPlanner.frames(instruction("still.png", layer=5)), [5])
+		self.assertEqual(ScreenshotPlanner.frames(instruction("layers.gif", layer=[1, 2, 3])), [1, 2, 3])
+		self.assertEqual(ScreenshotPlanner.frames(instruction("lines.gif", layer=4, line=[10, 20])), [4, 4])
+
+class TestValidate(unittest.TestCase):
+	"""
+	Tests for checking whether screenshot instructions are valid.
+	"""
+
+	def setUp(self):
+		"""
+		Creates a folder with a model script.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.models_path = self.folder.name
+		with open(os.path.join(self.models_path, "cube.scad"), "w", encoding="utf-8") as f:
+			f.write("cube(10);")
+		self.valid = {"image_path": "cube.png", "models": [{"script": "cube.scad"}], "camera_position": [0, 0, 100]}
+
+	def tearDown(self):
+		"""
+		Removes the model script.
+		"""
+		self.folder.cleanup()
+
+	def test_valid(self):
+		"""
+		Tests instructions without problems.
+		"""
+		self.assertEqual(ScreenshotPlanner.validate(self.valid, self.models_path), [])
+		complete = dict(self.valid, camera_lookat=[0, 0, 0], minimum_layer=[0, 1], layer=[5, 6], line=-1, colour_scheme="speed", structures=["travels"], settings={"support_enable": True}, colours=16, delay=250)
+		complete["models"] = [{"script": "cube.scad", "scad_params": ["size=5"], "transformation": ["rotatex(90)", "mirrorz()"], "object_settings": {"infill_mesh": True}}]
+		self.assertEqual(ScreenshotPlanner.validate(complete, self.models_path), [])
+
+	def test_invalid(self):
+		"""
+		Tests that each kind of mistake in an instruction is reported.
+		"""
+		cases = {
+			"not_object": [],
+			"unknown_field": dict(self.valid, camera_zoom=2),
+			"missing_camera": {"image_path": "cube.png", "models": [{"script": "cube.scad"}]},
+			"outside_images": dict(self.valid, image_path="../cube.png"),
+			"camera_not_point": dict(self.valid, camera_position=[0, 100]),
+			"layer_not_int": dict(self.valid, layer=[1.5]),
+			"empty_frames": dict(self.valid, layer=[]),
+			"colour_scheme": dict(self.valid, colour_scheme="rainbow"),
+			"structures": dict(self.valid, structures=["supports"]),
+			"settings": dict(self.valid, settings=["support_enable"]),
+			"colours": dict(self.valid, colours=300),
+			"colours_bool": dict(self.valid, colours=True),
+			"delay": dict(self.valid, delay=0),
+			"no_models": dict(self.valid, models=[]),
+			"model_not_object": dict(self.valid, models=["cube.scad"]),
+			"script_type": dict(self.valid, models=[{"script": "cube.stl"}]),
+			"script_missing": dict(self.valid, models=[{"script": "sphere.scad"}]),
+			"scad_params": dict(self.valid, models=[{"script": "cube.scad", "scad_params": ["size"]}]),
+			"transformation": dict(self.valid, models=[{"script": "cube.scad", "transformation": ["skew(5)"]}]),
+			"object_settings": dict(self.valid, models=[{"script": "cube.scad", "object_settings": []}]),
+			"unknown_model_field": dict(self.valid, models=[{"script": "cube.scad", "colour": "red"}])
+		}
+		for name, document in cases.items():
+			with self.subTest(case=name):
+				self.assertEqual(len(ScreenshotPlanner.validate(document, self.models_path)), 1)
+
+class TestFindInstructions(unittest.TestCase):
+	"""
+	Tests for finding the screenshot instructions in the articles.
+	"""
+
+	def setUp(self):
+		"""
+		Creates an empty resources folder with a model script.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.resources_path = self.folder.name
+		os.makedirs(os.path.join(self.resources_path, "models"))
+		with open(os.path.join(self.resources_path, "models", "cube.scad"), "w", encoding="utf-8") as f:
+			f.write("cube(10);")
+
+	def tearDown(self):
+		"""
+		Removes the resources folder.
+		"""
+		self.folder.cleanup()
+
+	def write_article(self, path: str, *instructions) -> None:
+		"""
+		Write an article with screenshot instructions.
+		:param path: The path of the article, relative to the resources folder.
+		:param instructions: The instructions in the article. Dictionaries are
+		serialised to JSON, strings are inserted as they are.
+		"""
+		full_path = os.path.join(self.resources_path, *path.split("/"))
+		os.makedirs(os.path.dirname(full_path), exist_ok=True)
+		with open(full_path, "w", encoding="utf-8") as f:
+			f.write("Title\n====\n")
+			for document in instructions:
+				serialised = document if isinstance(document, str) else json.dumps(document, indent=1)
+				f.write("<!--screenshot " + serialised + "-->\n![Image](../images/image.png)\n")
+
+	def document(self, image_path: str, **fields):
+		"""
+		Create a valid screenshot instruction.
+		:param image_path: The image that the screenshot is stored in.
+		:param fields: Any other fields of the instruction.
+		:return: The instruction as it would be written in an article.
+		"""
+		return dict({"image_path": image_path, "models": [{"script": "cube.scad"}], "camera_position": [0, 0, 100]}, **fields)
+
+	def test_find(self):
+		"""
+		Tests finding the instructions in all English articles, normalised and
+		sorted by image.
+		"""
+		self.write_article("articles/shell/wall_thickness.md", self.document("wall_thickness.png", settings={"wall_line_count": 3}))
+		self.write_article("articles/infill/infill_pattern.md", self.document("infill_pattern_lines.png"), self.document("infill_pattern_grid.png", layer=[1, 2]))
+		self.write_article("articles/infill/notes.txt", self.document("not_an_article.png"))
+		instructions, errors, warnings = ScreenshotPlanner.find_instructions(self.resources_path)
+		self.assertEqual(errors, [])
+		self.assertEqual(warnings, [])
+		self.assertEqual([document["image_path"] for document in instructions], ["infill_pattern_grid.png", "infill_pattern_lines.png", "wall_thickness.png"])
+		self.assertEqual(instructions[2], ScreenshotPlanner.normalise(self.document("wall_thickness.png", settings={"wall_line_count": 3})))
+		self.assertEqual(instructions[0]["models"][0]["transformation"], [])  # Defaults are filled in.
+
+	def test_translations_ignored(self):
+		"""
+		Tests that translated articles are not searched, since they use the
+		same images as the English articles.
+		"""
+		self.write_article("translations/nl_NL/shell/wall_thickness.md", self.document("wall_thickness.png"))
+		self.assertEqual(ScreenshotPlanner.find_instructions(self.resources_path), ([], [], []))
+
+	def test_duplicate(self):
+		"""
+		Tests that the same image in multiple articles is only taken once,
+		without warnings if the instructions are equivalent.
+		"""
+		self.write_article("articles/top_bottom/top_thickness.md", self.document("top_bottom.png", layer=99999))  # Same as the default.
+		self.write_article("articles/top_bottom/bottom_thickness.md", self.document("top_bottom.png"))
+		instructions, errors, warnings = ScreenshotPlanner.find_instructions(self.resources_path)
+		self.assertEqual(len(instructions), 1)
+		self.assertEqual(errors, [])
+		self.assertEqual(warnings, [])
+
+	def test_conflict(self):
+		"""
+		Tests that different instructions for the same image give a warning,
+		and that the one from the first article in alphabetical order is used.
+		"""
+		self.write_article("articles/top_bottom/top_thickness.md", self.document("top_bottom.png", settings={"top_thickness": 3}))
+		self.write_article("articles/top_bottom/bottom_thickness.md", self.document("top_bottom.png", settings={"bottom_thickness": 3}))
+		self.write_article("articles/infill/infill_pattern.md", self.document("top_bottom.png", settings={"bottom_thickness": 3}))
+		instructions, errors, warnings = ScreenshotPlanner.find_instructions(self.resources_path)
+		self.assertEqual(errors, [])
+		self.assertEqual(len(instructions), 1)
+		self.assertEqual(instructions[0]["settings"], {"bottom_thickness": 3})  # The infill folder comes first.
+		self.assertEqual(len(warnings), 1)
+		self.assertIn(os.path.join("articles", "top_bottom", "top_thickness.md"), warnings[0])
+		self.assertIn("top_bottom.png", warnings[0])
+
+	def test_errors(self):
+		"""
+		Tests that invalid instructions are reported and left out, without
+		affecting the other instructions in the same article.
+		"""
+		self.write_article("articles/shell/wall_thickness.md",
+			"{\"image_path\": \"broken.png\",}",  # Invalid JSON.
+			self.document("unknown_scheme.png", colour_scheme="rainbow"),
+			self.document("valid.png"),
+			{"image_path": "no_models.png", "camera_position": [0, 0, 100]})
+		instructions, errors, warnings = ScreenshotPlanner.find_instructions(self.resources_path)
+		self.assertEqual([document["image_path"] for document in instructions], ["valid.png"])
+		self.assertEqual(len(errors), 3)
+		location = os.path.join("articles", "shell", "wall_thickness.md")
+		self.assertTrue(all(error.startswith(location + ": ") for error in errors))
+		self.assertIn("Invalid JSON", errors[0])
+		self.assertIn("unknown_scheme.png", errors[1])
+		self.assertIn("no_models.png", errors[2])
+		self.assertEqual(warnings, [])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,201 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for searching through the articles.
+"""
+
+import importlib  # To import the module under test.
+import json  # To modify the stored index.
+import os  # To store the index.
+import tempfile  # To store the index.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+plugin_loader.import_plugin()
+SearchIndex = importlib.import_module("SettingsGuide.SearchIndex")
+
+class TestSearchIndex(unittest.TestCase):
+	"""
+	Tests for searching through the articles.
+	"""
+
+	articles = {
+		"infill_sparse_density": "<h1>Infill Density</h1><p>The amount of infill inside the print. More infill makes the print stronger.</p>",
+		"infill_pattern": "<h1>Infill Pattern</h1><p>The shape of the infill. Some patterns are stronger in one direction.</p><!--screenshot {\"image_path\": \"hidden.png\"}-->",
+		"wall_thickness": "<h1>Wall Thickness</h1><p>The thickness of the walls &amp; the outer shell. Thicker walls make the print stronger.</p>",
+		"support_enable": "<h1>Generate Support</h1><p>Prints support structures below overhangs.</p>"
+	}
+
+	def setUp(self):
+		"""
+		Creates an index with a few English articles and one translation.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.index_file = os.path.join(self.folder.name, "search", "index.json")
+		self.index = SearchIndex.SearchIndex(self.index_file)
+		for article_id, rich_text in self.articles.items():
+			self.index.add(article_id, "en_US", rich_text)
+		self.index.add("infill_pattern", "nl_NL", "<h1>Vulpatroon</h1><p>De vorm van de vulling.</p>")
+
+	def tearDown(self):
+		"""
+		Removes the stored index.
+		"""
+		self.folder.cleanup()
+
+	def result_ids(self, query: str, language: str = "en_US"):
+		"""
+		Search and only get the IDs of the resulting articles.
+		:param query: The text to search for.
+		:param language: The language to search in.
+		:return: The article IDs of the results, best match first.
+		"""
+		return [article_id for article_id, _, _ in self.index.search(query, language)]
+
+	def test_plain_text(self):
+		"""
+		Tests converting rich text to plain text.
+		"""
+		self.assertEqual(SearchIndex.plain_text("<h1>Title</h1>\n<p>Some  <b>bold</b> &amp; <!--hidden <b>--> text.</p>"), "Title Some bold & text.")
+
+	def test_terms(self):
+		"""
+		Tests splitting text into lower case terms.
+		"""
+		self.assertEqual(SearchIndex.terms("Infill, Wall-Thickness & 0.4 mm"), ["infill", "wall", "thickness", "0", "4", "mm"])
+		self.assertEqual(SearchIndex.terms("Толщина Стенки"), ["толщина", "стенки"])
+
+	def test_all_terms_required(self):
+		"""
+		Tests that only articles that contain all words of the query are found.
+		"""
+		self.assertEqual(set(self.result_ids("print stronger ")), {"infill_sparse_density", "wall_thickness"})
+		self.assertEqual(self.result_ids("infill walls "), [])
+		self.assertEqual(self.result_ids("nonexistent "), [])
+		self.assertEqual(self.result_ids(" "), [])
+
+	def test_prefix(self):
+		"""
+		Tests that the last word matches longer words while still typing it.
+		"""
+		self.assertEqual(set(self.result_ids("inf")), {"infill_sparse_density", "infill_pattern"})
+		self.assertEqual(set(self.result_ids("thick")), {"wall_thickness"})
+		self.assertEqual(self.result_ids("thick "), [])  # Finished typing, so no longer a prefix.
+		self.assertEqual(set(self.result_ids("print str")), {"infill_sparse_density", "wall_thickness"})
+		self.assertEqual(self.result_ids("pri stronger"), [])  # Only the last word is a prefix.
+
+	def test_ranking(self):
+		"""
+		Tests that articles are ranked by how often and where the words appear.
+		"""
+		self.assertEqual(self.result_ids("infill ")[0], "infill_sparse_density")  # Appears three times there, twice in the pattern article.
+		self.assertEqual(self.result_ids("stronger pattern ")[0], "infill_pattern")
+		self.assertEqual(self.result_ids("shape")[0], "infill_pattern")
+		self.index.add("z_article", "en_US", "<h1>Other</h1><p>Mentions the shell once.</p>")
+		self.assertEqual(self.result_ids("shell "), ["wall_thickness", "z_article"])  # Same count, so sorted by ID.
+		self.index.add("z_article", "en_US", "<h1>Shell</h1><p>Mentions the shell once.</p>")
+		self.assertEqual(self.result_ids("shell "), ["z_article", "wall_thickness"])  # Titles count more.
+
+	def test_limit(self):
+		"""
+		Tests limiting the number of results.
+		"""
+		self.assertEqual(len(self.index.search("the ", "en_US", limit=2)), 2)
+
+	def test_fallback_language(self):
+		"""
+		Tests that untranslated articles are found in English, and translated
+		articles only in their translation.
+		"""
+		self.assertEqual(self.result_ids("vulling ", "nl_NL"), ["infill_pattern"])
+		self.assertEqual(set(self.result_ids("infill ", "nl_NL")), {"infill_sparse_density"})  # The pattern article is translated, so its English text is not searched.
+		self.assertEqual(self.index.search("vorm", "nl_NL")[0][1], "Vulpatroon")
+
+	def test_snippet(self):
+		"""
+		Tests the snippets of text shown with the results.
+		"""
+		results = self.index.search("overhangs ", "en_US")
+		self.assertEqual(results, [("support_enable", "Generate Support", "Prints support structures below overhangs.")])  # Without the title.
+		self.index.add("long", "en_US", "<h1>Long</h1><p>" + "filler " * 50 + "needle " + "filler " * 50 + "</p>")
+		snippet = self.index.search("needle ", "en_US")[0][2]
+		self.assertIn("needle", snippet)
+		self.assertTrue(snippet.startswith("…"))
+		self.assertTrue(snippet.endswith("…"))
+		self.assertLessEqual(len(snippet), SearchIndex.SearchIndex.snippet_length + 2)
+		self.assertNotIn("hidden.png", self.index.search("shape", "en_US")[0][2])  # Comments are not part of the text.
+
+	def test_remove(self):
+		"""
+		Tests removing articles from the index.
+		"""
+		self.index.remove("wall_thickness", "en_US")
+		self.assertEqual(self.result_ids("walls "), [])
+		self.assertEqual(self.result_ids("thick"), [])  # Also not found as prefix.
+		self.assertEqual(set(self.result_ids("stronger ")), {"infill_sparse_density", "infill_pattern"})
+		self.index.remove("wall_thickness", "en_US")  # Removing twice does nothing.
+		self.index.remove("infill_pattern", "nl_NL")
+		self.assertEqual(set(self.result_ids("infill ", "nl_NL")), {"infill_sparse_density", "infill_pattern"})  # Falls back to English now.
+
+	def test_update(self):
+		"""
+		Tests that adding an article again replaces its old text.
+		"""
+		self.index.add("support_enable", "en_US", "<h1>Generate Support</h1><p>Prints scaffolding.</p>")
+		self.assertEqual(self.result_ids("overhangs "), [])
+		self.assertEqual(self.result_ids("scaffold"), ["support_enable"])
+
+	def test_persistence(self):
+		"""
+		Tests that the index can be searched after loading it in a new session.
+		"""
+		self.index.save()
+		index = SearchIndex.SearchIndex(self.index_file)
+		index.load()
+		for query, language in [("inf", "en_US"), ("print stronger ", "en_US"), ("vorm", "nl_NL"), ("infill ", "nl_NL")]:
+			with self.subTest(query=query, language=language):
+				self.assertEqual(index.search(query, language), self.index.search(query, language))
+
+	def test_load_keeps_newer(self):
+		"""
+		Tests that articles added before loading the index are not replaced by
+		their stored version.
+		"""
+		self.index.save()
+		index = SearchIndex.SearchIndex(self.index_file)
+		index.add("support_enable", "en_US", "<h1>Generate Support</h1><p>Prints scaffolding.</p>")
+		index.load()
+		self.assertEqual([article_id for article_id, _, _ in index.search("scaffolding ", "en_US")], ["support_enable"])
+		self.assertEqual(index.search("overhangs ", "en_US"), [])
+
+	def test_load_invalid(self):
+		"""
+		Tests that stored indices of another version or corrupt ones are
+		ignored.
+		"""
+		self.index.save()
+		with open(self.index_file, encoding="utf-8") as f:
+			stored = json.load(f)
+		broken_article = {"title": "Broken", "text": "Broken"}  # No terms.
+		documents = [
+			"{",
+			"[]",
+			json.dumps(dict(stored, version=SearchIndex.SearchIndex.version + 1)),
+			json.dumps({"version": SearchIndex.SearchIndex.version, "documents": []}),
+			json.dumps({"version": SearchIndex.SearchIndex.version, "documents": {"en_US": {"broken": broken_article}}})
+		]
+		for document in documents:
+			with self.subTest(document=document):
+				with open(self.index_file, "w", encoding="utf-8") as f:
+					f.write(document)
+				index = SearchIndex.SearchIndex(self.index_file)
+				index.load()
+				self.assertEqual(index.search("broken", "en_US"), [])
+				self.assertEqual(index.search("infill", "en_US"), [])
+
+if __name__ == "__main__":
+	unittest.main()
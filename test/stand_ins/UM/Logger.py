@@ -0,0 +1,20 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+import sys  # To print warnings and errors.
+
+class Logger:
+	"""
+	Stand-in for Uranium's logger. Only warnings and errors are printed.
+	"""
+
+	@classmethod
+	def log(cls, log_type: str, message: str) -> None:
+		if log_type in {"w", "e", "c"}:
+			print(log_type.upper() + ": " + message, file=sys.stderr)
+
+	@classmethod
+	def logException(cls, log_type: str, message: str) -> None:
+		cls.log(log_type, message)
@@ -0,0 +1,33 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+class Version:
+	"""
+	Stand-in for Uranium's version numbers.
+
+	This only supports the plain numeric version numbers that are used in the articles.
+	"""
+
+	def __init__(self, version: str) -> None:
+		self._parts = tuple(int(part) for part in str(version).split("-")[0].split(".") if part.isdigit())
+		self._parts += (0,) * (3 - len(self._parts))
+
+	def __eq__(self, other: "Version") -> bool:
+		return self._parts == other._parts
+
+	def __ne__(self, other: "Version") -> bool:
+		return self._parts != other._parts
+
+	def __lt__(self, other: "Version") -> bool:
+		return self._parts < other._parts
+
+	def __le__(self, other: "Version") -> bool:
+		return self._parts <= other._parts
+
+	def __gt__(self, other: "Version") -> bool:
+		return self._parts > other._parts
+
+	def __ge__(self, other: "Version") -> bool:
+		return self._parts >= other._parts
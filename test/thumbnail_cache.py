@@ -0,0 +1,97 @@
+#Copyright (C) 2021 Ghostkeeper
+#This plug-in is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#This plug-in is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for details.
+#You should have received a copy of the GNU Affero General Public License along with this plug-in. If not, see <https://gnu.org/licenses/>.
+
+"""
+Tests for the cache of scaled-down images.
+"""
+
+import importlib  # To import the module under test.
+import os  # To create the images.
+import tempfile  # To store the images and thumbnails.
+import unittest  # Run the automated tests.
+
+import plugin_loader  # To import the plug-in's modules without running Cura.
+
+try:
+	from PyQt5.QtGui import QImage, QImageReader  # To create the images and check the thumbnails.
+	qt_available = True
+except ImportError:  # PyQt isn't installed.
+	qt_available = False
+if qt_available:
+	plugin_loader.import_plugin()
+	ThumbnailCache = importlib.import_module("SettingsGuide.ThumbnailCache")
+
+@unittest.skipIf(not qt_available, "PyQt5 is not available.")
+class TestThumbnailCache(unittest.TestCase):
+	"""
+	Tests for the cache of scaled-down images.
+	"""
+
+	def setUp(self):
+		"""
+		Creates a temporary folder for the images and the thumbnails.
+		"""
+		self.folder = tempfile.TemporaryDirectory()
+		self.cache = ThumbnailCache.ThumbnailCache(os.path.join(self.folder.name, "thumbnails"))
+
+	def tearDown(self):
+		"""
+		Removes the images and the thumbnails.
+		"""
+		self.folder.cleanup()
+
+	def create_image(self, width: int, height: int) -> str:
+		"""
+		Create an image file of a certain size.
+		:param width: The width of the image.
+		:param height: The height of the image.
+		:return: The file path of the image.
+		"""
+		image = QImage(width, height, QImage.Format_RGB32)
+		image.fill(0x196ef0)
+		image_file = os.path.join(self.folder.name, "{width}x{height}.png".format(width=width, height=height))
+		self.assertTrue(image.save(image_file, "PNG"))
+		return image_file
+
+	def test_small_image(self):
+		"""
+		Tests that images that are already small enough are not scaled.
+		"""
+		image_file = self.create_image(100, 50)
+		self.assertEqual(self.cache.create(image_file, 200, 0), image_file)
+		self.assertEqual(self.cache.create(image_file, 0, 50), image_file)
+		self.assertEqual(self.cache.create(image_file, 100, 50), image_file)
+
+	def test_large_image(self):
+		"""
+		Tests that large images are scaled down, keeping their aspect ratio.
+		"""
+		image_file = self.create_image(800, 400)
+		for width, height, expected_width, expected_height in [(200, 0, 200, 100), (0, 100, 200, 100), (400, 100, 200, 100)]:
+			with self.subTest(width=width, height=height):
+				thumbnail = self.cache.create(image_file, width, height)
+				self.assertNotEqual(thumbnail, image_file)
+				size = QImageReader(thumbnail).size()
+				self.assertEqual((size.width(), size.height()), (expected_width, expected_height))
+
+	def test_cache_hit(self):
+		"""
+		Tests that the thumbnail is only created once.
+		"""
+		image_file = self.create_image(800, 400)
+		self.assertIsNone(self.cache.get(image_file, 200, 0))
+		thumbnail = self.cache.create(image_file, 200, 0)
+		self.assertEqual(self.cache.get(image_file, 200, 0), thumbnail)
+		os.remove(image_file)
+		self.assertEqual(self.cache.create(image_file, 200, 0), thumbnail)  # Doesn't need the original any more.
+
+	def test_unreadable(self):
+		"""
+		Tests that there is no thumbnail for an image that can't be read.
+		"""
+		self.assertIsNone(self.cache.create(os.path.join(self.folder.name, "missing.png"), 200, 0))
+
+if __name__ == "__main__":
+	unittest.main()